@@ -1,26 +1,116 @@
 
 import time
-from PIL import Image
+rerun_started = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
-from dotenv import load_dotenv
-import os
 
-load_dotenv()
-api = os.getenv("GOOGLE_API_KEY")
+# Settings (.env is loaded once per process when config is first imported)
+from autosage import config, reports
+from autosage.cache import ImageReportCache, ResponseCache
+from autosage.compare import comparison_table, parse_vehicle_list, run_concurrently
+from autosage.backends import build_backend
+from autosage.followup import Conversation, ask, report_id
+from autosage.generation import PartialResponseError, cached_generate
+from autosage.imaging import format_bytes, prepare_image
+from autosage.jobs import DONE, FAILED, QUEUED, JobQueue
+from autosage.metrics import MetricsRegistry, Trace
+from autosage.resilience import with_resilience
+from autosage.sectioned import assemble as assemble_sections, generate_sectioned
+from autosage.semantic import SemanticCache, query_partition
+from autosage.session_store import StoreRegistry
+from autosage.singleflight import with_single_flight
+from autosage.specs import apply_specs, open_configured_store, spec_table
+from autosage.structured import StructuredOutputError, parse_report, render_markdown
+from autosage.vision import two_stage_report
+from autosage.warmup import CacheWarmer, warmup_jobs
+
+# Model - built once per process instead of on every rerun, behind the
+# process-wide rate limiter / retry / circuit breaker wrapper; identical calls
+# in flight from several sessions are sent once.
+# AUTOSAGE_BACKEND=fake swaps Gemini for the offline stand-in.
+@st.cache_resource(show_spinner=False)
+def get_model():
+    return with_single_flight(with_resilience(build_backend()), metrics=get_metrics())
+
+
+# Report cache shared by all sessions (and kept across restarts)
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache(
+        config.CACHE_PATH,
+        ttl_seconds=config.CACHE_TTL_SECONDS,
+        max_bytes=config.CACHE_MAX_BYTES
+    )
 
 
-import google.generativeai as genai
-genai.configure(api_key=api)
+@st.cache_resource
+def get_image_cache():
+    return ImageReportCache(
+        get_response_cache(),
+        max_distance=config.IMAGE_HASH_MAX_DISTANCE
+    )
 
-# Model
-model = genai.GenerativeModel(
-    model_name="models/gemini-2.5-flash",
-    generation_config={
-        "temperature": 0.3,
-        "max_output_tokens": 4096
-    }
-)
+
+# Near-duplicate Smart Query questions, shared by all sessions
+@st.cache_resource
+def get_semantic_cache():
+    return SemanticCache(
+        threshold=config.SEMANTIC_THRESHOLD,
+        max_entries=config.SEMANTIC_MAX_ENTRIES
+    )
+
+
+# Local spec store used to ground Smart Query / Smart Fusion (None when disabled)
+@st.cache_resource
+def get_spec_store():
+    return open_configured_store()
+
+
+# Per-request timings / token usage for the whole process (JSONL log + /metrics)
+@st.cache_resource
+def get_metrics():
+    registry = MetricsRegistry(
+        log_path=config.METRICS_LOG or None, max_bytes=config.METRICS_LOG_MAX_BYTES,
+        backups=config.METRICS_LOG_BACKUPS, log_inputs=config.METRICS_LOG_INPUTS
+    )
+    if config.METRICS_PORT:
+        registry.serve(config.METRICS_PORT, config.METRICS_HOST)
+    return registry
+
+
+# Background jobs for every session in the process
+@st.cache_resource
+def get_jobs():
+    return JobQueue(max_workers=config.JOB_WORKERS, keep_seconds=config.JOB_KEEP_SECONDS)
+
+
+# Compressed per-session storage (reports, follow-ups) under a process-wide cap
+@st.cache_resource
+def get_store_registry():
+    return StoreRegistry(max_bytes=config.SESSION_STORE_MAX_BYTES)
+
+
+# Cache warm-up for the most requested Smart Query reports, started by the
+# first session of the process on a background thread (None when not configured)
+@st.cache_resource(show_spinner=False)
+def get_warmer():
+    if not config.WARMUP_TARGETS and not config.WARMUP_FROM_LOG:
+        return None
+    warmer = CacheWarmer(
+        get_model(), get_response_cache(), spec_store=get_spec_store(),
+        semantic_cache=get_semantic_cache() if config.SEMANTIC_CACHE else None,
+        workers=config.WARMUP_WORKERS, max_tokens=config.WARMUP_MAX_TOKENS or None,
+        refresh_seconds=config.WARMUP_REFRESH_SECONDS, metrics=get_metrics()
+    )
+    warmer.start(
+        lambda: warmup_jobs(
+            config.WARMUP_TARGETS or None,
+            config.METRICS_LOG if config.WARMUP_FROM_LOG else None,
+            top=config.WARMUP_TOP, since_seconds=config.WARMUP_LOG_HOURS * 3600 or None
+        ),
+        interval=config.WARMUP_INTERVAL_SECONDS
+    )
+    return warmer
 
 
 # Page config
@@ -29,6 +119,7 @@ st.set_page_config(
     page_icon="🚗",
     layout="wide"
 )
+get_warmer()
 
 # Sidebar
 st.sidebar.title("⚙️ AutoSage Controls")
@@ -56,6 +147,17 @@ if purpose == "Other":
 else:
     custom_purpose = purpose
 
+stream_mode = st.sidebar.checkbox("Stream responses", value=True)
+structured_mode = st.sidebar.checkbox(
+    "Structured output (JSON)", value=False,
+    help="Shorter, schema-checked reports rendered locally"
+)
+sectioned_mode = st.sidebar.checkbox(
+    "Parallel report sections (Smart Fusion)", value=config.FUSION_SECTIONED,
+    help="Identify the vehicle first, then write the report's sections concurrently"
+)
+debug_mode = st.sidebar.checkbox("Show request metrics", value=False)
+
 # st.sidebar.markdown("---")
 # st.sidebar.info("AI features will be enabled soon")
 
@@ -75,24 +177,498 @@ if apply_btn:
 # ---------------------------------
 # Functions For Genearting Contents
 # ---------------------------------
-# Tab 1
-def get_prompt_response(prompt):
+# Live progress of a streamed report.
+# JSON can't be rendered until it is complete, so structured mode never streams.
+def streaming():
+    return stream_mode and not structured_mode
+
+# Figures the prompt was grounded with, rendered locally under the report
+def show_spec_panel(spec):
+    with st.expander(f"📋 Verified Specs: {spec.spec.name}"):
+        st.dataframe(spec_table(spec), hide_index=True, width="stretch")
+
+# Final rendering of a report; structured reports are validated and laid out locally
+def show_report(kind, text, report_area, spec=None, structured=None):
+    if structured is None:
+        structured = structured_mode
+    if spec is not None:
+        show_spec_panel(spec)
+    if not structured:
+        report_area.markdown(text)
+        return
     try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as ex:
-        return f"Error Genearting Response {str(ex)}"
+        report = parse_report(kind, text)
+    except StructuredOutputError as ex:
+        report_area.markdown(text)
+        st.error(f"Structured Report Failed: {str(ex)}")
+        return
+    if spec is not None:
+        apply_specs(report, spec)
+    report_area.markdown(render_markdown(report))
+
+# Finished traces go to this session's debug panel (jobs record them in the process metrics)
+def remember_trace(trace):
+    recent = st.session_state.setdefault("recent_traces", [])
+    recent.append(trace.to_dict())
+    del recent[:-10]
+
+# This session's bounded store (autosage/session_store.py)
+def session_store():
+    if "store" not in st.session_state:
+        st.session_state.store = get_store_registry().create(config.SESSION_BUDGET_BYTES)
+    return st.session_state.store
+
+# Finished reports are kept per tab with the inputs that produced them, so
+# reruns (another widget, another tab) re-render them without calling the model
+def save_result(tab, inputs, **result):
+    session_store().put(f"result:{tab}", dict(result, inputs=inputs))
+
+def clear_result(tab):
+    session_store().pop(f"result:{tab}")
+
+def show_saved_result(tab, inputs):
+    result = session_store().get(f"result:{tab}")
+    if result is None:
+        return None
+    if result["inputs"] != inputs:
+        st.info("✏️ The inputs have changed since this report was generated. Run the analysis again to update it.")
+    if "compared" in result:
+        show_comparison(result["compared"], result["failures"])
+        return result
+    show_report(
+        result["kind"], result["text"], st.empty(), result.get("spec"),
+        structured=result["structured"]
+    )
+    for caption in result.get("captions", ()):
+        st.caption(caption)
+    return result
+
+# Analyses run as background jobs (autosage/jobs.py). Each tab has at most one;
+# the session keeps its ID and inputs, and reruns pick it up where it is.
+def start_job(tab, inputs, run):
+    jobs = get_jobs()
+    metrics = get_metrics()
+    active = st.session_state.setdefault("active_jobs", {})
+    entry = active.get(tab)
+    if entry is not None:
+        previous = jobs.get(entry["id"])
+        if previous is not None and not previous.done:
+            # A second click on the same inputs keeps the call already in flight
+            if entry["inputs"] == inputs:
+                return previous
+            jobs.discard(previous.id)
+
+    def run_job(job):
+        try:
+            return run(job)
+        except Exception as ex:
+            for trace in job.traces:
+                if trace.status == "ok":
+                    trace.fail(ex.error if isinstance(ex, PartialResponseError) else ex)
+            raise
+        finally:
+            for trace in job.traces:
+                if job.cancelled:
+                    trace.status = "cancelled"
+                metrics.record(trace)
+
+    job = jobs.submit(tab, run_job)
+    active[tab] = {"id": job.id, "inputs": inputs}
+    st.session_state.setdefault("job_errors", {}).pop(tab, None)
+    # Cache hits finish within a few milliseconds and are collected in this
+    # run instead of waiting for the next poll
+    job.wait(config.JOB_INLINE_WAIT_SECONDS)
+    return job
+
+# Attach a finished job's result (or error) and traces to the session
+def collect_job(tab, save=save_result, clear=clear_result):
+    active = st.session_state.get("active_jobs", {})
+    entry = active.get(tab)
+    if entry is None:
+        return
+    jobs = get_jobs()
+    job = jobs.get(entry["id"])
+    if job is not None and not job.done:
+        return
+    del active[tab]
+    if job is None:
+        return
+    # The session keeps its own (compressed) copy from here on
+    jobs.release(job.id)
+    for trace in job.traces:
+        remember_trace(trace)
+    if job.status == DONE:
+        save(tab, entry["inputs"], **job.result)
+    elif job.status == FAILED:
+        if clear is not None:
+            clear(tab)
+        if isinstance(job.error, PartialResponseError):
+            failure = (job.error.partial_text, f"Report interrupted: {str(job.error.error)}")
+        else:
+            failure = ("", f"AI Generation Failed: {str(job.error)}")
+        st.session_state.setdefault("job_errors", {})[tab] = failure
+
+# Drops the job from the page at once; a call already in flight finishes on
+# its worker and its result is discarded
+def cancel_job(tab):
+    entry = st.session_state.get("active_jobs", {}).pop(tab, None)
+    if entry is not None:
+        get_jobs().discard(entry["id"])
+
+# Polls the tab's running job; only this fragment reruns until the job is done
+@st.fragment(run_every=config.JOB_POLL_SECONDS)
+def job_progress(tab):
+    entry = st.session_state.get("active_jobs", {}).get(tab)
+    job = get_jobs().get(entry["id"]) if entry else None
+    if job is None or job.done:
+        st.rerun()
+    if job.status == QUEUED:
+        st.caption("⏳ Waiting for a free worker...")
+    else:
+        st.caption(f"⏳ Generating... {job.elapsed:.0f}s")
+    if job.text:
+        st.markdown(job.text + " ▌")
+    st.button("✖ Cancel", key=f"cancel_{tab}", on_click=cancel_job, args=(tab,))
+
+# What a tab shows below its inputs: its running job, its last error, or its saved result
+def show_tab_output(tab, inputs):
+    collect_job(tab)
+    if tab in st.session_state.get("active_jobs", {}):
+        job_progress(tab)
+        return None
+    failure = st.session_state.get("job_errors", {}).get(tab)
+    if failure is not None:
+        partial_text, message = failure
+        if partial_text:
+            st.markdown(partial_text)
+        st.error(message)
+        return None
+    return show_saved_result(tab, inputs)
+
+# Follow-up questions under a finished report (autosage/followup.py). The
+# conversation is stored per tab and starts over when the report changes.
+def report_conversation(tab, result):
+    conversation = session_store().get(f"followup:{tab}")
+    if conversation is None or conversation.report_id != report_id(result["text"]):
+        conversation = Conversation.about(result["text"])
+    return conversation
+
+def save_conversation(job_tab, inputs, conversation):
+    session_store().put(job_tab, conversation)
+
+def start_followup_job(tab, report, conversation, question):
+    model, response_cache = get_model(), get_response_cache()
+    # Answers are markdown, so they stream even under a structured report
+    stream = stream_mode
+
+    def run(job):
+        trace = Trace("followup")
+        job.traces.append(trace)
+        _, conversation_after = ask(
+            model, response_cache, report, conversation, question,
+            on_chunk=job.progress if stream else None, trace=trace
+        )
+        return dict(conversation=conversation_after)
+
+    start_job(f"followup:{tab}", (conversation.report_id, question), run)
+
+def show_followups(tab, result):
+    # Comparisons have no single report to talk about
+    if result is None or "text" not in result:
+        return
+    job_tab = f"followup:{tab}"
+    collect_job(job_tab, save=save_conversation, clear=None)
+    conversation = report_conversation(tab, result)
+    st.markdown("##### 💬 Follow-up questions")
+    for question, answer in conversation.turns:
+        st.chat_message("user").markdown(question)
+        st.chat_message("assistant").markdown(answer)
+    pending = st.session_state.get("active_jobs", {}).get(job_tab)
+    if pending is not None:
+        st.chat_message("user").markdown(pending["inputs"][1])
+        with st.chat_message("assistant"):
+            job_progress(job_tab)
+    else:
+        failure = st.session_state.get("job_errors", {}).get(job_tab)
+        if failure is not None:
+            st.error(failure[1])
+    question = st.chat_input(
+        "Ask a follow-up about this report (Eg: What about the diesel variant?)",
+        key=f"followup_input_{tab}", disabled=pending is not None
+    )
+    if question and question.strip():
+        start_followup_job(tab, result["text"], conversation, question.strip())
+        st.rerun()
+
+# Tab 1
+def start_query_job(query, inputs, semantic_bypass=False):
+    model, response_cache, spec_store = get_model(), get_response_cache(), get_spec_store()
+    semantic_cache = get_semantic_cache() if config.SEMANTIC_CACHE else None
+    vehicle_type, purpose = st.session_state.vehicle_type, st.session_state.purpose
+    structured, stream = structured_mode, streaming()
+
+    def run(job):
+        trace = Trace("query")
+        trace.inputs = {"query": query, "vehicle_type": vehicle_type, "purpose": purpose}
+        job.traces.append(trace)
+        with trace.span("prompt_build"):
+            request = reports.query_request(
+                query, vehicle_type, purpose, structured=structured, spec_store=spec_store
+            )
+        partition = query_partition(vehicle_type, purpose, structured, request)
+        similar = None
+        if semantic_cache is not None and not semantic_bypass:
+            similar, text = find_similar_report(
+                semantic_cache, response_cache, query, partition, request.cache_key
+            )
+        captions = []
+        if similar is not None:
+            trace.cache = "semantic"
+            captions.append(
+                f"♻️ Reused the report for a similar question: “{similar.query}” "
+                f"(similarity {similar.similarity:.2f})"
+            )
+        else:
+            text = cached_generate(
+                model, response_cache, request.contents, cache_key=request.cache_key,
+                on_chunk=job.progress if stream else None,
+                generation_config=request.generation_config, trace=trace,
+                system_instruction=request.system_instruction
+            )
+            if semantic_cache is not None:
+                semantic_cache.add(query, partition, request.cache_key)
+        return dict(
+            kind="query", text=text, spec=request.spec, captions=captions,
+            similar=similar is not None, structured=structured
+        )
+
+    start_job("query", inputs, run)
+
+# Tab 1 - a differently worded earlier question with the same context reuses its report
+def find_similar_report(semantic_cache, response_cache, query, partition, own_key):
+    hit = semantic_cache.lookup(query, partition, own_key=own_key)
+    if hit is None:
+        return None, None
+    text = response_cache.get(hit.key)
+    if text is None:
+        semantic_cache.record("stale")
+        return None, None
+    return hit, text
+
+def reject_similar_report():
+    get_semantic_cache().record("false_hits")
+    get_metrics().inc("autosage_semantic_false_hits_total")
+    st.session_state.semantic_bypass = True
+    st.session_state.rerun_tab1 = True
+
+def show_comparison(compared, failures):
+    for name, error in failures:
+        st.warning(f"{name}: comparison failed ({error})")
+    if compared:
+        st.dataframe(
+            comparison_table([name for name, _ in compared], [report for _, report in compared]),
+            width="stretch"
+        )
+        report_tabs = st.tabs([f"📄 {name}" for name, _ in compared])
+        for report_tab, (name, report) in zip(report_tabs, compared):
+            with report_tab:
+                st.markdown(render_markdown(report))
+
+# Tab 1 - comparison mode: one structured report per vehicle, fetched concurrently
+def compare_vehicles(names, vehicle_context, purpose_context, model, response_cache, spec_store,
+                     traces):
+    def fetch(name):
+        trace = Trace("compare")
+        traces.append(trace)
+        try:
+            with trace.span("prompt_build"):
+                request = reports.query_request(
+                    name, vehicle_context, purpose_context, structured=True,
+                    spec_store=spec_store
+                )
+            text = cached_generate(
+                model, response_cache, request.contents, cache_key=request.cache_key,
+                generation_config=request.generation_config, trace=trace,
+                system_instruction=request.system_instruction
+            )
+            report = parse_report("query", text)
+            if request.spec is not None:
+                apply_specs(report, request.spec)
+            return report
+        except Exception as ex:
+            trace.fail(ex)
+            raise
+
+    return run_concurrently(fetch, names, config.COMPARE_WORKERS)
+
+def start_compare_job(names, inputs):
+    model, response_cache, spec_store = get_model(), get_response_cache(), get_spec_store()
+    vehicle_context = st.session_state.vehicle_type or reports.DEFAULT_VEHICLE
+    purpose_context = st.session_state.purpose or reports.QUERY_DEFAULT_PURPOSE
+
+    def run(job):
+        results = compare_vehicles(
+            names, vehicle_context, purpose_context, model, response_cache, spec_store,
+            job.traces
+        )
+        return dict(
+            compared=[(name, report) for name, (report, error) in zip(names, results) if error is None],
+            failures=[(name, str(error)) for name, (_, error) in zip(names, results) if error is not None],
+        )
+
+    start_job("compare", inputs, run)
     
 # Tab 2
-def input_image_setup(uploaded_file):
-    if uploaded_file is not None:
-        bytes_data = uploaded_file.getvalue()
-        return [{
-            "mime_type": uploaded_file.type,
-            "data": bytes_data
-        }]
+# Decode / downscale / re-encode an upload (None when the file can't be read
+# as an image)
+def prepare_upload(bytes_data):
+    from PIL import Image
+
+    try:
+        return prepare_image(
+            bytes_data,
+            max_edge=config.IMAGE_MAX_EDGE,
+            max_bytes=config.IMAGE_MAX_BYTES,
+            fmt=config.IMAGE_FORMAT,
+            quality=config.IMAGE_QUALITY,
+            thumbnail_edge=config.THUMBNAIL_EDGE
+        )
+    # UnidentifiedImageError and truncated files are OSErrors
+    except (OSError, Image.DecompressionBombError):
+        return None
+
+def show_upload_preview(prepared, width):
+    st.image(prepared.thumbnail, caption="Uploaded Vehicle", width=width)
+    st.caption(
+        f"Upload size: {format_bytes(prepared.original_bytes)} → "
+        f"{format_bytes(prepared.payload_bytes)} "
+        f"({prepared.width}×{prepared.height})"
+    )
+
+# Each upload is prepared once, in the uploader's callback: only the
+# PreparedImage is kept (in the session store, counted against its budget)
+# and the uploader gets a new key, so the widget lets go of the original bytes
+def upload_key(tab):
+    return f"upload_{tab}_{st.session_state.setdefault('upload_keys', {}).get(tab, 0)}"
+
+def store_upload(tab):
+    uploaded = st.session_state.get(upload_key(tab))
+    if uploaded is None:
+        return
+    prepared = prepare_upload(uploaded.getvalue())
+    failed = st.session_state.setdefault("upload_errors", set())
+    if prepared is None:
+        session_store().pop(f"upload:{tab}")
+        failed.add(tab)
+    else:
+        session_store().put(f"upload:{tab}", prepared)
+        failed.discard(tab)
+    keys = st.session_state.upload_keys
+    keys[tab] = keys.get(tab, 0) + 1
+
+def remove_upload(tab):
+    session_store().pop(f"upload:{tab}")
+
+def upload_input(tab, preview_width):
+    st.file_uploader(
+        "Upload Vehicle Image",
+        type=["jpg", "jpeg", "png"],
+        key=upload_key(tab), on_change=store_upload, args=(tab,)
+    )
+    if tab in st.session_state.get("upload_errors", ()):
+        st.warning("Image Processing Failed")
+    prepared = session_store().get(f"upload:{tab}")
+    if prepared is not None:
+        show_upload_preview(prepared, width=preview_width)
+        st.button("✖ Remove image", key=f"remove_upload_{tab}", on_click=remove_upload, args=(tab,))
+    return prepared
+
+def input_image_setup(prepared):
+    if prepared is not None:
+        return [reports.image_part(prepared)]
     return None
 
+# Tab 2 - by default the vehicle is identified from the photo first, and the
+# report is one shared by all photos of it; reports are cached against the
+# image content and prompt variant
+def start_vision_job(prepared, inputs):
+    model, response_cache, image_cache = get_model(), get_response_cache(), get_image_cache()
+    spec_store = get_spec_store()
+    structured, stream = structured_mode, streaming()
+
+    def run(job):
+        trace = Trace("vision")
+        job.traces.append(trace)
+        on_chunk = job.progress if stream else None
+        captions = []
+        if config.VISION_TWO_STAGE:
+            text, request, identity = two_stage_report(
+                model, response_cache, image_cache, prepared,
+                structured=structured, spec_store=spec_store,
+                min_confidence=config.VISION_MIN_CONFIDENCE, on_chunk=on_chunk, trace=trace
+            )
+            if identity is not None:
+                captions.append(
+                    f"🔍 Identified as {identity.name} (confidence {identity.confidence}/10)"
+                )
+        else:
+            with trace.span("prompt_build"):
+                request = reports.vision_request(prepared, structured=structured)
+            text = reports.generate_report(
+                model, response_cache, image_cache, request, on_chunk=on_chunk, trace=trace
+            )
+        return dict(
+            kind="vision", text=text, spec=request.spec, captions=captions, structured=structured
+        )
+
+    start_job("vision", inputs, run)
+
+# Tab 3 - in sectioned mode the progress shows each group as it completes
+def start_fusion_job(prepared, query, inputs):
+    model, response_cache, image_cache = get_model(), get_response_cache(), get_image_cache()
+    spec_store = get_spec_store()
+    vehicle_type, purpose = st.session_state.vehicle_type, st.session_state.purpose
+    structured, stream = structured_mode, streaming()
+    # Structured reports have one schema for the whole report, so they stay one call
+    sectioned = sectioned_mode and not structured
+
+    def run(job):
+        trace = Trace("fusion")
+        job.traces.append(trace)
+        on_chunk = job.progress if stream else None
+        with trace.span("prompt_build"):
+            if sectioned:
+                request = reports.sectioned_fusion_request(
+                    prepared, query, vehicle_type, purpose, spec_store=spec_store
+                )
+            else:
+                request = reports.fusion_request(
+                    prepared, query, vehicle_type, purpose,
+                    structured=structured, spec_store=spec_store
+                )
+        if not sectioned:
+            text = reports.generate_report(
+                model, response_cache, image_cache, request, on_chunk=on_chunk, trace=trace
+            )
+        else:
+            parts = [None] * (len(request.groups) + 1)
+
+            def show_section(index, section_text):
+                parts[index] = section_text
+                pending = [
+                    f"⏳ _{', '.join(group.sections)}_"
+                    for group, part in zip(request.groups, parts[1:]) if part is None
+                ]
+                job.progress("\n\n".join([assemble_sections(parts)] + pending))
+
+            text = generate_sectioned(
+                model, image_cache, request, on_section=show_section, on_chunk=on_chunk,
+                trace=trace, max_workers=config.FUSION_SECTION_WORKERS
+            )
+        return dict(kind="fusion", text=text, spec=request.spec, structured=structured)
+
+    start_job("fusion", inputs, run)
+
 # # Tab 3
 # def input_prompt_image(prompt1, uploaded_image):
     
@@ -115,130 +691,43 @@ with tab1:
                              )
     analyze_btn_tab1 = st.button("🧠 Smart Suggest", key = "prompt")
 
-    if analyze_btn_tab1 :
+    with st.expander("⚖️ Compare Vehicles"):
+        compare_input = st.text_input(
+            "Vehicles to Compare",
+            placeholder = "Eg: Creta vs Seltos vs Brezza",
+            key = "compare_input"
+        )
+        compare_btn = st.button("⚖️ Compare", key = "compare")
+        compare_inputs = (
+            compare_input.strip(), st.session_state.vehicle_type, st.session_state.purpose
+        )
+
+        if compare_btn:
+            names = parse_vehicle_list(compare_input, config.COMPARE_MAX_VEHICLES)
+            if len(names) < 2:
+                st.warning("Please enter at least two vehicles to compare.")
+            else:
+                start_compare_job(names, compare_inputs)
+        show_tab_output("compare", compare_inputs)
+
+    # "Not what I asked" on a reused report regenerates without the similarity cache
+    rerun_tab1 = st.session_state.pop("rerun_tab1", False)
+    semantic_bypass = st.session_state.pop("semantic_bypass", False)
+    query_inputs = (
+        user_input.strip(), st.session_state.vehicle_type, st.session_state.purpose, structured_mode
+    )
+    if analyze_btn_tab1 or rerun_tab1:
         if not user_input.strip():
             st.warning("Please provide vehicle details to proceed.")
         else:
-            with st.spinner("Analyzing Vehicle Data..."):
-                vehicle_context = st.session_state.vehicle_type or "Not Specified"
-                purpose_context = st.session_state.purpose or "Genearal analysis"
-
-
-                prompt = f"""
-                        You are AutoSage AI — senior automotive market intelligence analyst for the Indian automobile industry.
-
-                        USER CONTEXT:
-                        - Vehicle Type: {vehicle_context}
-                        - Purpose: {purpose_context}
-                        - Query: {user_input}
-
-                        PURPOSE ADJUSTMENT:
-                        - Buying Decision → Emphasize pricing, competitors, resale, value score.
-                        - Maintenance Tips → Emphasize reliability, service cost, ownership risk.
-                        - Eco-Friendly Search → Emphasize efficiency, emissions, cost per km, EV alternatives.
-
-                        CORE RULES:
-                        - Indian market only.
-                        - Use latest generation sold in India.
-                        - If variant unclear → "Most Common Variant (Assumed)".
-                        - If uncertain → "Data may vary by variant - Approximate Indian specification."
-                        - No filler text. No marketing tone.
-                        - INR (₹) pricing only.
-                        - Use realistic rounded ranges.
-                        - Maintain strict structure.
-                        - Do not output both ICE and EV sections.
-                        - If data unavailable → "Information not publicly disclosed."
-
-                        ---------------------------------------------------
-                        STRUCTURED VEHICLE INTELLIGENCE REPORT
-                        ---------------------------------------------------
-
-                        🔷 VEHICLE OVERVIEW
-                        - Brand:
-                        - Model:
-                        - Variant:
-                        - Vehicle Type:
-                        - Segment:
-                        - Launch Year (India):
-                        - Current Status:
-
-                        🔷 ENGINE & PERFORMANCE
-                        - Engine Options:
-                        - Engine Capacity:
-                        - Fuel Type:
-                        - Power (bhp):
-                        - Torque (Nm):
-                        - Transmission:
-                        - Drivetrain:
-                        - Performance Character:
-
-                        🔷 EFFICIENCY ANALYSIS
-                        (Include only relevant section)
-
-                        ICE:
-                        - ARAI Mileage:
-                        - Real-world Mileage:
-                        - Fuel Tank Capacity:
-                        - Cost per 1,000 km:
-
-                        EV:
-                        - Battery Capacity:
-                        - Claimed Range:
-                        - Real-world Range:
-                        - Charging Time:
-                        - Charging Cost per Full Charge:
-
-                        🔷 DIMENSIONS & PRACTICALITY
-                        - Boot Space:
-                        - Seating Capacity:
-                        - Ground Clearance:
-                        - Practicality Score (1-10):
-
-                        🔷 KEY FEATURES (Top 7)
-                        1.
-                        2.
-                        3.
-                        4.
-                        5.
-                        6.
-                        7.
-
-                        🔷 SAFETY & TECHNOLOGY
-                        - Airbags:
-                        - ADAS Level:
-                        - NCAP Rating:
-                        - Safety Score (1-10):
-
-                        🔷 PRICE & POSITIONING (India)
-                        - Ex-Showroom Range:
-                        - On-Road Range:
-                        - Top 4 Competitors:
-                        - Value Score (1-10):
-
-                        🔷 OWNERSHIP
-                        - Service Interval:
-                        - Annual Maintenance Cost:
-                        - Warranty:
-                        - Reliability Score (1-10):
-
-                        🔷 DEPRECIATION
-                        - 3-Year:
-                        - 5-Year:
-                        - Resale Strength (1-10):
-
-                        🔷 FINAL VERDICT
-                        - Ideal Buyer:
-                        - Pros:
-                        - Cons:
-                        - 3-Line Executive Summary:
-                        """
-
-                
-                try:
-                    response = get_prompt_response(prompt)
-                    st.markdown(response)
-                except Exception as e:
-                    st.error(f"AI Generation Failed: {str(e)}")
+            start_query_job(user_input, query_inputs, semantic_bypass)
+    saved = show_tab_output("query", query_inputs)
+    if saved is not None and saved.get("similar") and saved["inputs"] == query_inputs:
+        st.button(
+            "🔄 Not what I asked — generate a fresh report",
+            key="semantic_reject", on_click=reject_similar_report
+        )
+    show_followups("query", saved)
 
 # ------------------
 # Tab2 
@@ -246,157 +735,27 @@ with tab1:
 with tab2:
     st.subheader("🔎 AutoSage Vision")
     # Image Upload Section
-    uploaded_image_tab2 = st.file_uploader(
-        "Upload Vehicle Image",
-        type=["jpg", "jpeg", "png"]
-    )
-
-    if uploaded_image_tab2:
-        image = Image.open(uploaded_image_tab2)
-        st.image(image, caption="Uploaded Vehicle", width= 300)
+    prepared_tab2 = upload_input("vision", preview_width=300)
 
     # Action Button
     analyze_btn_tab2 = st.button("🔎 Unlock Insights", key = "image_tab")
 
+    vision_inputs = (
+        prepared_tab2.digest if prepared_tab2 else None, structured_mode, config.VISION_TWO_STAGE
+    )
+
     # Output Sections (Placeholders)
     if analyze_btn_tab2:
-        if uploaded_image_tab2 is None:
+        if prepared_tab2 is None:
             st.warning("Please provide a vehicle image for processing.")
         else:
-            with st.spinner("Processing Automotive Intelligence..."):
-                image_prompt = f'''
-                            You are AutoSage AI — an expert automotive analyst specializing in the Indian automobile market.
-
-                            TASK:
-                            Analyze the provided vehicle image and generate a structured, professional, Indian-market vehicle intelligence report.
-
-                            STRICT RULES:
-                            1. Identify using visual cues only (logo, design, body type, badging, styling).
-                            2. If variant unclear → mark "Estimated".
-                            3. If not visually determinable → state "Not Visible - Estimated from market data".
-                            4. All prices in INR (₹).
-                            5. Professional tone. No filler text.
-                            6. Use visual evidence first for identification.
-                            7. If confidence low → state "Estimated Identification".
-                            8. All non-visible technical data → label "Estimated from Indian market data".
-                            9. Avoid exact fabricated numbers; use realistic Indian market ranges.
-                            10. Do NOT break format.
-
-                            ---------------------------------------------------
-                            RESPONSE FORMAT (STRICT)
-                            ---------------------------------------------------
-
-                            🔷 VEHICLE IDENTITY
-                            - Brand:
-                            - Model:
-                            - Variant:
-                            - Vehicle Type:
-                            - Segment:
-                            - Launch Year (India):
-
-                            🔷 ENGINE & PERFORMANCE
-                            - Engine Capacity:
-                            - Fuel Type:
-                            - Power Output (bhp):
-                            - Torque (Nm):
-                            - Transmission:
-                            - Drivetrain:
-                            - 0-100 km/h:
-                            - Top Speed:
-                            - If powertrain unclear → "Estimated - Based on Market Variant"
-
-                            🔷 MILEAGE & EFFICIENCY
-                            Determine ICE or Electric using visual cues (EV badge, charging port, exhaust absence).
-                            Include ONLY relevant section.
-
-                            (If ICE)
-                            - ARAI Mileage:
-                            - Real-world Mileage:
-                            - Fuel Tank Capacity:
-                            - Range:
-
-                            (If Electric)
-                            - Battery Capacity:
-                            - Claimed Range:
-                            - Charging Time:
-                            - Cost per Full Charge:
-
-                            🔷 KEY FEATURES (Top 5)
-                            1.
-                            2.
-                            3.
-                            4.
-                            5.
-
-                            🔷 SAFETY PACKAGE
-                            - Airbags:
-                            - ABS / EBD:
-                            - ADAS:
-                            - NCAP Rating:
-                            - Key Safety Highlight:
-
-                            🔷 INTERIOR & COMFORT
-                            - Infotainment:
-                            - Connectivity:
-                            - Seating Capacity:
-                            - Boot Space:
-                            - Premium Elements:
-
-                            🔷 PRICE ANALYSIS (India)
-                            - Ex-Showroom Range:
-                            - On-Road Estimate:
-                            - Competitors:
-                            - Value-for-Money (1-10):
-
-                            🔷 MAINTENANCE & OWNERSHIP
-                            - Avg Annual Maintenance:
-                            - Service Interval:
-                            - Warranty:
-                            - Spare Parts Cost Level:
-
-                            🔷 RESALE & LONG TERM VALUE
-                            - 5-Year Depreciation:
-                            - 10-Year Resale Estimate:
-                            - Reliability (1-10):
-
-                            🔷 UNIQUE SELLING PROPOSITION
-                            - Main USP:
-                            - Ideal Buyer Profile:
-
-                            🔷 IDENTIFICATION CONFIDENCE
-                            - Confidence Level (1-10):
-                            - Reasoning Basis:
-
-                            🔷 FINAL VERDICT
-                            4-5 line expert summary.
-
-                            If image quality is poor, infer logically using visible design cues.
-                            Maintain clarity and structured bullet format.
-                            '''
-
-                try: 
-                    input_image_data = input_image_setup(uploaded_image_tab2)
-                    if input_image_data:
-                        response = model.generate_content([image_prompt, *input_image_data])
-                        st.markdown(response.text)
-                    else:
-                        st.warning("Image Processing Failed")
-                except Exception as exe:
-                    st.error(f"Error Generating Content: {str(exe)}")
-
+            start_vision_job(prepared_tab2, vision_inputs)
+    show_followups("vision", show_tab_output("vision", vision_inputs))
 
 with tab3:
     st.subheader("Multimodal Analysis ⚡")
     # Image Upload Section
-    uploaded_image_tab3 = st.file_uploader(
-        "Upload Vehicle Image",
-        type=["jpg", "jpeg", "png"],
-        key = "image_prompt"
-    )
-
-    if uploaded_image_tab3:
-        image = Image.open(uploaded_image_tab3)
-        st.image(image, caption="Uploaded Vehicle", width = 200)
+    prepared_tab3 = upload_input("fusion", preview_width=200)
 
 
     
@@ -412,197 +771,53 @@ with tab3:
 
     
 
+    fusion_inputs = (
+        prepared_tab3.digest if prepared_tab3 else None, user_prompt.strip(),
+        st.session_state.vehicle_type, st.session_state.purpose, structured_mode, sectioned_mode
+    )
+
     # Output Sections (Placeholders)
     if analyze_btn_tab3:
-        vehicle_context = st.session_state.vehicle_type or "Not Specified"
-        purpose_context = st.session_state.purpose or "General Analysis"
-
-
-        prompt_and_image = f'''
-                                You are AutoSage AI — a senior automotive intelligence analyst with expertise in visual vehicle recognition and Indian automobile market analytics.
-
-                                USER CONTEXT:
-                                - Selected Vehicle Type: {vehicle_context}
-                                - Selected Purpose: {purpose_context}
-                                - User Query: {user_prompt}
-                                
-                                INPUT TYPES YOU MAY RECEIVE:
-                                1. Text only (vehicle name, model, variant, or description)
-                                2. Image only (vehicle photo)
-                                3. Both text + image
-
-                                YOUR TASK:
-                                Generate a highly structured, professional-grade automotive intelligence report using all available inputs.
-
-                                PRIORITY LOGIC:
-                                - If both image and text are provided → Use text for primary identification and image for validation.
-                                - If only image is provided → Identify vehicle using design cues, logos, badging, body type.
-                                - If only text is provided → Use Indian market knowledge.
-                                - If unsure → Clearly mark as "Estimated based on available input".
-                                - Never fabricate highly specific variant-level data without confidence.
-                                - If vehicle is discontinued, explicitly mention status.
-                                If exact variant cannot be confidently identified:
-                                Set Variant as: "Most Common Variant (Estimated)"
-
-                                POWERTRAIN DETERMINATION RULE:
-                                Determine whether the vehicle is ICE or EV using:
-                                - User text
-                                - Visible exhaust presence
-                                - EV badging
-                                - Charging port visibility
-                                If powertrain type cannot be confidently determined:
-                                Set Fuel Type as: "Estimated - Based on Market Variant"
-                                If EV → Fuel Type must be set as: Electric
-                                If ICE → Specify Petrol / Diesel / CNG / Hybrid as applicable
-
-                                STRICT RULES:
-                                - All prices in INR (₹)
-                                - Professional tone only
-                                - No conversational filler
-                                - No generic descriptions
-                                - Clean structured bullet format
-                                - Do NOT break format
-                                Ensure internal consistency between:
-                                - Fuel Type
-                                - Engine specifications
-                                - Efficiency section
-                                - Pricing range
-                                If input includes image:
-                                All technical specifications not directly visible in the image must be labeled:
-                                "Estimated - Based on Indian market data"
-                                If input is text-only:
-                                Use market data normally without over-labeling.
-
-                                Ensure numerical values remain within realistic Indian market ranges.
-                                Avoid unrealistic pricing or performance figures.
-                                Do not contradict previously stated values across sections.
-                                Do not omit any mandatory field in the defined structure.
-
-                                ---------------------------------------------------
-                                AUTOSAGE STRUCTURED VEHICLE INTELLIGENCE REPORT
-                                ---------------------------------------------------
-
-                                🔷 INPUT ANALYSIS
-                                - Input Type: (Text / Image / Both)
-                                - Identification Confidence: (High / Medium / Low)
-                                - Identification Notes:
-                                - Powertrain Determination Basis:
-
-
-                                🔷 VEHICLE IDENTITY
-                                - Brand:
-                                - Model:
-                                - Variant:
-                                - Vehicle Type:
-                                - Segment:
-                                - Fuel Type:
-                                - Launch Year (India):
-                                - Current Status: (Active / Discontinued)
-
-                                🔷 ENGINE & PERFORMANCE
-                                - Engine Options:
-                                - Engine Capacity:
-                                - Power Output (bhp):
-                                - Torque (Nm):
-                                - Transmission:
-                                - Drivetrain:
-                                - Performance Character:
-
-                                🔷 EFFICIENCY & RUNNING COST
-                                Include ONLY the relevant subsection (ICE or EV).
-                                Do NOT output both.
-                                Do not leave the selected subsection empty.
-
-                                (If ICE Vehicle)
-                                - ARAI Mileage:
-                                - Real-world Mileage:
-                                - Fuel Tank Capacity:
-                                - Estimated Cost per 1,000 km:
-
-                                (If EV)
-                                - Battery Capacity:
-                                - Claimed Range:
-                                - Real-world Range:
-                                - Charging Time:
-                                - Estimated Charging Cost per Full Charge:
-
-                                🔷 KEY FEATURES (Top 7)
-                                1.
-                                2.
-                                3.
-                                4.
-                                5.
-                                6.
-                                7.
-
-                                🔷 SAFETY & TECHNOLOGY
-                                - Airbags:
-                                - ABS / EBD:
-                                - ADAS Level:
-                                - NCAP Rating:
-                                - Advanced Safety Highlights:
-
-                                🔷 INTERIOR & PRACTICALITY
-                                - Seating Capacity:
-                                - Boot Space:
-                                - Infotainment System:
-                                - Connectivity Features:
-                                - Premium Highlights:
-
-                                🔷 PRICE & MARKET POSITION (India)
-                                - Ex-Showroom Price Range:
-                                - On-Road Price Range:
-                                - Primary Competitors:
-                                - Market Positioning:
-                                - Value Score (1-10):
-                                - If numerical data is approximate, use rounded values instead of precise decimals.
-
-                                🔷 OWNERSHIP EXPERIENCE
-                                - Service Interval:
-                                - Estimated Annual Maintenance Cost:
-                                - Warranty:
-                                - Spare Parts Cost Level:
-                                - Reliability Score (1-10):
-
-                                🔷 DEPRECIATION & RESALE
-                                - 3-Year Depreciation Estimate:
-                                - 5-Year Depreciation Estimate:
-                                - 10-Year Resale Value Estimate:
-                                - Resale Strength Score (1-10):
-
-                                🔷 BUYER FIT ANALYSIS
-                                - Ideal Buyer Profile:
-                                - Use Case Suitability:
-                                - Pros:
-                                - Cons:
-
-                                🔷 FINAL EXPERT VERDICT
-                                Provide a 4-line executive summary.
-
-                                ---------------------------------------------------
-
-                                ERROR HANDLING:
-                                If identification confidence is Low and model cannot be reasonably inferred:
-                                Return:
-                                "Vehicle identification insufficient. Please provide clearer image or full model name."
-
-                                Maintain strict formatting consistency.
-                                Ensure logical coherence across sections.
-                                Avoid speculative exaggeration.
-
-                                '''
-
-        image_input_data = input_image_setup(uploaded_image_tab3)
+        image_input_data = input_image_setup(prepared_tab3)
         if not image_input_data:
             st.warning("Please upload an Image")
         elif not user_prompt or not user_prompt.strip():
             st.warning("Please Enter Your Vehicle Query")
         else:
-            with st.spinner("Genearting intelligent Report"):    
-                final_prompt = prompt_and_image + f"\n\nUSER QUERY: \n{user_prompt}"
-                try:
-                    response = model.generate_content([final_prompt, *image_input_data])
-                    st.markdown(response.text)
-                except Exception as Exe:
-                    st.error(f"AI Generation Error: {str(Exe)}")
-                             
+            start_fusion_job(prepared_tab3, user_prompt, fusion_inputs)
+    show_followups("fusion", show_tab_output("fusion", fusion_inputs))
+
+# Debug panel: this session's latest requests and the process-wide counters
+if debug_mode:
+    with st.sidebar.expander("📊 Request Metrics", expanded=True):
+        recent = st.session_state.get("recent_traces", [])
+        if recent:
+            st.json(recent[-1])
+            st.dataframe(
+                [
+                    {"kind": t["kind"], "status": t["status"], "cache": t["cache"],
+                     "seconds": t["seconds"], "ttft": t["ttft_seconds"],
+                     "prompt tokens": t["prompt_tokens"], "output tokens": t["output_tokens"]}
+                    for t in reversed(recent)
+                ],
+                width="stretch"
+            )
+        else:
+            st.caption("No requests yet in this session.")
+        if config.SEMANTIC_CACHE:
+            st.caption("Similarity cache")
+            st.json(get_semantic_cache().summary())
+        st.caption("Session memory (this session / all sessions)")
+        st.json({"session": session_store().summary(), "process": get_store_registry().summary()})
+        st.caption("Background jobs")
+        st.json(get_jobs().summary())
+        if config.SINGLE_FLIGHT:
+            st.caption("Shared in-flight calls")
+            st.json(get_model().summary())
+        if get_warmer() is not None:
+            st.caption("Cache warm-up")
+            st.json(get_warmer().summary())
+        st.code(get_metrics().render(), language="text")
+
+# Script execution time of this rerun (read by benchmarks/startup.py)
+st.session_state["last_rerun_seconds"] = time.perf_counter() - rerun_started
@@ -0,0 +1 @@
+"""Helpers behind the AutoSage Streamlit app (app.py)."""
@@ -0,0 +1,395 @@
+"""Model backends behind the AutoSage tabs.
+
+Every backend exposes the subset of the google.generativeai GenerativeModel
+API the app uses::
+
+    generate_content(contents, stream=False, generation_config=None,
+                     request_options=None, system_instruction=None)
+
+returning a response with ``.text``, ``.parts`` and ``.usage_metadata`` (or,
+with ``stream=True``, an iterable of such chunks).
+
+``GeminiBackend`` talks to the real API. ``FakeBackend`` runs fully offline
+with configurable latency, token rate, stream chunking and failure injection,
+and can replay recorded responses, so latency and load problems can be
+reproduced deterministically on machines without network access. Pick one
+with AUTOSAGE_BACKEND=gemini|fake.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from autosage import config
+from autosage.structured import REPORT_SPECS, response_schema
+
+CHARS_PER_TOKEN = 4
+
+logger = logging.getLogger(__name__)
+
+
+def contents_digest(contents, system_instruction=None):
+    """Stable digest of a request's contents (text and image bytes)."""
+    digest = hashlib.sha256()
+    if system_instruction:
+        digest.update(system_instruction.encode("utf-8") + b"\x00")
+    parts = [contents] if isinstance(contents, str) else contents
+    for part in parts:
+        if isinstance(part, str):
+            digest.update(part.encode("utf-8"))
+        elif isinstance(part, dict) and "data" in part:
+            digest.update(hashlib.sha256(part["data"]).digest())
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _prompt_text(contents):
+    if isinstance(contents, str):
+        return contents
+    texts = []
+    for part in contents:
+        if isinstance(part, str):
+            texts.append(part)
+        elif isinstance(part, dict) and "parts" in part:
+            # A chat turn ({"role": ..., "parts": [...]})
+            texts.append(_prompt_text(part["parts"]))
+    return "\n".join(texts)
+
+
+def _is_chat(contents):
+    return isinstance(contents, list) and bool(contents) and all(
+        isinstance(part, dict) and "role" in part for part in contents
+    )
+
+
+def _usage(prompt_tokens, output_tokens, cached_tokens=0):
+    return SimpleNamespace(
+        prompt_token_count=prompt_tokens,
+        candidates_token_count=output_tokens,
+        cached_content_token_count=cached_tokens,
+        total_token_count=prompt_tokens + output_tokens,
+    )
+
+
+class GeminiBackend:
+    """google.generativeai GenerativeModel, imported and configured lazily.
+
+    Requests with a system instruction go to a model built for that
+    instruction. With ``context_cache_ttl`` the instruction is uploaded once
+    as explicit cached content and recreated shortly before it expires;
+    if the API refuses (e.g. the instruction is under the model's minimum
+    cacheable size) the plain system instruction is used instead.
+    """
+
+    def __init__(self, api_key, model_name, generation_config, context_cache_ttl=0):
+        # Deferred import: google.generativeai takes about a second to import
+        # and is only needed once the first report is requested.
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self._genai = genai
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self.context_cache_ttl = context_cache_ttl
+        self.model = genai.GenerativeModel(
+            model_name=model_name,
+            generation_config=generation_config
+        )
+        self._instruction_models = {}   # system instruction -> (model, refresh_at or None)
+        self._building = {}             # system instruction -> Event set once its build is done
+        self._lock = threading.Lock()
+
+    def _model_for(self, system_instruction):
+        if not system_instruction:
+            return self.model
+        while True:
+            with self._lock:
+                entry = self._instruction_models.get(system_instruction)
+                fresh = entry is not None and (entry[1] is None or time.time() < entry[1])
+                if fresh:
+                    return entry[0]
+                building = self._building.get(system_instruction)
+                if building is None:
+                    # This caller builds; the cache upload is a network call, so
+                    # it runs outside the lock and other instructions don't wait
+                    building = self._building[system_instruction] = threading.Event()
+                    break
+                if entry is not None:
+                    # Being refreshed: the old cache is still valid until it expires
+                    return entry[0]
+            building.wait()
+        try:
+            entry = self._build_model(system_instruction)
+            with self._lock:
+                self._instruction_models[system_instruction] = entry
+            return entry[0]
+        finally:
+            with self._lock:
+                del self._building[system_instruction]
+            building.set()
+
+    def _build_model(self, system_instruction):
+        if self.context_cache_ttl:
+            try:
+                from google.generativeai import caching
+
+                cached = caching.CachedContent.create(
+                    model=self.model_name,
+                    system_instruction=system_instruction,
+                    ttl=datetime.timedelta(seconds=self.context_cache_ttl),
+                )
+                model = self._genai.GenerativeModel.from_cached_content(
+                    cached_content=cached, generation_config=self.generation_config
+                )
+                # Recreate a little before the server drops it
+                return model, time.time() + self.context_cache_ttl * 0.9
+            except Exception as ex:
+                logger.warning("context caching unavailable, using a system instruction: %s", ex)
+        model = self._genai.GenerativeModel(
+            model_name=self.model_name,
+            generation_config=self.generation_config,
+            system_instruction=system_instruction,
+        )
+        return model, None
+
+    def generate_content(self, contents, stream=False, generation_config=None,
+                         request_options=None, system_instruction=None):
+        return self._model_for(system_instruction).generate_content(
+            contents, stream=stream, generation_config=generation_config,
+            request_options=request_options
+        )
+
+
+class FakeAPIError(RuntimeError):
+    """Injected upstream failure; ``code`` mimics the HTTP status."""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class _Chunk:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.parts = [text] if text else []
+        self.usage_metadata = usage_metadata
+
+
+class FakeBackend:
+    """Offline stand-in for Gemini.
+
+    latency             seconds before the first token
+    tokens_per_second   decode speed after the first token (0 = instant)
+    chunk_tokens        tokens per streamed chunk
+    output_tokens       length of synthesized text reports
+    section_tokens      if set, length per report section instead (so shorter
+                        prompts get shorter answers); max_output_tokens truncates either way
+    prefill_tokens_per_second  prompt processing speed for uncached input (0 = free)
+    context_cache       treat repeated system instructions as cached (not re-processed)
+    failure_rate        probability a call fails before any output (HTTP ``failure_code``)
+    stream_failure_rate probability a stream breaks halfway through
+    recordings          JSONL file of {"digest": ..., "text": ...} to replay
+    seed                makes latency jitter and failures reproducible
+    """
+
+    def __init__(self, latency=0.5, tokens_per_second=200.0, chunk_tokens=24,
+                 output_tokens=1200, failure_rate=0.0, failure_code=503,
+                 stream_failure_rate=0.0, jitter=0.0, recordings=None, seed=0,
+                 model_name="fake", prefill_tokens_per_second=0.0, context_cache=True,
+                 section_tokens=0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.context_cache = context_cache
+        self._cached_instructions = set()
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.output_tokens = output_tokens
+        self.section_tokens = section_tokens
+        self.failure_rate = failure_rate
+        self.failure_code = failure_code
+        self.stream_failure_rate = stream_failure_rate
+        self.jitter = jitter
+        self.model_name = model_name
+        self.recorded = load_recordings(recordings) if recordings else {}
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _roll(self):
+        with self._lock:
+            self.calls += 1
+            return self._random.random(), self._random.random(), self._random.uniform(-1, 1)
+
+    def generate_content(self, contents, stream=False, generation_config=None,
+                         request_options=None, system_instruction=None):
+        fail_roll, stream_roll, jitter_roll = self._roll()
+        first_token = max(0.0, self.latency * (1 + self.jitter * jitter_roll))
+        if fail_roll < self.failure_rate:
+            time.sleep(first_token)
+            raise FakeAPIError(self.failure_code, "injected failure")
+
+        text = self._response_text(contents, generation_config, system_instruction)
+        content_tokens = max(1, len(_prompt_text(contents)) // CHARS_PER_TOKEN)
+        system_tokens = len(system_instruction or "") // CHARS_PER_TOKEN
+        cached_tokens = system_tokens if self._cached(system_instruction) else 0
+        prompt_tokens = content_tokens + system_tokens
+        first_token += self._prefill_time(prompt_tokens - cached_tokens)
+        output_tokens = max(1, len(text) // CHARS_PER_TOKEN)
+        usage = _usage(prompt_tokens, output_tokens, cached_tokens)
+        if not stream:
+            time.sleep(first_token + self._decode_time(output_tokens))
+            return _Chunk(text, usage)
+        return self._stream(text, first_token, usage, stream_roll < self.stream_failure_rate)
+
+    def _cached(self, system_instruction):
+        """Whether the instruction was already cached (and cache it for next time)."""
+        if not (system_instruction and self.context_cache):
+            return False
+        with self._lock:
+            seen = system_instruction in self._cached_instructions
+            self._cached_instructions.add(system_instruction)
+        return seen
+
+    def _prefill_time(self, tokens):
+        if not self.prefill_tokens_per_second:
+            return 0.0
+        return tokens / self.prefill_tokens_per_second
+
+    def _decode_time(self, tokens):
+        if not self.tokens_per_second:
+            return 0.0
+        return tokens / self.tokens_per_second
+
+    def _stream(self, text, first_token, usage, break_midway):
+        size = self.chunk_tokens * CHARS_PER_TOKEN
+        chunks = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        time.sleep(first_token)
+        for index, piece in enumerate(chunks):
+            if break_midway and index == len(chunks) // 2:
+                raise FakeAPIError(503, "stream interrupted (injected)")
+            if index:
+                time.sleep(self._decode_time(self.chunk_tokens))
+            yield _Chunk(piece)
+        yield _Chunk("", usage)
+
+    def _response_text(self, contents, generation_config, system_instruction=None):
+        recorded = self.recorded.get(contents_digest(contents, system_instruction))
+        if recorded is not None:
+            return recorded
+        schema = (generation_config or {}).get("response_schema")
+        if schema:
+            return synthesize_json(schema)
+        # In a conversation the reply follows the last turn, not the history
+        prompt = _prompt_text(contents[-1:] if _is_chat(contents) else contents)
+        if system_instruction:
+            prompt = system_instruction + "\n\n" + prompt
+        text = synthesize_report(prompt, self.output_tokens, self.section_tokens)
+        max_tokens = (generation_config or {}).get("max_output_tokens")
+        return text[:max_tokens * CHARS_PER_TOKEN] if max_tokens else text
+
+
+def synthesize_json(schema):
+    """Schema-shaped JSON for any of the structured report types."""
+    for kind in REPORT_SPECS:
+        if response_schema(kind) == schema:
+            return json.dumps({
+                section: {
+                    key: 7 if field_type == "INTEGER" else
+                    (["Sample item 1", "Sample item 2"] if field_type == "ARRAY" else "Sample value")
+                    for key, _, field_type in fields
+                }
+                for section, _, fields in REPORT_SPECS[kind]
+            })
+    return json.dumps({})
+
+
+def synthesize_report(prompt, output_tokens, section_tokens=0):
+    """Markdown that follows the section headings found in the prompt."""
+    sections = re.findall(r"^🔷 (.+)$", prompt, flags=re.MULTILINE) or ["REPORT"]
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    if section_tokens:
+        output_tokens = section_tokens * len(sections)
+    per_section = max(1, output_tokens * CHARS_PER_TOKEN // len(sections))
+    filler = f"Sample analysis {digest}. "
+    lines = []
+    for title in sections:
+        body = (filler * (per_section // len(filler) + 1))[:per_section]
+        lines.append(f"🔷 {title}\n- {body.strip()}\n")
+    return "\n".join(lines)
+
+
+def load_recordings(path):
+    recorded = {}
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                record = json.loads(line)
+                recorded[record["digest"]] = record["text"]
+    return recorded
+
+
+class RecordingBackend:
+    """Passes calls through and appends each complete response to a JSONL file
+    that FakeBackend(recordings=...) can replay."""
+
+    def __init__(self, backend, path):
+        self.backend = backend
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        response = self.backend.generate_content(contents, stream=stream, **kwargs)
+        digest = contents_digest(contents, kwargs.get("system_instruction"))
+        if stream:
+            return self._record_stream(digest, response)
+        self._record(digest, response.text)
+        return response
+
+    def _record_stream(self, digest, response):
+        text = ""
+        for chunk in response:
+            if chunk.parts:
+                text += chunk.text
+            yield chunk
+        self._record(digest, text)
+
+    def _record(self, digest, text):
+        line = json.dumps({"digest": digest, "text": text}, ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+
+
+def build_backend(name=None):
+    """Backend selected by AUTOSAGE_BACKEND (or ``name``), configured from autosage.config."""
+    name = (name or config.BACKEND).lower()
+    if name == "fake":
+        backend = FakeBackend(
+            latency=config.FAKE_LATENCY,
+            tokens_per_second=config.FAKE_TOKENS_PER_SECOND,
+            failure_rate=config.FAKE_FAILURE_RATE,
+            stream_failure_rate=config.FAKE_STREAM_FAILURE_RATE,
+            recordings=config.FAKE_RECORDINGS,
+            seed=config.FAKE_SEED,
+            prefill_tokens_per_second=config.FAKE_PREFILL_TPS,
+            section_tokens=config.FAKE_SECTION_TOKENS,
+            context_cache=config.CONTEXT_CACHE_TTL > 0,
+        )
+    elif name == "gemini":
+        backend = GeminiBackend(
+            config.GOOGLE_API_KEY, config.MODEL_NAME, config.GENERATION_CONFIG,
+            context_cache_ttl=config.CONTEXT_CACHE_TTL
+        )
+    else:
+        raise ValueError(f"unknown backend {name!r} (expected 'gemini' or 'fake')")
+    if config.RECORD_PATH:
+        backend = RecordingBackend(backend, config.RECORD_PATH)
+    return backend
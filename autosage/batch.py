@@ -0,0 +1,291 @@
+"""Headless batch pipeline: pre-generate reports without the Streamlit UI.
+
+Uses the same request builders, caches and model calls as the tabs (Smart
+Vision goes through the same two-stage identification), so a batch run also
+warms the cache the app reads from.
+
+    # Smart Query reports for a CSV (columns: query, vehicle_type, purpose, id)
+    python -m autosage.batch queries inventory.csv --out reports.jsonl
+
+    # Smart Vision reports for a folder of photos (Smart Fusion with --query)
+    python -m autosage.batch images images/ --out vision.jsonl --parquet vision.parquet
+
+Results are appended to the JSONL file as each job finishes; rerunning the
+same command skips every job that already has an "ok" record, so a crashed
+run resumes where it stopped.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+
+from autosage import config, reports
+from autosage.cache import ImageReportCache, ResponseCache
+from autosage.backends import FakeBackend, build_backend
+from autosage.imaging import prepare_image
+from autosage.resilience import with_resilience
+from autosage.specs import apply_specs, open_configured_store
+from autosage.structured import StructuredOutputError, parse_report
+from autosage.vision import two_stage_report
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    inputs: dict
+
+
+# ---------------------------------
+# Job sources
+# ---------------------------------
+def _job_id(*parts):
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def query_jobs(csv_path, structured=False):
+    jobs = []
+    with open(csv_path, newline="", encoding="utf-8-sig") as handle:
+        for row in csv.DictReader(handle):
+            query = (row.get("query") or "").strip()
+            if not query:
+                continue
+            inputs = {
+                "query": query,
+                "vehicle_type": (row.get("vehicle_type") or "").strip() or None,
+                "purpose": (row.get("purpose") or "").strip() or None,
+            }
+            job_id = (row.get("id") or "").strip() or _job_id(
+                query, inputs["vehicle_type"] or "", inputs["purpose"] or "",
+                "json" if structured else "text"
+            )
+            jobs.append(Job(job_id, "query", inputs))
+    return jobs
+
+
+def image_jobs(directory, query=None, vehicle_type=None, purpose=None, structured=False):
+    kind = "fusion" if query else "vision"
+    jobs = []
+    for path in sorted(Path(directory).rglob("*")):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        inputs = {"image": str(path), "query": query,
+                  "vehicle_type": vehicle_type, "purpose": purpose}
+        job_id = _job_id(kind, str(path), query or "", "json" if structured else "text")
+        jobs.append(Job(job_id, kind, inputs))
+    return jobs
+
+
+def load_image(job):
+    return prepare_image(
+        Path(job.inputs["image"]).read_bytes(),
+        max_edge=config.IMAGE_MAX_EDGE,
+        max_bytes=config.IMAGE_MAX_BYTES,
+        fmt=config.IMAGE_FORMAT,
+        quality=config.IMAGE_QUALITY,
+        thumbnail_edge=config.THUMBNAIL_EDGE,
+    )
+
+
+def build_request(job, structured, spec_store=None):
+    """The single request for a job (Smart Vision's is the one-call image report)."""
+    inputs = job.inputs
+    if job.kind == "query":
+        return reports.query_request(
+            inputs["query"], inputs["vehicle_type"], inputs["purpose"], structured=structured,
+            spec_store=spec_store
+        )
+    prepared = load_image(job)
+    if job.kind == "vision":
+        return reports.vision_request(prepared, structured=structured)
+    return reports.fusion_request(
+        prepared, inputs["query"], inputs["vehicle_type"], inputs["purpose"],
+        structured=structured, spec_store=spec_store
+    )
+
+
+# ---------------------------------
+# Pipeline
+# ---------------------------------
+def read_records(out_path):
+    """Records of the JSONL log, skipping lines that don't parse."""
+    if not os.path.exists(out_path):
+        return
+    with open(out_path, encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut off by a crash
+
+
+def completed_ids(out_path):
+    """Job ids that already have a successful record (for resume)."""
+    return {
+        record["id"] for record in read_records(out_path) if record.get("status") == "ok"
+    }
+
+
+def drop_partial_line(out_path):
+    """Cut a line left half-written by a crash, so appended records start on a line of their own."""
+    if not os.path.exists(out_path):
+        return
+    with open(out_path, "rb+") as handle:
+        size = handle.seek(0, os.SEEK_END)
+        if not size:
+            return
+        handle.seek(size - 1)
+        if handle.read(1) == b"\n":
+            return
+        # Walk back to the last complete line
+        position = size
+        while position > 0:
+            step = min(64 * 1024, position)
+            handle.seek(position - step)
+            newline = handle.read(step).rfind(b"\n")
+            if newline != -1:
+                handle.truncate(position - step + newline + 1)
+                return
+            position -= step
+        handle.truncate(0)
+
+
+def run_job(job, model, response_cache, image_cache, structured, spec_store=None):
+    started = time.perf_counter()
+    record = {"id": job.id, "kind": job.kind, "inputs": job.inputs}
+    try:
+        if job.kind == "vision" and config.VISION_TWO_STAGE:
+            text, request, identity = two_stage_report(
+                model, response_cache, image_cache, load_image(job), structured=structured,
+                spec_store=spec_store, min_confidence=config.VISION_MIN_CONFIDENCE
+            )
+            if identity is not None:
+                record["identity"] = identity.name
+        else:
+            request = build_request(job, structured, spec_store)
+            text = reports.generate_report(model, response_cache, image_cache, request)
+        record["report"] = text
+        if request.spec is not None:
+            record["spec"] = request.spec.spec.name
+        if structured:
+            report = parse_report(job.kind, text)
+            if request.spec is not None:
+                apply_specs(report, request.spec)
+            record["structured"] = report.to_dict()
+        record["status"] = "ok"
+    except StructuredOutputError as ex:
+        record.update(status="error", error=f"invalid structured output: {ex}")
+    except Exception as ex:
+        record.update(status="error", error=f"{type(ex).__name__}: {ex}")
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    record["finished_at"] = time.time()
+    return record
+
+
+def run_pipeline(jobs, out_path, model, response_cache, image_cache,
+                 workers=4, structured=False, log=print, spec_store=None):
+    drop_partial_line(out_path)
+    done = completed_ids(out_path)
+    pending = [job for job in jobs if job.id not in done]
+    log(f"{len(jobs)} jobs, {len(jobs) - len(pending)} already done, {len(pending)} to run")
+
+    counts = {"ok": 0, "error": 0}
+    lock = threading.Lock()
+    with open(out_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_job, job, model, response_cache, image_cache, structured, spec_store)
+            for job in pending
+        ]
+        for future in as_completed(futures):
+            record = future.result()
+            with lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                counts[record["status"]] += 1
+            if record["status"] == "error":
+                log(f"  {record['id']}: {record['error']}")
+    log(f"finished: {counts['ok']} ok, {counts['error']} failed")
+    return counts
+
+
+def write_parquet(out_path, parquet_path):
+    """Latest record per job id from the JSONL log, as a Parquet table."""
+    import pandas as pd
+
+    frame = pd.DataFrame(list(read_records(out_path)))
+    frame = frame.drop_duplicates("id", keep="last")
+    for column in ("inputs", "structured"):
+        if column in frame:
+            frame[column] = frame[column].map(
+                lambda value: json.dumps(value, ensure_ascii=False)
+                if isinstance(value, dict) else None
+            )
+    frame.to_parquet(parquet_path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m autosage.batch", description="Pre-generate AutoSage reports."
+    )
+    sources = parser.add_subparsers(dest="source", required=True)
+    queries = sources.add_parser("queries", help="Smart Query reports from a CSV file")
+    queries.add_argument("csv", help="CSV with a 'query' column (optional: vehicle_type, purpose, id)")
+    images = sources.add_parser("images", help="Smart Vision / Fusion reports for a folder of photos")
+    images.add_argument("directory")
+    images.add_argument("--query", help="Run Smart Fusion with this query instead of Smart Vision")
+    images.add_argument("--vehicle-type")
+    images.add_argument("--purpose")
+    for sub in (queries, images):
+        sub.add_argument("--out", required=True, help="JSONL results file (appended to, used for resume)")
+        sub.add_argument("--parquet", help="Also write the results as a Parquet file")
+        sub.add_argument("--workers", type=int, default=4)
+        sub.add_argument("--structured", action="store_true", help="Use structured JSON reports")
+        sub.add_argument("--stub", action="store_true",
+                         help="Use the offline fake backend with no latency (no API calls)")
+        sub.add_argument("--cache", help="Response cache file (default: the app's cache; "
+                                         "in-memory with --stub)")
+    args = parser.parse_args(argv)
+
+    if args.source == "queries":
+        jobs = query_jobs(args.csv, args.structured)
+    else:
+        jobs = image_jobs(
+            args.directory, args.query, args.vehicle_type, args.purpose, args.structured
+        )
+
+    if args.stub:
+        model = FakeBackend(latency=0.05, tokens_per_second=0)
+    else:
+        if config.BACKEND == "gemini" and not config.GOOGLE_API_KEY:
+            parser.error("GOOGLE_API_KEY is not set (use --stub for an offline run)")
+        model = with_resilience(build_backend())
+    # Fake reports must never end up in the cache the app serves from
+    cache_path = args.cache or (":memory:" if args.stub else config.CACHE_PATH)
+    response_cache = ResponseCache(
+        cache_path, ttl_seconds=config.CACHE_TTL_SECONDS, max_bytes=config.CACHE_MAX_BYTES
+    )
+    image_cache = ImageReportCache(response_cache, max_distance=config.IMAGE_HASH_MAX_DISTANCE)
+
+    counts = run_pipeline(
+        jobs, args.out, model, response_cache, image_cache,
+        workers=args.workers, structured=args.structured,
+        log=lambda message: print(message, file=sys.stderr),
+        spec_store=open_configured_store(),
+    )
+    if args.parquet:
+        write_parquet(args.out, args.parquet)
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""Persistent report cache shared by every Streamlit session.
+
+Reports are stored in a local SQLite file so that a popular query answered
+for one user (or before a restart) is served to the next one without a
+model call. Entries expire after a TTL and the store is kept under a byte
+budget by evicting the least recently used rows.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from autosage import config, prompts
+from autosage.imaging import hamming_distance
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+CREATE TABLE IF NOT EXISTS image_index (
+    variant TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    phash TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (variant, digest)
+);
+"""
+
+
+def normalize_query(text):
+    """Fold case, punctuation and whitespace so equivalent queries share a key."""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def make_cache_key(kind, query, vehicle_type, purpose, model_name, generation_config,
+                   context=None):
+    """Build a stable key from the normalized query and everything that shapes the answer.
+
+    The prompt templates (``prompts.PROMPTS_DIGEST``) and whether they are
+    sent as system instructions are part of every key, so a prompt change
+    never serves reports written for the old one. ``context`` is extra
+    prompt material (e.g. grounding specs), left out when empty.
+    """
+    payload = {
+        "kind": kind,
+        "prompts": prompts.PROMPTS_DIGEST,
+        "system_instructions": config.SYSTEM_INSTRUCTIONS,
+        "query": normalize_query(query),
+        "vehicle_type": normalize_query(vehicle_type),
+        "purpose": normalize_query(purpose),
+        "model": model_name,
+        "config": generation_config,
+    }
+    if context:
+        payload["context"] = context
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite backed key/value store with TTL and size-bounded LRU eviction."""
+
+    def __init__(self, path, ttl_seconds, max_bytes):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # One connection per process; Streamlit sessions run on separate
+        # threads, so access is serialized with the lock above.
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                (now, key),
+            )
+            return value
+
+    def expires_in(self, key):
+        """Seconds until ``key`` expires (negative once it has), or None if it isn't cached."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0] + self.ttl_seconds - time.time()
+
+    def set(self, key, value):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, 0)",
+                (key, value, size, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute(
+            "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"entries": entries, "bytes": total}
+
+
+class ImageReportCache:
+    """Content addressed cache for reports generated from an uploaded photo.
+
+    Reports live in the shared ResponseCache (so they follow the same TTL and
+    LRU budget); this class only keeps an index from (prompt variant, image
+    digest, perceptual hash) to the response key. A lookup first tries the
+    exact digest and then falls back to the closest perceptual hash within
+    ``max_distance`` bits, so re-encoded or resized copies also hit.
+    """
+
+    def __init__(self, responses, max_distance=6):
+        self.responses = responses
+        self.max_distance = max_distance
+
+    @staticmethod
+    def _key(variant, digest):
+        return hashlib.sha256(f"{variant}:{digest}".encode("utf-8")).hexdigest()
+
+    def get(self, variant, digest, phash):
+        value = self.responses.get(self._key(variant, digest))
+        if value is not None:
+            return value
+        with self.responses._lock:
+            rows = self.responses._conn.execute(
+                "SELECT phash, key FROM image_index WHERE variant = ?", (variant,)
+            ).fetchall()
+        candidates = sorted(
+            (hamming_distance(phash, row_phash), key) for row_phash, key in rows
+        )
+        for distance, key in candidates:
+            if distance > self.max_distance:
+                break
+            value = self.responses.get(key)
+            if value is not None:
+                return value
+        return None
+
+    def set(self, variant, digest, phash, value):
+        key = self._key(variant, digest)
+        self.responses.set(key, value)
+        with self.responses._lock:
+            conn = self.responses._conn
+            conn.execute(
+                "INSERT OR REPLACE INTO image_index (variant, digest, phash, key) "
+                "VALUES (?, ?, ?, ?)",
+                (variant, digest, phash, key),
+            )
+            # Drop index rows whose report has been evicted or expired
+            conn.execute(
+                "DELETE FROM image_index WHERE key NOT IN (SELECT key FROM responses)"
+            )
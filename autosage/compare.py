@@ -0,0 +1,100 @@
+"""Side-by-side comparison of several vehicles (Smart Query compare mode).
+
+Each vehicle gets its own structured report; the calls run concurrently on a
+bounded thread pool so the wait is close to the slowest single report.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# "/" is left alone: it is part of names like "Pulsar N160 / N250" and "CNG/Petrol"
+SPLIT_PATTERN = re.compile(r"\s+(?:vs\.?|versus|and)\s+|[,;|\n]+", re.IGNORECASE)
+# Wording in front of the first name: "Compare Creta and Seltos"
+LEADING_WORDS = re.compile(
+    r"^\s*(?:please\s+)?(?:compare|comparison\s+(?:of|between)|difference\s+between|between)\s*:?\s+",
+    re.IGNORECASE,
+)
+
+# (row label, section key, field key) - the same keys exist in every query report
+COMPARISON_ROWS = [
+    ("Brand", "overview", "brand"),
+    ("Model", "overview", "model"),
+    ("Variant", "overview", "variant"),
+    ("Fuel Type", "engine", "fuel_type"),
+    ("Ex-Showroom Range", "price", "ex_showroom_range"),
+    ("On-Road Range", "price", "on_road_range"),
+    ("ARAI Mileage", "efficiency", "arai_mileage"),
+    ("Real-world Mileage", "efficiency", "real_world_mileage"),
+    ("Claimed Range (EV)", "efficiency", "claimed_range"),
+    ("NCAP Rating", "safety", "ncap_rating"),
+    ("Safety Score", "safety", "safety_score"),
+    ("Value Score", "price", "value_score"),
+    ("Reliability Score", "ownership", "reliability_score"),
+    ("Resale Strength", "depreciation", "resale_strength"),
+    ("Practicality Score", "practicality", "practicality_score"),
+]
+
+SCORE_FIELDS = [
+    ("safety", "safety_score"),
+    ("price", "value_score"),
+    ("ownership", "reliability_score"),
+    ("depreciation", "resale_strength"),
+    ("practicality", "practicality_score"),
+]
+
+
+def parse_vehicle_list(text, limit):
+    """Split "Creta vs Seltos, Brezza" into unique vehicle names (at most ``limit``)."""
+    names, seen = [], set()
+    for part in SPLIT_PATTERN.split(LEADING_WORDS.sub("", text or "")):
+        name = part.strip(" .-?")
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names[:limit]
+
+
+def run_concurrently(fn, items, max_workers):
+    """Call fn(item) for every item on a bounded pool.
+
+    Returns (result, error) pairs in input order; one failing vehicle doesn't
+    take the whole comparison down.
+    """
+    def safe(item):
+        try:
+            return fn(item), None
+        except Exception as ex:
+            return None, ex
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as pool:
+        return list(pool.map(safe, items))
+
+
+def overall_score(report):
+    scores = [report.value(section, key) for section, key in SCORE_FIELDS]
+    scores = [score for score in scores if isinstance(score, int)]
+    if not scores:
+        return None
+    return round(sum(scores) / len(scores), 1)
+
+
+def _cell(value):
+    if value is None or value == "" or value == []:
+        return "—"
+    if isinstance(value, list):
+        return ", ".join(value)
+    return str(value)
+
+
+def comparison_table(names, reports):
+    """DataFrame with one column per vehicle and one row per compared field."""
+    import pandas as pd
+
+    columns = {}
+    for name, report in zip(names, reports):
+        cells = [_cell(report.value(section, key)) for _, section, key in COMPARISON_ROWS]
+        cells.append(_cell(overall_score(report)))
+        columns[name] = cells
+    index = [label for label, _, _ in COMPARISON_ROWS] + ["Overall Score (avg)"]
+    return pd.DataFrame(columns, index=index)
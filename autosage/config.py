@@ -0,0 +1,168 @@
+"""Runtime settings for AutoSage.
+
+Everything can be overridden through environment variables (or the .env
+file, which app.py loads before importing this module).
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+# Model backend: "gemini" (real API) or "fake" (offline stand-in, see autosage/backends.py)
+BACKEND = os.getenv("AUTOSAGE_BACKEND", "gemini")
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+MODEL_NAME = os.getenv("AUTOSAGE_MODEL", "models/gemini-2.5-flash")
+GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "max_output_tokens": 4096
+}
+
+# Send each tab's fixed role, rules and template once as a system instruction
+# instead of inside every prompt, kept as an explicit Gemini context cache for
+# CONTEXT_CACHE_TTL seconds (0 = plain system instruction, no explicit cache)
+SYSTEM_INSTRUCTIONS = os.getenv("AUTOSAGE_SYSTEM_INSTRUCTIONS", "1") != "0"
+CONTEXT_CACHE_TTL = _env_int("AUTOSAGE_CONTEXT_CACHE_TTL", 3600)
+
+# Fake backend behaviour (only used with AUTOSAGE_BACKEND=fake)
+FAKE_LATENCY = _env_float("AUTOSAGE_FAKE_LATENCY", 0.5)
+FAKE_TOKENS_PER_SECOND = _env_float("AUTOSAGE_FAKE_TPS", 200.0)
+# Prompt processing speed (uncached input tokens per second, 0 = free)
+FAKE_PREFILL_TPS = _env_float("AUTOSAGE_FAKE_PREFILL_TPS", 0.0)
+# Synthesized report length per section (0 = a fixed length per report)
+FAKE_SECTION_TOKENS = _env_int("AUTOSAGE_FAKE_SECTION_TOKENS", 0)
+FAKE_FAILURE_RATE = _env_float("AUTOSAGE_FAKE_FAILURE_RATE", 0.0)
+FAKE_STREAM_FAILURE_RATE = _env_float("AUTOSAGE_FAKE_STREAM_FAILURE_RATE", 0.0)
+FAKE_RECORDINGS = os.getenv("AUTOSAGE_FAKE_RECORDINGS")
+FAKE_SEED = _env_int("AUTOSAGE_FAKE_SEED", 0)
+# Append every model response to this JSONL file (replayable by the fake backend)
+RECORD_PATH = os.getenv("AUTOSAGE_RECORD_PATH")
+
+# Quota and retries (shared by every session in the process)
+GEMINI_RPM = _env_int("AUTOSAGE_GEMINI_RPM", 60)
+GEMINI_TPM = _env_int("AUTOSAGE_GEMINI_TPM", 1_000_000)
+MAX_RETRIES = _env_int("AUTOSAGE_MAX_RETRIES", 4)
+REQUEST_DEADLINE_SECONDS = _env_int("AUTOSAGE_REQUEST_DEADLINE", 90)
+BREAKER_FAILURES = _env_int("AUTOSAGE_BREAKER_FAILURES", 5)
+BREAKER_RESET_SECONDS = _env_int("AUTOSAGE_BREAKER_RESET", 30)
+
+# Identical model calls already in flight (from any session) are shared
+# instead of repeated (AUTOSAGE_SINGLE_FLIGHT=0 disables)
+SINGLE_FLIGHT = os.getenv("AUTOSAGE_SINGLE_FLIGHT", "1") != "0"
+
+# Response cache (kept in memory with the fake backend so fake reports never
+# reach the cache real users are served from)
+CACHE_PATH = os.getenv(
+    "AUTOSAGE_CACHE_PATH", ":memory:" if BACKEND == "fake" else ".autosage_cache.sqlite3"
+)
+CACHE_TTL_SECONDS = _env_int("AUTOSAGE_CACHE_TTL", 24 * 60 * 60)
+CACHE_MAX_BYTES = _env_int("AUTOSAGE_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+# Image report cache: max differing bits between perceptual hashes that still
+# count as the same photo (out of 64)
+IMAGE_HASH_MAX_DISTANCE = _env_int("AUTOSAGE_IMAGE_HASH_DISTANCE", 6)
+
+# Upload preprocessing
+IMAGE_MAX_EDGE = _env_int("AUTOSAGE_IMAGE_MAX_EDGE", 1536)
+IMAGE_MAX_BYTES = _env_int("AUTOSAGE_IMAGE_MAX_BYTES", 500_000)
+IMAGE_FORMAT = os.getenv("AUTOSAGE_IMAGE_FORMAT", "JPEG")  # JPEG or WEBP
+IMAGE_QUALITY = _env_int("AUTOSAGE_IMAGE_QUALITY", 85)
+THUMBNAIL_EDGE = _env_int("AUTOSAGE_THUMBNAIL_EDGE", 400)
+
+# Smart Query comparison mode
+COMPARE_MAX_VEHICLES = _env_int("AUTOSAGE_COMPARE_MAX_VEHICLES", 5)
+COMPARE_WORKERS = _env_int("AUTOSAGE_COMPARE_WORKERS", 4)
+
+# Two-stage Smart Vision: identify the vehicle from the photo with a short
+# JSON call, then generate (or reuse) a text report for that identity. Below
+# VISION_MIN_CONFIDENCE the full image report is generated instead.
+VISION_TWO_STAGE = os.getenv("AUTOSAGE_VISION_TWO_STAGE", "1") != "0"
+VISION_MIN_CONFIDENCE = _env_int("AUTOSAGE_VISION_MIN_CONFIDENCE", 6)
+VISION_IDENTIFY_MAX_TOKENS = _env_int("AUTOSAGE_VISION_IDENTIFY_MAX_TOKENS", 256)
+
+# Smart Fusion sectioned mode: identity first, then the other section groups
+# as concurrent calls with their own output budget (text reports only)
+FUSION_SECTIONED = os.getenv("AUTOSAGE_FUSION_SECTIONED", "0") == "1"
+FUSION_SECTION_WORKERS = _env_int("AUTOSAGE_FUSION_SECTION_WORKERS", 4)
+FUSION_IDENTITY_MAX_TOKENS = _env_int("AUTOSAGE_FUSION_IDENTITY_MAX_TOKENS", 512)
+FUSION_GROUP_MAX_TOKENS = _env_int("AUTOSAGE_FUSION_GROUP_MAX_TOKENS", 1536)
+
+# Background report jobs: worker threads shared by all sessions, how long the
+# script waits for a new job before handing it to the poll (long enough for a
+# cache hit), how often a page polls its running job, and how long finished
+# jobs are kept for pickup
+JOB_WORKERS = _env_int("AUTOSAGE_JOB_WORKERS", 8)
+JOB_INLINE_WAIT_SECONDS = _env_float("AUTOSAGE_JOB_INLINE_WAIT_SECONDS", 0.05)
+JOB_POLL_SECONDS = _env_float("AUTOSAGE_JOB_POLL_SECONDS", 0.5)
+JOB_KEEP_SECONDS = _env_int("AUTOSAGE_JOB_KEEP_SECONDS", 900)
+
+# What each session keeps between reruns (finished reports, follow-ups and
+# prepared uploads, up to IMAGE_MAX_BYTES each) is stored compressed within a
+# per-session byte budget, under a process-wide cap
+SESSION_BUDGET_BYTES = _env_int("AUTOSAGE_SESSION_BUDGET", 1536 * 1024)
+SESSION_STORE_MAX_BYTES = _env_int("AUTOSAGE_SESSION_STORE_MAX_BYTES", 64 * 1024 * 1024)
+
+# Follow-up questions under a report: answer budget, and the conversation
+# history sent verbatim before older turns are folded into a running summary
+# (the most recent FOLLOWUP_KEEP_TURNS exchanges always stay verbatim)
+FOLLOWUP_MAX_TOKENS = _env_int("AUTOSAGE_FOLLOWUP_MAX_TOKENS", 768)
+FOLLOWUP_HISTORY_TOKENS = _env_int("AUTOSAGE_FOLLOWUP_HISTORY_TOKENS", 1500)
+FOLLOWUP_KEEP_TURNS = _env_int("AUTOSAGE_FOLLOWUP_KEEP_TURNS", 2)
+FOLLOWUP_SUMMARY_MAX_TOKENS = _env_int("AUTOSAGE_FOLLOWUP_SUMMARY_MAX_TOKENS", 256)
+# Exchanges shown under a report (older ones stay in the summary only)
+FOLLOWUP_MAX_TURNS = _env_int("AUTOSAGE_FOLLOWUP_MAX_TURNS", 20)
+
+# Smart Query similarity cache: reuse the report of an earlier, differently
+# worded question above this cosine similarity (AUTOSAGE_SEMANTIC_CACHE=0 disables)
+SEMANTIC_CACHE = os.getenv("AUTOSAGE_SEMANTIC_CACHE", "1") != "0"
+SEMANTIC_THRESHOLD = _env_float("AUTOSAGE_SEMANTIC_THRESHOLD", 0.9)
+SEMANTIC_MAX_ENTRIES = _env_int("AUTOSAGE_SEMANTIC_MAX_ENTRIES", 100_000)
+
+# Local vehicle spec store used to ground Smart Query / Smart Fusion prompts
+# (see autosage/specs.py). An empty AUTOSAGE_SPECS_CSV with the default
+# in-memory database turns grounding off.
+SPECS_CSV = os.getenv(
+    "AUTOSAGE_SPECS_CSV",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "vehicle_specs.csv")
+)
+SPECS_DB = os.getenv("AUTOSAGE_SPECS_DB", ":memory:")
+SPECS_MIN_SCORE = _env_float("AUTOSAGE_SPECS_MIN_SCORE", 0.8)
+
+# Per-request metrics: JSONL trace log (empty to disable) and an optional
+# Prometheus /metrics endpoint (0 = off)
+METRICS_LOG = os.getenv("AUTOSAGE_METRICS_LOG", ".autosage_metrics.jsonl")
+# The log is rotated past METRICS_LOG_MAX_BYTES, keeping METRICS_LOG_BACKUPS
+# old files (.1 is the newest). What users typed is only logged when asked
+# for, or when warm-up mines the log for popular queries.
+METRICS_LOG_MAX_BYTES = _env_int("AUTOSAGE_METRICS_LOG_MAX_BYTES", 16 * 1024 * 1024)
+METRICS_LOG_BACKUPS = _env_int("AUTOSAGE_METRICS_LOG_BACKUPS", 3)
+METRICS_LOG_INPUTS = os.getenv(
+    "AUTOSAGE_METRICS_LOG_INPUTS", os.getenv("AUTOSAGE_WARMUP_FROM_LOG", "0")
+) == "1"
+METRICS_PORT = _env_int("AUTOSAGE_METRICS_PORT", 0)
+# 0.0.0.0 lets a Prometheus server on another host scrape it
+METRICS_HOST = os.getenv("AUTOSAGE_METRICS_HOST", "127.0.0.1")
+
+# Cache warm-up (autosage/warmup.py): targets CSV and/or the most asked
+# queries in METRICS_LOG, generated in the background when the app starts and
+# again every WARMUP_INTERVAL_SECONDS (0 = only at startup). Reports expiring
+# within WARMUP_REFRESH_SECONDS are regenerated; a run stops at its token budget.
+WARMUP_TARGETS = os.getenv("AUTOSAGE_WARMUP_TARGETS", "")
+WARMUP_FROM_LOG = os.getenv("AUTOSAGE_WARMUP_FROM_LOG", "0") == "1"
+WARMUP_TOP = _env_int("AUTOSAGE_WARMUP_TOP", 50)
+WARMUP_LOG_HOURS = _env_float("AUTOSAGE_WARMUP_LOG_HOURS", 7 * 24)
+WARMUP_WORKERS = _env_int("AUTOSAGE_WARMUP_WORKERS", 2)
+WARMUP_MAX_TOKENS = _env_int("AUTOSAGE_WARMUP_MAX_TOKENS", 500_000)
+WARMUP_REFRESH_SECONDS = _env_int("AUTOSAGE_WARMUP_REFRESH", 2 * 60 * 60)
+WARMUP_INTERVAL_SECONDS = _env_int("AUTOSAGE_WARMUP_INTERVAL", 0)
@@ -0,0 +1,107 @@
+"""Follow-up questions about a finished report.
+
+A follow-up ("what about the diesel variant?") used to be a new full-template
+request that rewrote the whole report. Here it is a turn in a conversation
+that opens with the report itself, so the model only writes the answer
+(within FOLLOWUP_MAX_TOKENS instead of a 4096-token report).
+
+So that input tokens don't grow with every turn, only the latest exchanges
+are sent verbatim: once they pass FOLLOWUP_HISTORY_TOKENS, all but the last
+FOLLOWUP_KEEP_TURNS are folded into a short running summary by one small
+extra call, and later turns send the summary instead. Per-turn input is then
+bounded by the report plus the summary and budget, however long the chat.
+"""
+import hashlib
+import logging
+from dataclasses import dataclass, field, replace
+
+from autosage import config, reports
+from autosage.backends import CHARS_PER_TOKEN
+from autosage.generation import cached_generate, generate_text
+from autosage.metrics import Trace
+
+logger = logging.getLogger(__name__)
+
+
+def report_id(report):
+    """Identifies the report a conversation belongs to."""
+    return hashlib.sha256(report.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class Conversation:
+    report_id: str
+    summary: str = ""        # running summary of the turns before context_from
+    turns: list = field(default_factory=list)   # (question, answer) pairs, oldest first
+    context_from: int = 0    # turns from this index on are still sent verbatim
+
+    @classmethod
+    def about(cls, report):
+        return cls(report_id(report))
+
+    @property
+    def context_turns(self):
+        return self.turns[self.context_from:]
+
+    def history_tokens(self):
+        """Estimated tokens of the summary and the verbatim turns."""
+        chars = len(self.summary) + sum(len(q) + len(a) for q, a in self.context_turns)
+        return chars // CHARS_PER_TOKEN
+
+
+def ask(model, response_cache, report, conversation, question, on_chunk=None, trace=None):
+    """Answer ``question`` about ``report``; returns (answer, updated conversation).
+
+    The conversation passed in is not modified. If the history is over
+    budget afterwards, it is compacted before it is returned.
+    """
+    request = reports.followup_request(
+        report, question, conversation.summary, conversation.context_turns
+    )
+    answer = cached_generate(
+        model, response_cache, request.contents, cache_key=request.cache_key,
+        on_chunk=on_chunk, generation_config=request.generation_config, trace=trace,
+        system_instruction=request.system_instruction
+    )
+    conversation = replace(conversation, turns=conversation.turns + [(question, answer)])
+    return answer, trim(compact(model, conversation, trace))
+
+
+def compact(model, conversation, trace=None):
+    """Fold the older verbatim turns into the summary once the history is over budget.
+
+    A failed summary call keeps the turns verbatim; the next turn tries again.
+    """
+    keep = max(0, config.FOLLOWUP_KEEP_TURNS)
+    fold = len(conversation.context_turns) - keep
+    if fold <= 0 or conversation.history_tokens() <= config.FOLLOWUP_HISTORY_TOKENS:
+        return conversation
+    request = reports.summary_request(conversation.summary, conversation.context_turns[:fold])
+    summary_trace = Trace("summary")
+    try:
+        summary = generate_text(
+            model, request.contents, generation_config=request.generation_config,
+            trace=summary_trace, system_instruction=request.system_instruction
+        )
+    except Exception as ex:
+        logger.warning("follow-up summary failed: %s: %s", type(ex).__name__, ex)
+        return conversation
+    finally:
+        summary_trace.finish()
+        if trace is not None:
+            trace.add("summary", summary_trace.duration)
+            trace.add_usage(summary_trace)
+    return replace(
+        conversation, summary=summary.strip(), context_from=conversation.context_from + fold
+    )
+
+
+def trim(conversation):
+    """Drop the oldest exchanges from display past FOLLOWUP_MAX_TURNS (only ones
+    already in the summary, so nothing the model still sees is lost)."""
+    drop = min(len(conversation.turns) - config.FOLLOWUP_MAX_TURNS, conversation.context_from)
+    if drop <= 0:
+        return conversation
+    return replace(
+        conversation, turns=conversation.turns[drop:], context_from=conversation.context_from - drop
+    )
@@ -0,0 +1,84 @@
+"""Model calls shared by the AutoSage tabs."""
+import time
+
+
+class PartialResponseError(Exception):
+    """A streamed report broke off partway; keeps the text received so far."""
+
+    def __init__(self, partial_text, error):
+        super().__init__(str(error))
+        self.partial_text = partial_text
+        self.error = error
+
+
+def generate_text(model, contents, on_chunk=None, generation_config=None, trace=None,
+                  system_instruction=None):
+    """Generate a report and return its text.
+
+    Without ``on_chunk`` this is a single blocking call. With it, the
+    response is streamed and ``on_chunk`` receives the text accumulated so
+    far after every chunk. If the stream fails after some text has arrived,
+    PartialResponseError is raised carrying that text.
+    ``generation_config`` overrides the model's defaults for this call and
+    ``system_instruction`` carries the static part of the prompt.
+    ``trace`` (an autosage.metrics.Trace) receives network wait and decode
+    timings and the token usage reported by the model.
+    """
+    options = {}
+    if generation_config is not None:
+        options["generation_config"] = generation_config
+    if system_instruction:
+        options["system_instruction"] = system_instruction
+    started = time.perf_counter()
+    if on_chunk is None:
+        response = model.generate_content(contents, **options)
+        if trace is not None:
+            trace.add("network_wait", time.perf_counter() - started)
+            trace.first_token()
+            trace.record_usage(getattr(response, "usage_metadata", None))
+        return response.text
+
+    text = ""
+    first_chunk_at = None
+    try:
+        response = model.generate_content(contents, stream=True, **options)
+        for chunk in response:
+            if trace is not None and getattr(chunk, "usage_metadata", None) is not None:
+                trace.record_usage(chunk.usage_metadata)
+            # Chunks without parts (e.g. the final finish_reason chunk) carry no text
+            if not chunk.parts:
+                continue
+            text += chunk.text
+            if first_chunk_at is None:
+                first_chunk_at = time.perf_counter()
+                if trace is not None:
+                    trace.add("network_wait", first_chunk_at - started)
+                    trace.first_token()
+            on_chunk(text)
+    except Exception as ex:
+        if text:
+            raise PartialResponseError(text, ex) from ex
+        raise
+    finally:
+        if trace is not None and first_chunk_at is not None:
+            trace.add("decode", time.perf_counter() - first_chunk_at)
+    return text
+
+
+def cached_generate(model, response_cache, contents, cache_key=None, on_chunk=None,
+                    generation_config=None, trace=None, system_instruction=None):
+    """generate_text behind the shared response cache (no Streamlit calls, thread safe)."""
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        if trace is not None:
+            trace.cache = "miss" if cached is None else "hit"
+        if cached is not None:
+            return cached
+    text = generate_text(
+        model, contents, on_chunk=on_chunk, generation_config=generation_config, trace=trace,
+        system_instruction=system_instruction
+    )
+    # Only complete, successful reports are cached
+    if cache_key:
+        response_cache.set(cache_key, text)
+    return text
@@ -0,0 +1,121 @@
+"""Image helpers for the Smart Vision and Smart Fusion tabs.
+
+Uploads go through ``prepare_image`` once: the photo is decoded a single
+time, oriented, stripped of metadata, downscaled and re-encoded, and the
+result feeds both the preview thumbnail and the Gemini payload.
+"""
+import hashlib
+import io
+import time
+from dataclasses import dataclass
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime_type: str
+    thumbnail: bytes
+    width: int
+    height: int
+    original_bytes: int
+    digest: str
+    phash: str
+    encode_seconds: float = 0.0     # time prepare_image took (paid once per upload)
+
+    @property
+    def payload_bytes(self):
+        return len(self.data)
+
+
+def perceptual_hash(image, hash_size=8):
+    """Difference hash (dHash) of a PIL image as a 16 character hex string.
+
+    Re-encoded, recompressed or resized copies of the same photo land within
+    a few bits of each other, unlike the exact byte digest.
+    """
+    from PIL import Image
+
+    gray = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(gray.getdata())
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def hamming_distance(hash_a, hash_b):
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+def _flatten(image):
+    """Convert to RGB, putting transparent areas on white instead of black."""
+    from PIL import Image
+
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _encode(image, fmt, quality, max_bytes, min_quality=40):
+    """Encode without metadata, lowering quality until the size budget is met."""
+    while True:
+        buffer = io.BytesIO()
+        image.save(buffer, format=fmt, quality=quality, optimize=True)
+        data = buffer.getvalue()
+        if len(data) <= max_bytes or quality <= min_quality:
+            return data
+        quality -= 10
+
+
+def prepare_image(data, max_edge=1536, max_bytes=500_000, fmt="JPEG",
+                  quality=85, thumbnail_edge=400):
+    """Decode, orient, downscale and re-encode an uploaded photo."""
+    from PIL import Image, ImageOps
+
+    started = time.perf_counter()
+    fmt = fmt.upper()
+    image = Image.open(io.BytesIO(data))
+    source_format = image.format
+    has_metadata = bool(image.getexif()) or "icc_profile" in image.info
+    if image.format == "JPEG":
+        # Let libjpeg decode at a reduced scale instead of full resolution
+        image.draft("RGB", (max_edge, max_edge))
+    image = ImageOps.exif_transpose(image)
+    image = _flatten(image)
+    source_size = image.size
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    payload = _encode(image, fmt, quality, max_bytes)
+    # Small, clean uploads already in the target format are cheaper as-is
+    if (source_format == fmt and not has_metadata and image.size == source_size
+            and len(data) <= min(len(payload), max_bytes)):
+        payload = data
+    preview = image.copy()
+    preview.thumbnail((thumbnail_edge, thumbnail_edge), Image.LANCZOS)
+    thumbnail = _encode(preview, "JPEG", 80, max_bytes)
+
+    return PreparedImage(
+        data=payload,
+        mime_type=MIME_TYPES[fmt],
+        thumbnail=thumbnail,
+        width=image.width,
+        height=image.height,
+        original_bytes=len(data),
+        digest=hashlib.sha256(data).hexdigest(),
+        phash=perceptual_hash(image),
+        encode_seconds=time.perf_counter() - started,
+    )
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024 or unit == "MB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
@@ -0,0 +1,168 @@
+"""Background report jobs.
+
+Analyses run on a process-wide worker pool instead of inside the Streamlit
+script run. A session only keeps the job ID and polls its status and
+partial text, so a rerun no longer interrupts (and throws away) a call that
+is already being paid for, one user can run several tabs at once, and a job
+can be cancelled.
+
+Job functions must not touch Streamlit: they receive the Job and get
+everything else (model, caches, inputs) resolved by the script beforehand.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job by progress() once cancellation has been requested."""
+
+
+class Job:
+    def __init__(self, job_id, kind):
+        self.id = job_id
+        self.kind = kind
+        self.status = QUEUED
+        self.text = ""          # partial output published by the job, for progress display
+        self.result = None
+        self.error = None
+        self.traces = []        # metrics.Trace objects the job recorded
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._future = None
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def wait(self, timeout):
+        """Block up to ``timeout`` seconds for the job to finish; returns ``done``."""
+        self._finished.wait(timeout)
+        return self.done
+
+    def progress(self, text):
+        """Publish partial text (usable as an on_chunk callback).
+
+        Raises JobCancelled once the job has been cancelled, which stops a
+        streamed response at its next chunk.
+        """
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+        self.text = text
+
+    def cancel(self):
+        """Request cancellation. Queued jobs never start; running jobs stop at the
+        next progress() call, and a result that still arrives is discarded."""
+        self._cancel.set()
+        if self._future is not None and self._future.cancel():
+            self.status = CANCELLED
+            self.finished = time.time()
+            self._finished.set()
+
+
+class JobQueue:
+    """Process-wide pool of report jobs, looked up by ID (thread safe).
+
+    Finished jobs are kept for ``keep_seconds`` so a session that comes back
+    late (or reruns in the middle) still finds its result.
+    """
+
+    def __init__(self, max_workers=8, keep_seconds=900):
+        self.max_workers = max_workers
+        self.keep_seconds = keep_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="autosage-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn):
+        """Run ``fn(job)`` on the pool; its return value becomes ``job.result``."""
+        job = Job(uuid.uuid4().hex[:12], kind)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job._future = self._pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        if job.cancelled:
+            job.status = CANCELLED
+            job.finished = time.time()
+            job._finished.set()
+            return
+        job.status = RUNNING
+        job.started = time.time()
+        try:
+            result = fn(job)
+        except Exception as ex:
+            job.error = ex
+            job.status = CANCELLED if job.cancelled else FAILED
+        else:
+            if job.cancelled:
+                job.status = CANCELLED
+            else:
+                job.result = result
+                job.status = DONE
+        finally:
+            job.finished = time.time()
+            job._finished.set()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def discard(self, job_id):
+        """Cancel a job and forget it at once, without waiting for a running call
+        to return; the worker drops whatever it produces."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def release(self, job_id):
+        """Forget a finished job once its result has been picked up."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.done:
+                del self._jobs[job_id]
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_seconds
+        for job_id in [
+            job_id for job_id, job in self._jobs.items()
+            if job.done and job.finished is not None and job.finished < cutoff
+        ]:
+            del self._jobs[job_id]
+
+    def summary(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.max_workers, **counts}
@@ -0,0 +1,269 @@
+"""Per-request timing, token usage and cache metrics.
+
+Each analysis carries a Trace that collects spans (prompt build, image
+encode, network wait, decode), time to first token, token counts
+from the response's usage_metadata and whether the cache answered. Finished
+traces go to a MetricsRegistry, which appends them to a size-capped, rotated
+JSONL log and keeps Prometheus-style counters and histograms for the
+process, optionally served over HTTP at /metrics. User inputs are left out
+of the log unless ``log_inputs`` is set.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds; reports can take tens of seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+
+class Trace:
+    """Timings and usage of one analysis (one tab click, or one compared vehicle)."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.ttft = None            # seconds from the start of the analysis to the first text
+        self.prompt_tokens = None
+        self.cached_tokens = None   # part of prompt_tokens served from a context cache
+        self.output_tokens = None
+        self.cache = None           # "hit" / "miss" / "semantic"; None when no cache was consulted
+        self.inputs = None          # Smart Query inputs (logged only with log_inputs, for warm-up)
+        self.status = "ok"
+        self.error = None
+        self.duration = None
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    def record_usage(self, usage):
+        prompt = getattr(usage, "prompt_token_count", None)
+        cached = getattr(usage, "cached_content_token_count", None)
+        output = getattr(usage, "candidates_token_count", None)
+        if prompt:
+            self.prompt_tokens = prompt
+        if cached:
+            self.cached_tokens = cached
+        if output:
+            self.output_tokens = output
+
+    def add_usage(self, other):
+        """Count a sub-request's tokens (e.g. one section group) towards this trace."""
+        for name in ("prompt_tokens", "cached_tokens", "output_tokens"):
+            value = getattr(other, name)
+            if value:
+                setattr(self, name, (getattr(self, name) or 0) + value)
+
+    def fail(self, error):
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def finish(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.started
+        return self
+
+    def to_dict(self):
+        data = {
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+            "cache": self.cache,
+            "seconds": _round(self.duration),
+            "ttft_seconds": _round(self.ttft),
+            "spans": {name: _round(seconds) for name, seconds in self.spans.items()},
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "output_tokens": self.output_tokens,
+        }
+        if self.inputs is not None:
+            data["inputs"] = self.inputs
+        return data
+
+
+def _round(seconds):
+    return None if seconds is None else round(seconds, 4)
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def log_files(log_path):
+    """The trace log and its rotated backups that exist, oldest first."""
+    paths = []
+    index = 1
+    while os.path.exists(f"{log_path}.{index}"):
+        paths.append(f"{log_path}.{index}")
+        index += 1
+    paths.reverse()
+    if os.path.exists(log_path):
+        paths.append(log_path)
+    return paths
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class MetricsRegistry:
+    """Process-wide counters and histograms fed by finished traces (thread safe)."""
+
+    def __init__(self, log_path=None, max_bytes=0, backups=1, log_inputs=False):
+        self.log_path = log_path
+        self.max_bytes = max_bytes      # rotate the log past this size (0 = never)
+        self.backups = max(1, backups)
+        self.log_inputs = log_inputs
+        self.counters = {}      # (name, labels) -> value
+        self.histograms = {}    # (name, labels) -> Histogram
+        self._lock = threading.Lock()
+        self._server = None
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(labels))
+        with self._lock:
+            self.histograms.setdefault(key, Histogram()).observe(value)
+
+    def record(self, trace):
+        """Fold a finished trace into the metrics and append it to the log."""
+        trace.finish()
+        kind = ("kind", trace.kind)
+        self.inc("autosage_requests_total", [kind, ("status", trace.status)])
+        if trace.cache:
+            self.inc("autosage_cache_requests_total", [kind, ("result", trace.cache)])
+        if trace.prompt_tokens:
+            self.inc("autosage_tokens_total", [kind, ("type", "prompt")], trace.prompt_tokens)
+        if trace.cached_tokens:
+            self.inc("autosage_tokens_total", [kind, ("type", "cached")], trace.cached_tokens)
+        if trace.output_tokens:
+            self.inc("autosage_tokens_total", [kind, ("type", "output")], trace.output_tokens)
+        self.observe("autosage_request_seconds", [kind], trace.duration)
+        if trace.ttft is not None:
+            self.observe("autosage_ttft_seconds", [kind], trace.ttft)
+        for name, seconds in trace.spans.items():
+            self.observe("autosage_span_seconds", [kind, ("span", name)], seconds)
+        if self.log_path:
+            self._log(trace)
+
+    def _log(self, trace):
+        record = dict(trace.to_dict(), ts=round(time.time(), 3))
+        if not self.log_inputs:
+            record.pop("inputs", None)
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self.max_bytes and _size(self.log_path) + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.log_path, "a", encoding="utf-8") as handle:
+                handle.write(line)
+
+    def _rotate(self):
+        # log -> log.1 -> log.2 ...; the oldest backup is dropped
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.log_path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.log_path}.{index + 1}")
+        if os.path.exists(self.log_path):
+            os.replace(self.log_path, f"{self.log_path}.1")
+
+    def render(self):
+        """Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+            histograms = [(key, list(h.counts), h.total, h.count) for key, h in histograms]
+        lines = []
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                lines.append(f"# TYPE {name} counter")
+                seen.add(name)
+            lines.append(f"{_series(name, labels)} {value}")
+        for (name, labels), counts, total, count in histograms:
+            if name not in seen:
+                lines.append(f"# TYPE {name} histogram")
+                seen.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += bucket_count
+                bucket = _series(f"{name}_bucket", labels + (("le", bound),))
+                lines.append(f"{bucket} {cumulative}")
+            lines.append(f"{_series(name + '_sum', labels)} {total:.6f}")
+            lines.append(f"{_series(name + '_count', labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve render() at http://host:port/metrics from a daemon thread.
+
+        If the port can't be bound (say, another process has it), logs a
+        warning and returns None; the app runs on without the endpoint.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as ex:
+            logger.warning("metrics endpoint not started on %s:%s: %s", host, port, ex)
+            return None
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
@@ -0,0 +1,301 @@
+"""Report requests shared by the Streamlit tabs and the headless tools.
+
+A ReportRequest carries everything one report needs: the contents sent to
+the model, the generation config and its cache identity. Building requests
+in one place keeps app.py, the batch pipeline and the other tools on the
+same prompts and, just as important, on the same cache keys.
+"""
+from dataclasses import dataclass
+
+from autosage import config, prompts
+from autosage.backends import contents_digest
+from autosage.cache import make_cache_key
+from autosage.generation import cached_generate, generate_text
+from autosage.structured import json_generation_config
+
+DEFAULT_VEHICLE = "Not Specified"
+# Spellings match what the tabs have always sent; they are part of cache keys
+QUERY_DEFAULT_PURPOSE = "Genearal analysis"
+FUSION_DEFAULT_PURPOSE = "General Analysis"
+
+
+@dataclass
+class ReportRequest:
+    kind: str                # "query", "vision", "fusion", ...
+    contents: object         # prompt string, [prompt, image part] or chat turns
+    generation_config: dict
+    cache_key: str           # response key (text) or prompt variant (image reports)
+    image: object = None     # PreparedImage for vision / fusion
+    spec: object = None      # specs.SpecMatch the prompt was grounded with
+    system_instruction: str = None   # static instructions sent apart from the contents
+    groups: list = None      # SectionGroups written after this one (sectioned fusion)
+    group_context: str = None   # per-request text every section group is sent
+
+
+@dataclass
+class SectionGroup:
+    name: str
+    sections: list           # FUSION_SECTIONS titles, in template order
+    system_instruction: str
+    generation_config: dict
+
+
+def report_config(kind, structured=False):
+    if structured:
+        return json_generation_config(kind, config.GENERATION_CONFIG)
+    return config.GENERATION_CONFIG
+
+
+def image_part(prepared):
+    return {"mime_type": prepared.mime_type, "data": prepared.data}
+
+
+def match_spec(spec_store, query):
+    return spec_store.match(query) if spec_store is not None else None
+
+
+def query_request(query, vehicle_type=None, purpose=None, structured=False, spec_store=None):
+    vehicle_type = vehicle_type or DEFAULT_VEHICLE
+    purpose = purpose or QUERY_DEFAULT_PURPOSE
+    generation_config = report_config("query", structured)
+    spec = match_spec(spec_store, query)
+    specs = spec.context() if spec else None
+    if config.SYSTEM_INSTRUCTIONS:
+        system_instruction = prompts.QUERY_SYSTEM_JSON if structured else prompts.QUERY_SYSTEM
+        contents = prompts.build_query_content(
+            vehicle_type, purpose, query, structured=structured, specs=specs
+        )
+    else:
+        system_instruction = None
+        contents = prompts.build_query_prompt(
+            vehicle_type, purpose, query, structured=structured, specs=specs
+        )
+    return ReportRequest(
+        kind="query",
+        contents=contents,
+        generation_config=generation_config,
+        cache_key=make_cache_key(
+            "query", query, vehicle_type, purpose, config.MODEL_NAME, generation_config,
+            context=specs
+        ),
+        spec=spec,
+        system_instruction=system_instruction,
+    )
+
+
+def vision_request(prepared, structured=False):
+    generation_config = report_config("vision", structured)
+    if config.SYSTEM_INSTRUCTIONS:
+        system_instruction = prompts.VISION_SYSTEM_JSON if structured else prompts.VISION_SYSTEM
+        prompt = prompts.VISION_REQUEST
+    else:
+        system_instruction = None
+        prompt = prompts.VISION_PROMPT_JSON if structured else prompts.VISION_PROMPT
+    return ReportRequest(
+        kind="vision",
+        contents=[prompt, image_part(prepared)],
+        generation_config=generation_config,
+        cache_key=make_cache_key("vision", "", "", "", config.MODEL_NAME, generation_config),
+        image=prepared,
+        system_instruction=system_instruction,
+    )
+
+
+def identify_request(prepared):
+    """First stage of two-stage Smart Vision: a short JSON identification of the photo."""
+    generation_config = dict(
+        json_generation_config("identify", config.GENERATION_CONFIG),
+        max_output_tokens=config.VISION_IDENTIFY_MAX_TOKENS
+    )
+    contents, system_instruction = _split_system(
+        prompts.VISION_IDENTIFY_REQUEST, prompts.VISION_IDENTIFY_SYSTEM
+    )
+    return ReportRequest(
+        kind="identify",
+        contents=[contents, image_part(prepared)],
+        generation_config=generation_config,
+        cache_key=make_cache_key("identify", "", "", "", config.MODEL_NAME, generation_config),
+        image=prepared,
+        system_instruction=system_instruction,
+    )
+
+
+def vision_text_request(identity, structured=False, spec_store=None):
+    """Second stage: a text-only vision report keyed on the identified vehicle,
+    so every photo of the same vehicle shares it."""
+    generation_config = report_config("vision", structured)
+    spec = match_spec(spec_store, identity.query)
+    specs = spec.context() if spec else None
+    content = prompts.build_vision_text_content(
+        identity.brand, identity.model, identity.variant, identity.vehicle_type,
+        identity.fuel_type, structured=structured, specs=specs
+    )
+    system = prompts.VISION_TEXT_SYSTEM_JSON if structured else prompts.VISION_TEXT_SYSTEM
+    contents, system_instruction = _split_system(content, system)
+    return ReportRequest(
+        kind="vision",
+        contents=contents,
+        generation_config=generation_config,
+        cache_key=make_cache_key(
+            "vision_text", identity.query, identity.vehicle_type, "", config.MODEL_NAME,
+            generation_config, context=specs
+        ),
+        spec=spec,
+        system_instruction=system_instruction,
+    )
+
+
+def fusion_request(prepared, query, vehicle_type=None, purpose=None, structured=False,
+                   spec_store=None):
+    vehicle_type = vehicle_type or DEFAULT_VEHICLE
+    purpose = purpose or FUSION_DEFAULT_PURPOSE
+    generation_config = report_config("fusion", structured)
+    spec = match_spec(spec_store, query)
+    specs = spec.context() if spec else None
+    if config.SYSTEM_INSTRUCTIONS:
+        system_instruction = prompts.FUSION_SYSTEM_JSON if structured else prompts.FUSION_SYSTEM
+        prompt = prompts.build_fusion_content(
+            vehicle_type, purpose, query, structured=structured, specs=specs
+        )
+    else:
+        system_instruction = None
+        prompt = prompts.build_fusion_prompt(
+            vehicle_type, purpose, query, structured=structured, specs=specs
+        )
+    return ReportRequest(
+        kind="fusion",
+        contents=[prompt, image_part(prepared)],
+        generation_config=generation_config,
+        cache_key=make_cache_key(
+            "fusion", query, vehicle_type, purpose, config.MODEL_NAME, generation_config,
+            context=specs
+        ),
+        image=prepared,
+        spec=spec,
+        system_instruction=system_instruction,
+    )
+
+
+def sectioned_fusion_request(prepared, query, vehicle_type=None, purpose=None, spec_store=None):
+    """Smart Fusion split into section groups (text reports only).
+
+    The request itself is the identity group, sent with the photo; the
+    other groups are in ``request.groups`` and go out once it is known.
+    """
+    vehicle_type = vehicle_type or DEFAULT_VEHICLE
+    purpose = purpose or FUSION_DEFAULT_PURPOSE
+    spec = match_spec(spec_store, query)
+    specs = spec.context() if spec else None
+    context = prompts.build_fusion_content(vehicle_type, purpose, query, specs=specs)
+    group_config = dict(config.GENERATION_CONFIG, max_output_tokens=config.FUSION_GROUP_MAX_TOKENS)
+    groups = [
+        SectionGroup(name, sections, prompts.FUSION_GROUP_SYSTEM[name], group_config)
+        for name, sections in prompts.FUSION_GROUPS
+    ]
+    identity = groups.pop(0)
+    identity.generation_config = dict(
+        config.GENERATION_CONFIG, max_output_tokens=config.FUSION_IDENTITY_MAX_TOKENS
+    )
+    contents, system_instruction = _split_system(context, identity.system_instruction)
+    return ReportRequest(
+        kind="fusion",
+        contents=[contents, image_part(prepared)],
+        generation_config=identity.generation_config,
+        cache_key=make_cache_key(
+            "fusion_sections", query, vehicle_type, purpose, config.MODEL_NAME,
+            [identity.generation_config, group_config], context=specs
+        ),
+        image=prepared,
+        spec=spec,
+        system_instruction=system_instruction,
+        groups=groups,
+        group_context=context,
+    )
+
+
+def section_contents(request, group, identity):
+    """(contents, system_instruction) for one section group of a sectioned request."""
+    # Without the 🔷 markers the identity reads as context, not as sections to repeat
+    identity = identity.replace("🔷 ", "")
+    content = request.group_context + "\n\n" + prompts.FUSION_IDENTITY.format(identity=identity)
+    return _split_system(content, group.system_instruction)
+
+
+def followup_request(report, question, summary="", turns=()):
+    """A follow-up question about ``report``, as a conversation.
+
+    The report (and the summary of earlier turns, if any) opens the
+    conversation, followed by the ``turns`` still sent verbatim as
+    (question, answer) pairs and the new question. Only the answer is
+    generated, within FOLLOWUP_MAX_TOKENS.
+    """
+    generation_config = dict(config.GENERATION_CONFIG, max_output_tokens=config.FOLLOWUP_MAX_TOKENS)
+    context = prompts.FOLLOWUP_REPORT.format(report=report)
+    if summary:
+        context += "\n\n" + prompts.FOLLOWUP_SUMMARY.format(summary=summary)
+    context, system_instruction = _split_system(context, prompts.FOLLOWUP_SYSTEM)
+    history = [_turn("user", context), _turn("model", prompts.FOLLOWUP_ACK)]
+    for asked, answer in turns:
+        history += [_turn("user", asked), _turn("model", answer)]
+    return ReportRequest(
+        kind="followup",
+        contents=history + [_turn("user", question)],
+        generation_config=generation_config,
+        cache_key=make_cache_key(
+            "followup", question, "", "", config.MODEL_NAME, generation_config,
+            context=contents_digest(history, system_instruction)
+        ),
+        system_instruction=system_instruction,
+    )
+
+
+def summary_request(summary, turns):
+    """Fold (question, answer) ``turns`` into a conversation's running summary."""
+    generation_config = dict(
+        config.GENERATION_CONFIG, max_output_tokens=config.FOLLOWUP_SUMMARY_MAX_TOKENS
+    )
+    contents, system_instruction = _split_system(
+        prompts.build_summary_content(summary, turns), prompts.SUMMARY_SYSTEM
+    )
+    return ReportRequest(
+        kind="summary",
+        contents=contents,
+        generation_config=generation_config,
+        cache_key="",
+        system_instruction=system_instruction,
+    )
+
+
+def _turn(role, text):
+    return {"role": role, "parts": [text]}
+
+
+def _split_system(content, system_instruction):
+    if config.SYSTEM_INSTRUCTIONS:
+        return content, system_instruction
+    return system_instruction + "\n\n" + content, None
+
+
+def generate_report(model, response_cache, image_cache, request, on_chunk=None, trace=None):
+    """Serve a request from the cache, or generate and cache it."""
+    if request.image is None:
+        return cached_generate(
+            model, response_cache, request.contents, cache_key=request.cache_key,
+            on_chunk=on_chunk, generation_config=request.generation_config, trace=trace,
+            system_instruction=request.system_instruction
+        )
+
+    prepared = request.image
+    cached = image_cache.get(request.cache_key, prepared.digest, prepared.phash)
+    if trace is not None:
+        trace.cache = "miss" if cached is None else "hit"
+        trace.add("image_encode", prepared.encode_seconds)
+    if cached is not None:
+        return cached
+    text = generate_text(
+        model, request.contents, on_chunk=on_chunk,
+        generation_config=request.generation_config, trace=trace,
+        system_instruction=request.system_instruction
+    )
+    image_cache.set(request.cache_key, prepared.digest, prepared.phash, text)
+    return text
@@ -0,0 +1,252 @@
+"""Quota-aware access to the model: rate limiting, retries and a circuit breaker.
+
+Every session in the process shares one ResilientModel, so bursts from many
+sessions are smoothed against the Gemini RPM / TPM quota instead of hitting
+it. Retryable upstream errors (429, 5xx, timeouts) are retried with
+exponential backoff and full jitter inside a per-request deadline, and after
+repeated failures the breaker opens so requests fail fast until the upstream
+recovers.
+"""
+import math
+import random
+import threading
+import time
+
+from autosage import config
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Rough token estimates used to reserve TPM quota before a call
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1000
+
+
+class QuotaExceededError(RuntimeError):
+    """The request could not get quota before its deadline."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The upstream has been failing; requests are rejected without a call."""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Retries ran out of time."""
+
+
+def is_retryable(ex):
+    # google.api_core exceptions carry the HTTP status in .code
+    code = getattr(ex, "code", None)
+    if isinstance(code, int) and code in RETRYABLE_STATUS:
+        return True
+    return isinstance(ex, (ConnectionError, TimeoutError))
+
+
+def estimate_tokens(contents):
+    if isinstance(contents, str):
+        return max(1, len(contents) // CHARS_PER_TOKEN)
+    total = 0
+    for part in contents:
+        if isinstance(part, str):
+            total += len(part) // CHARS_PER_TOKEN
+        elif isinstance(part, dict) and "data" in part:
+            total += IMAGE_TOKENS
+        elif isinstance(part, dict) and "parts" in part:
+            total += estimate_tokens(part["parts"])
+    return max(1, total)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate_per_minute``."""
+
+    def __init__(self, rate_per_minute, burst_seconds=15):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1, timeout=None):
+        """Take ``amount`` tokens, waiting at most ``timeout`` seconds.
+
+        Requests larger than the bucket are allowed to drive it into debt
+        rather than wait forever. Raises QuotaExceededError straight away when
+        the wait would outlast the timeout instead of sleeping for nothing.
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, (amount - self.tokens) / self.rate)
+            if timeout is not None and wait > timeout:
+                raise QuotaExceededError(
+                    f"quota wait of {wait:.1f}s exceeds the remaining {timeout:.1f}s"
+                )
+            # Reserve now; later callers queue up behind this reservation
+            self.tokens -= amount
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def adjust(self, delta):
+        """Give back (negative delta) or charge extra tokens after the fact."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets acquired together."""
+
+    def __init__(self, rpm, tpm, burst_seconds=15):
+        self.requests = TokenBucket(rpm, burst_seconds)
+        self.tokens = TokenBucket(tpm, burst_seconds)
+
+    def acquire(self, tokens, timeout=None):
+        started = time.monotonic()
+        self.requests.acquire(1, timeout)
+        remaining = None if timeout is None else timeout - (time.monotonic() - started)
+        try:
+            self.tokens.acquire(tokens, remaining)
+        except QuotaExceededError:
+            self.requests.adjust(-1)
+            raise
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive upstream failures.
+
+    While open every call is rejected; after ``reset_timeout`` seconds a single
+    trial call is let through (half-open) and its outcome closes or reopens
+    the breaker.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half-open" and self.trial_running):
+                retry_in = self.reset_timeout - (time.monotonic() - self.opened_at)
+                raise CircuitOpenError(
+                    f"model service unavailable, retrying in {max(0.0, retry_in):.0f}s"
+                )
+            if state == "half-open":
+                self.trial_running = True
+
+    def release(self):
+        """The admitted call never reached the upstream (e.g. no quota)."""
+        with self._lock:
+            self.trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+
+class ResilientModel:
+    """Wraps a model's generate_content with quota, retries, deadline and breaker."""
+
+    def __init__(self, model, limiter, breaker, max_retries=4, base_delay=1.0,
+                 max_delay=20.0, deadline=90.0, expected_output_tokens=2000):
+        self.model = model
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.expected_output_tokens = expected_output_tokens
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def generate_content(self, contents, stream=False, deadline=None, **kwargs):
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        # System instructions count against TPM too, cached or not
+        estimate = estimate_tokens(contents) + self.expected_output_tokens
+        if kwargs.get("system_instruction"):
+            estimate += estimate_tokens(kwargs["system_instruction"])
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError("model request deadline exceeded")
+            self.breaker.before_call()
+            try:
+                self.limiter.acquire(estimate, timeout=remaining)
+            except QuotaExceededError:
+                self.breaker.release()
+                raise
+            try:
+                response = self.model.generate_content(
+                    contents, stream=stream,
+                    request_options={"timeout": deadline_at - time.monotonic()},
+                    **kwargs
+                )
+            except Exception as ex:
+                if not is_retryable(ex):
+                    # The upstream answered (bad request, auth, safety...); it isn't down
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                attempt += 1
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if attempt > self.max_retries or time.monotonic() + delay >= deadline_at:
+                    raise
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self._reconcile(response, estimate, stream)
+            return response
+
+    def _reconcile(self, response, estimate, stream):
+        # Streamed usage is only known once the stream is consumed; keep the estimate
+        if stream:
+            return
+        usage = getattr(response, "usage_metadata", None)
+        used = getattr(usage, "total_token_count", None)
+        if isinstance(used, int) and used > 0:
+            self.limiter.tokens.adjust(used - estimate)
+
+
+def with_resilience(model):
+    """Wrap ``model`` using the quota and retry settings from autosage.config."""
+    limiter = RateLimiter(config.GEMINI_RPM, config.GEMINI_TPM)
+    breaker = CircuitBreaker(
+        failure_threshold=config.BREAKER_FAILURES,
+        reset_timeout=config.BREAKER_RESET_SECONDS,
+    )
+    return ResilientModel(
+        model, limiter, breaker,
+        max_retries=config.MAX_RETRIES,
+        deadline=config.REQUEST_DEADLINE_SECONDS,
+        # Reports rarely use the full output budget; usage_metadata corrects this
+        expected_output_tokens=math.ceil(config.GENERATION_CONFIG["max_output_tokens"] / 2),
+    )
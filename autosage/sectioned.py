@@ -0,0 +1,88 @@
+"""Smart Fusion reports written as concurrent section groups.
+
+The full twelve-section report is one long sequential decode that can hit
+max_output_tokens before the verdict. In sectioned mode the identity
+sections are generated first, with the photo; the remaining groups
+(performance / efficiency, safety / interior, price / ownership / resale,
+verdict) are then requested in parallel, each with its own output budget
+and the identity as a shared header, and joined back in template order.
+Wall-clock time is the identity call plus the slowest group.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from autosage import prompts, reports
+from autosage.generation import PartialResponseError, generate_text
+from autosage.metrics import Trace
+
+# The identity prompt's answer when the vehicle can't be recognised
+INSUFFICIENT = "vehicle identification insufficient"
+
+
+def assemble(parts):
+    """Report text from the group texts available so far (None = not written)."""
+    header = prompts.render_header(prompts.FUSION_TITLE)
+    return "\n\n".join([header] + [part for part in parts if part])
+
+
+def generate_sectioned(model, image_cache, request, on_section=None, on_chunk=None,
+                       trace=None, max_workers=4):
+    """Serve a sectioned fusion request from the cache, or generate and cache it.
+
+    ``on_chunk`` streams the identity group; ``on_section(index, text)`` is
+    called from the calling thread as each group completes (0 is the
+    identity, then ``request.groups`` in order). A failing group doesn't stop
+    the others: PartialResponseError is raised afterwards with the sections
+    that did arrive, and nothing is cached.
+    """
+    prepared = request.image
+    cached = image_cache.get(request.cache_key, prepared.digest, prepared.phash)
+    if trace is not None:
+        trace.cache = "miss" if cached is None else "hit"
+        trace.add("image_encode", prepared.encode_seconds)
+    if cached is not None:
+        return cached
+
+    identity = generate_text(
+        model, request.contents, on_chunk=on_chunk,
+        generation_config=request.generation_config, trace=trace,
+        system_instruction=request.system_instruction
+    ).strip()
+    parts = [identity] + [None] * len(request.groups)
+    if on_section is not None:
+        on_section(0, identity)
+
+    errors = []
+    if INSUFFICIENT not in identity.lower():
+        def write(group):
+            contents, system_instruction = reports.section_contents(request, group, identity)
+            group_trace = Trace(group.name)
+            text = generate_text(
+                model, contents, generation_config=group.generation_config,
+                trace=group_trace, system_instruction=system_instruction
+            )
+            return text.strip(), group_trace.finish()
+
+        workers = max(1, min(max_workers, len(request.groups)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(write, group): index
+                for index, group in enumerate(request.groups, start=1)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    parts[index], group_trace = future.result()
+                except Exception as ex:
+                    errors.append(ex)
+                    continue
+                if trace is not None:
+                    trace.add(f"section_{group_trace.kind}", group_trace.duration)
+                    trace.add_usage(group_trace)
+                if on_section is not None:
+                    on_section(index, parts[index])
+
+    text = assemble(parts)
+    if errors:
+        raise PartialResponseError(text, errors[0])
+    image_cache.set(request.cache_key, prepared.digest, prepared.phash, text)
+    return text
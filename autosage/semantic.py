@@ -0,0 +1,264 @@
+"""Similarity cache for Smart Query: reuse reports for differently phrased questions.
+
+Queries are canonicalized (synonyms, stop words, prices such as "₹100000",
+"1,00,000" or "100k" folded to "1lakh", "₹1.5L" to "1_5lakh"), embedded locally with signed,
+hashed word and character n-gram features, and kept in a NumPy index
+partitioned by everything else that shapes the answer (vehicle type,
+purpose, output mode, matched vehicle). A lookup returns the response-cache
+key of the most similar earlier query above a threshold.
+
+Small partitions are searched exhaustively. Larger ones go through
+random-hyperplane LSH tables with single-bit multi-probe, so lookup cost
+depends on bucket sizes rather than on the number of entries.
+"""
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+from autosage import reports
+from autosage.cache import normalize_query
+
+# Multi-word phrases first; applied to the normalized text
+PHRASES = [
+    ("two wheeler", "bike"), ("2 wheeler", "bike"), ("electric vehicle", "electric"),
+    ("less than", "under"), ("up to", "under"), ("not more than", "under"),
+    ("fuel efficiency", "mileage"), ("fuel economy", "mileage"), ("fuel efficient", "mileage"),
+    ("on road", "onroad"),
+]
+SYNONYMS = {
+    "motorcycle": "bike", "motorcycles": "bike", "motorbike": "bike", "motorbikes": "bike",
+    "bikes": "bike", "scooty": "scooter", "scooters": "scooter", "cars": "car", "suvs": "suv",
+    "top": "best", "good": "best", "greatest": "best", "finest": "best", "recommended": "best",
+    "below": "under", "within": "under", "upto": "under", "max": "under", "maximum": "under",
+    "ev": "electric", "evs": "electric", "kmpl": "mileage", "economical": "mileage",
+    "cheap": "affordable", "budget": "affordable", "price": "cost", "prices": "cost",
+}
+STOP_WORDS = {
+    "a", "an", "the", "please", "me", "i", "my", "we", "want", "need", "for", "of", "to",
+    "is", "are", "which", "what", "suggest", "recommend", "show", "tell", "about", "in",
+    "india", "indian", "with", "some", "any", "can", "you", "give", "list", "option",
+    "options", "rs", "inr", "rupees",
+}
+
+MONEY = re.compile(
+    r"(?P<symbol>₹|\brs\.?|\binr)?\s*(?P<amount>\d[\d,]*(?:\.\d+)?)\s*"
+    r"(?P<unit>lakhs?|lacs?|l|k|thousand|crores?|cr)?\b",
+    re.IGNORECASE,
+)
+# "L" is also litres ("1.5L engine"), so it only means lakh next to a currency
+# symbol, right after a price bound ("below 15L") or in a query about money
+CURRENCY_WORDS = re.compile(r"₹|\b(rs|inr|rupees?|price|prices|budget|cost|costs)\b", re.IGNORECASE)
+PRICE_BOUND = re.compile(
+    r"\b(under|below|within|upto|up to|around|less than|max|maximum)\s*$", re.IGNORECASE
+)
+# ... unless the next word says it is a capacity ("1.5L turbo petrol")
+CAPACITY_WORDS = re.compile(
+    r"\s*(engine|motor|turbo|petrol|diesel|cng|displacement|tank|boot)\b", re.IGNORECASE
+)
+UNITS = {"l": 1e5, "lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5, "k": 1e3,
+         "thousand": 1e3, "cr": 1e7, "crore": 1e7, "crores": 1e7}
+
+
+def _money(match, about_money):
+    unit = (match.group("unit") or "").lower()
+    amount = float(match.group("amount").replace(",", "") or 0)
+    # Bare numbers are model names ("Classic 350") or years unless clearly rupees
+    if not unit and not match.group("symbol") and amount < 10_000:
+        return match.group(0)
+    if unit == "l" and (
+            CAPACITY_WORDS.match(match.string, match.end()) or not (
+                match.group("symbol") or about_money
+                or PRICE_BOUND.search(match.string, 0, match.start()))):
+        return match.group(0)
+    rupees = amount * UNITS.get(unit, 1)
+    # normalize_query drops the decimal point, so it is spelled "_" ("1_5lakh")
+    return f" {rupees / 1e5:g}lakh ".replace(".", "_")
+
+
+def canonicalize(query):
+    """Query text with synonyms, stop words and price formats folded."""
+    about_money = bool(CURRENCY_WORDS.search(query or ""))
+    text = MONEY.sub(lambda match: _money(match, about_money), query or "")
+    text = normalize_query(text)
+    for phrase, replacement in PHRASES:
+        text = re.sub(rf"\b{phrase}\b", replacement, text)
+    words = [SYNONYMS.get(word, word) for word in text.split()]
+    return " ".join(word for word in words if word not in STOP_WORDS)
+
+
+def _hash(feature):
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+def embed(query, dim=256):
+    """L2-normalized hashed n-gram embedding of the canonical query."""
+    words = canonicalize(query).split()
+    vector = np.zeros(dim, dtype=np.float32)
+    features = [(f"w:{word}", 1.0) for word in words]
+    features += [(f"b:{a} {b}", 0.7) for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        features += [(f"c:{padded[i:i + 3]}", 0.3) for i in range(len(padded) - 2)]
+    for feature, weight in features:
+        h = _hash(feature)
+        vector[h % dim] += weight if h & 0x80000000 else -weight
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+@dataclass
+class SemanticHit:
+    key: str            # response-cache key of the matched report
+    query: str          # the earlier query it was generated for
+    similarity: float
+
+
+class _Partition:
+    def __init__(self, dim, tables):
+        self.vectors = np.empty((64, dim), dtype=np.float32)
+        self.size = 0
+        self.keys = []
+        self.queries = []
+        self.rows = {}                  # key -> row, so re-adding a key is a no-op
+        self.buckets = [{} for _ in range(tables)]
+
+    def add(self, vector, signatures, key, query):
+        if self.size == len(self.vectors):
+            grown = np.empty((2 * len(self.vectors), self.vectors.shape[1]), dtype=np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+        row = self.size
+        self.vectors[row] = vector
+        self.size += 1
+        self.keys.append(key)
+        self.queries.append(query)
+        self.rows[key] = row
+        for table, signature in zip(self.buckets, signatures):
+            table.setdefault(signature, []).append(row)
+
+
+class SemanticCache:
+    """In-memory near-duplicate index from queries to response-cache keys (thread safe).
+
+    threshold           minimum cosine similarity for a hit
+    dim                 embedding size
+    max_entries         per partition; the oldest half is dropped when full
+    exhaustive_limit    partitions up to this size are searched exhaustively
+    tables / bits       LSH tables and hyperplanes per table for larger partitions
+    """
+
+    def __init__(self, threshold=0.9, dim=256, max_entries=100_000, exhaustive_limit=4096,
+                 tables=6, bits=14, seed=0):
+        self.threshold = threshold
+        self.dim = dim
+        self.max_entries = max_entries
+        self.exhaustive_limit = exhaustive_limit
+        self.tables = tables
+        self.bits = bits
+        self.planes = np.random.default_rng(seed).standard_normal(
+            (tables * bits, dim)
+        ).astype(np.float32)
+        self.weights = 1 << np.arange(bits, dtype=np.int64)
+        self.partitions = {}
+        self.stats = {"hits": 0, "misses": 0, "false_hits": 0, "stale": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def partition_key(*parts):
+        return tuple(normalize_query(str(part or "")) for part in parts)
+
+    def _signatures(self, vector):
+        bits = (self.planes @ vector > 0).reshape(self.tables, self.bits)
+        return [int(value) for value in bits @ self.weights]
+
+    def _candidates(self, partition, signatures):
+        if partition.size <= self.exhaustive_limit:
+            return None
+        rows = set()
+        for table, signature in zip(partition.buckets, signatures):
+            rows.update(table.get(signature, ()))
+            for bit in range(self.bits):
+                rows.update(table.get(signature ^ (1 << bit), ()))
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+    def lookup(self, query, partition_key, own_key=None):
+        """Closest earlier query above the threshold, or None.
+
+        ``own_key`` is the query's exact cache key: when the best match is
+        that entry the exact cache answers it, and nothing is counted here.
+        """
+        vector = embed(query, self.dim)
+        with self._lock:
+            partition = self.partitions.get(partition_key)
+            hit = None
+            if partition is not None and partition.size and vector.any():
+                rows = self._candidates(partition, self._signatures(vector))
+                if rows is None:
+                    scores = partition.vectors[:partition.size] @ vector
+                else:
+                    scores = partition.vectors[rows] @ vector
+                if len(scores):
+                    best = int(np.argmax(scores))
+                    similarity = float(scores[best])
+                    row = best if rows is None else int(rows[best])
+                    if similarity >= self.threshold:
+                        hit = SemanticHit(partition.keys[row], partition.queries[row], similarity)
+            if hit is not None and hit.key == own_key:
+                return None
+            self.stats["hits" if hit else "misses"] += 1
+        return hit
+
+    def add(self, query, partition_key, key):
+        vector = embed(query, self.dim)
+        if not vector.any():
+            return
+        with self._lock:
+            partition = self.partitions.setdefault(
+                partition_key, _Partition(self.dim, self.tables)
+            )
+            if key in partition.rows:
+                return
+            if partition.size >= self.max_entries:
+                partition = self._compact(partition_key, partition)
+            partition.add(vector, self._signatures(vector), key, query)
+
+    def _compact(self, partition_key, partition):
+        keep = range(partition.size // 2, partition.size)
+        fresh = _Partition(self.dim, self.tables)
+        for row in keep:
+            vector = partition.vectors[row]
+            fresh.add(vector, self._signatures(vector), partition.keys[row], partition.queries[row])
+        self.partitions[partition_key] = fresh
+        return fresh
+
+    def record(self, outcome):
+        """Count a hit that was not served: "false_hits" (the user rejected the
+        reused report) or "stale" (the report had left the response cache)."""
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def summary(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            hits = self.stats["hits"]
+            return {
+                **self.stats,
+                "entries": sum(p.size for p in self.partitions.values()),
+                "partitions": len(self.partitions),
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "false_hit_rate": round(self.stats["false_hits"] / hits, 3) if hits else None,
+            }
+
+
+def query_partition(vehicle_type, purpose, structured, request):
+    """Partition of a Smart Query request: its sidebar context (with the report
+    defaults filled in), output mode and matched vehicle."""
+    return SemanticCache.partition_key(
+        vehicle_type or reports.DEFAULT_VEHICLE,
+        purpose or reports.QUERY_DEFAULT_PURPOSE,
+        "json" if structured else "text",
+        request.spec.spec.model if request.spec else ""
+    )
@@ -0,0 +1,162 @@
+"""Bounded, compressed storage for what a session keeps between reruns.
+
+Reports, follow-up conversations and prepared uploads are stored
+zlib-compressed, and each session's store has a byte budget: past it, the least recently used
+entries are dropped. All stores are registered with one process-wide
+StoreRegistry that enforces a total cap across sessions (evicting the
+oldest entries of any session first) and reports memory use. Stores are
+held only by their session, so closed sessions drop out of the registry.
+"""
+import pickle
+import threading
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+
+# Per-entry bookkeeping on top of the compressed bytes (key, dict slot, tuple)
+ENTRY_OVERHEAD = 200
+
+
+class SessionStore:
+    """LRU of compressed values for one session, within ``budget_bytes``."""
+
+    def __init__(self, budget_bytes, registry=None, lock=None):
+        self.budget_bytes = budget_bytes
+        self.registry = registry
+        self._lock = lock or threading.RLock()
+        self._entries = OrderedDict()   # key -> (compressed, raw size, last access)
+        self.nbytes = 0
+        self.raw_bytes = 0
+        self.evictions = 0
+
+    def put(self, key, value):
+        """Store any picklable value; it is compressed and counted against the budget."""
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        packed = zlib.compress(raw, 6)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (packed, len(raw), time.monotonic())
+            self.nbytes += len(packed) + ENTRY_OVERHEAD
+            self.raw_bytes += len(raw)
+            while self.nbytes > self.budget_bytes and len(self._entries) > 1:
+                self.evict_oldest()
+        if self.registry is not None:
+            self.registry.enforce()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            packed, raw_size, _ = entry
+            self._entries[key] = (packed, raw_size, time.monotonic())
+            self._entries.move_to_end(key)
+        return pickle.loads(zlib.decompress(packed))
+
+    def pop(self, key):
+        with self._lock:
+            self._drop(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= len(entry[0]) + ENTRY_OVERHEAD
+            self.raw_bytes -= entry[1]
+
+    def oldest_access(self):
+        with self._lock:
+            if not self._entries:
+                return None
+            return next(iter(self._entries.values()))[2]
+
+    def evict_oldest(self):
+        """Drop the least recently used entry; returns the bytes freed."""
+        with self._lock:
+            if not self._entries:
+                return 0
+            key = next(iter(self._entries))
+            before = self.nbytes
+            self._drop(key)
+            self.evictions += 1
+            return before - self.nbytes
+
+    def bytes_by_kind(self):
+        """Stored bytes per key prefix ("result:query" counts as "result")."""
+        with self._lock:
+            totals = {}
+            for key, (packed, _, _) in self._entries.items():
+                kind = key.split(":", 1)[0]
+                totals[kind] = totals.get(kind, 0) + len(packed) + ENTRY_OVERHEAD
+            return totals
+
+    def summary(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.nbytes,
+                "raw_bytes": self.raw_bytes,
+                "bytes_by_kind": self.bytes_by_kind(),
+                "budget_bytes": self.budget_bytes,
+                "evictions": self.evictions,
+            }
+
+
+class StoreRegistry:
+    """Process-wide cap and memory report over every session's store."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._stores = weakref.WeakSet()
+        # One lock for the registry and all of its stores, so cross-session
+        # eviction never races a session's own put / get
+        self._lock = threading.RLock()
+
+    def create(self, budget_bytes):
+        store = SessionStore(budget_bytes, registry=self, lock=self._lock)
+        with self._lock:
+            self._stores.add(store)
+        return store
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(store.nbytes for store in self._stores)
+
+    def enforce(self):
+        """Evict the oldest entries of any session until the total is under the cap."""
+        with self._lock:
+            total = self.total_bytes()
+            while total > self.max_bytes:
+                candidates = [
+                    (store.oldest_access(), id(store), store) for store in self._stores
+                ]
+                candidates = [item for item in candidates if item[0] is not None]
+                if not candidates:
+                    break
+                _, _, store = min(candidates)
+                total -= store.evict_oldest()
+
+    def summary(self):
+        with self._lock:
+            stores = list(self._stores)
+            by_kind = {}
+            for store in stores:
+                for kind, nbytes in store.bytes_by_kind().items():
+                    by_kind[kind] = by_kind.get(kind, 0) + nbytes
+            return {
+                "sessions": len(stores),
+                "entries": sum(len(store._entries) for store in stores),
+                "bytes": sum(store.nbytes for store in stores),
+                "raw_bytes": sum(store.raw_bytes for store in stores),
+                "bytes_by_kind": by_kind,
+                "max_bytes": self.max_bytes,
+                "evictions": sum(store.evictions for store in stores),
+            }
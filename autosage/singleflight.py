@@ -0,0 +1,196 @@
+"""Coalescing of identical in-flight model calls across sessions.
+
+The response cache only helps once a report has been written. When a
+trending query or stock photo makes many sessions send the same request at
+the same moment, none of them is cached yet and each would become its own
+Gemini call. SingleFlightModel wraps the process-wide model so that the first
+caller for a request (contents, system instruction, generation config) makes
+the call and later identical callers wait for the same response. Streams are
+shared too: a background thread reads the upstream stream once and every
+caller replays its chunks as they arrive. Errors, including deadlines, reach
+every caller of the flight.
+
+Coalesced callers get the text without the usage metadata, so the tokens of
+one upstream call are only counted once.
+"""
+import json
+import threading
+
+from autosage import config
+from autosage.backends import contents_digest
+from autosage.resilience import DeadlineExceededError
+
+# Per-call options that don't change the response
+_TRANSPORT_OPTIONS = ("request_options", "deadline")
+
+
+class StreamAbandonedError(RuntimeError):
+    """Every caller stopped reading a shared stream, so it was closed."""
+
+
+class _Shared:
+    """A response or chunk served to a coalesced caller: same text, no usage of its own."""
+
+    usage_metadata = None
+
+    def __init__(self, original):
+        self._original = original
+
+    @property
+    def parts(self):
+        return self._original.parts
+
+    @property
+    def text(self):
+        return self._original.text
+
+
+class _Flight:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.chunks = []        # stream chunks received so far
+        self.response = None
+        self.error = None
+        self.done = False
+        self.readers = 0        # callers still reading a stream
+        self.followers = 0      # callers that joined instead of calling
+
+
+class SingleFlightModel:
+    """Wraps a model's generate_content so identical concurrent calls share one request."""
+
+    def __init__(self, model, wait_timeout=90.0, metrics=None):
+        self.model = model
+        self.wait_timeout = wait_timeout
+        self.metrics = metrics
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {"upstream_calls": 0, "coalesced": 0, "shared_errors": 0}
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    @staticmethod
+    def flight_key(contents, stream=False, **kwargs):
+        options = {
+            name: value for name, value in kwargs.items()
+            if name not in _TRANSPORT_OPTIONS and name != "system_instruction"
+        }
+        return "|".join((
+            contents_digest(contents, kwargs.get("system_instruction")),
+            json.dumps(options, sort_keys=True, default=str),
+            "stream" if stream else "call",
+        ))
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        key = self.flight_key(contents, stream, **kwargs)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.stats["upstream_calls"] += 1
+            else:
+                flight.followers += 1
+                self.stats["coalesced"] += 1
+            if stream:
+                flight.readers += 1
+        if not leader and self.metrics is not None:
+            self.metrics.inc(
+                "autosage_upstream_calls_saved_total", [("mode", "stream" if stream else "call")]
+            )
+
+        if stream:
+            if leader:
+                try:
+                    response = self.model.generate_content(contents, stream=True, **kwargs)
+                except Exception as ex:
+                    self._finish(key, flight, error=ex)
+                    raise
+                threading.Thread(
+                    target=self._pump, args=(key, flight, response),
+                    name="autosage-stream", daemon=True
+                ).start()
+            return self._read(flight, shared=not leader)
+
+        if leader:
+            try:
+                response = self.model.generate_content(contents, **kwargs)
+            except Exception as ex:
+                self._finish(key, flight, error=ex)
+                raise
+            self._finish(key, flight, response=response)
+            return response
+
+        with flight.cond:
+            if not flight.cond.wait_for(lambda: flight.done, self.wait_timeout):
+                raise DeadlineExceededError("timed out waiting for an identical request")
+        if flight.error is not None:
+            raise flight.error
+        return _Shared(flight.response)
+
+    def _finish(self, key, flight, response=None, error=None):
+        with self._lock:
+            # Later callers start a new flight (by then the response cache usually answers)
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if error is not None:
+                self.stats["shared_errors"] += flight.followers
+        with flight.cond:
+            flight.response = response
+            flight.error = error
+            flight.done = True
+            flight.cond.notify_all()
+
+    def _pump(self, key, flight, response):
+        """Read the upstream stream once, publishing chunks to the flight's readers."""
+        error = None
+        try:
+            for chunk in response:
+                with flight.cond:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+                with self._lock:
+                    if flight.readers == 0:
+                        # Nobody is listening any more (e.g. cancelled jobs); stop paying for it
+                        error = StreamAbandonedError("shared stream closed with no readers")
+                        break
+        except Exception as ex:
+            error = ex
+        finally:
+            if error is not None and hasattr(response, "close"):
+                response.close()
+        self._finish(key, flight, error=error)
+
+    def _read(self, flight, shared):
+        index = 0
+        try:
+            while True:
+                with flight.cond:
+                    if not flight.cond.wait_for(
+                        lambda: flight.done or index < len(flight.chunks), self.wait_timeout
+                    ):
+                        raise DeadlineExceededError("timed out waiting for a shared stream")
+                    chunks = flight.chunks[index:]
+                    done, error = flight.done, flight.error
+                index += len(chunks)
+                for chunk in chunks:
+                    yield _Shared(chunk) if shared else chunk
+                if done:
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            with self._lock:
+                flight.readers -= 1
+
+    def summary(self):
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._flights))
+
+
+def with_single_flight(model, metrics=None):
+    """Wrap ``model`` when AUTOSAGE_SINGLE_FLIGHT is on (the default)."""
+    if not config.SINGLE_FLIGHT:
+        return model
+    return SingleFlightModel(model, wait_timeout=config.REQUEST_DEADLINE_SECONDS, metrics=metrics)
@@ -0,0 +1,310 @@
+"""Local vehicle specification store used to ground Smart Query / Smart Fusion.
+
+Known figures (engine capacity, ARAI mileage, NCAP rating, ex-showroom range,
+competitors, ...) are kept in SQLite and matched against the user's query
+with a trigram index, so the model is handed the numbers instead of
+recalling them, and reports agree with each other from run to run.
+
+Matching is two level: the query is matched against model names and aliases
+(a few thousand names even for a full catalogue), then the best variant of
+that model is picked by word overlap. Queries about more than one vehicle
+(several catalogue models, or "vs" / "compare") are not grounded: one
+vehicle's figures would be presented as the answer for all of them. The seed catalogue lives in
+data/vehicle_specs.csv; larger exports can be imported with
+
+    python -m autosage.specs import catalogue.csv --db specs.sqlite3
+"""
+import argparse
+import csv
+import json
+import re
+import sqlite3
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from autosage import config
+from autosage.cache import normalize_query
+from autosage.structured import LIST, REPORT_SPECS
+
+# CSV column -> label, in the order they are shown to the model and the user.
+# Keys match the structured report field keys they fill in.
+SPEC_FIELDS = [
+    ("vehicle_type", "Vehicle Type"),
+    ("segment", "Segment"),
+    ("fuel_type", "Fuel Type"),
+    ("engine_capacity", "Engine Capacity"),
+    ("power_bhp", "Power (bhp)"),
+    ("torque_nm", "Torque (Nm)"),
+    ("transmission", "Transmission"),
+    ("arai_mileage", "ARAI Mileage"),
+    ("fuel_tank_capacity", "Fuel Tank Capacity"),
+    ("battery_capacity", "Battery Capacity"),
+    ("claimed_range", "Claimed Range"),
+    ("seating_capacity", "Seating Capacity"),
+    ("boot_space", "Boot Space"),
+    ("ground_clearance", "Ground Clearance"),
+    ("airbags", "Airbags"),
+    ("ncap_rating", "NCAP Rating"),
+    ("ex_showroom_range", "Ex-Showroom Range"),
+    ("competitors", "Competitors"),
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS specs (
+    id INTEGER PRIMARY KEY,
+    brand TEXT NOT NULL,
+    model TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    aliases TEXT NOT NULL DEFAULT '',
+    fields TEXT NOT NULL
+);
+"""
+
+# Wording of a question about several vehicles, some of which may not be in the catalogue
+COMPARISON = re.compile(r"\b(vs|versus|compare|compared|comparing|comparison)\b")
+
+
+def trigrams(text):
+    """Character trigrams of each normalized word, padded so word starts/ends count."""
+    grams = set()
+    for word in normalize_query(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@dataclass
+class VehicleSpec:
+    brand: str
+    model: str
+    variant: str
+    fields: dict
+
+    @property
+    def name(self):
+        return f"{self.brand} {self.model} {self.variant}".strip()
+
+    def known(self):
+        """(key, label, value) for every field the store has a value for."""
+        return [(key, label, self.fields[key]) for key, label in SPEC_FIELDS if self.fields.get(key)]
+
+
+@dataclass
+class SpecMatch:
+    spec: VehicleSpec
+    score: float              # share of the matched name's trigrams found in the query
+    variant_matched: bool     # False: the model's default (first listed) variant was used
+
+    def context(self):
+        """Compact block for the prompt; its text is also part of the cache key."""
+        variant = self.spec.variant if self.variant_matched else f"{self.spec.variant} (assumed)"
+        lines = [f"- Brand / Model: {self.spec.brand} {self.spec.model}", f"- Variant: {variant}"]
+        lines += [
+            f"- {label}: {value.replace(';', ', ')}" for _, label, value in self.spec.known()
+        ]
+        return "\n".join(lines)
+
+
+class SpecStore:
+    """SQLite spec table plus an in-memory trigram index over model names."""
+
+    def __init__(self, path=":memory:", min_score=0.8):
+        self.path = path
+        self.min_score = min_score
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._build_index()
+
+    def __len__(self):
+        return sum(len(variants) for variants in self._variants)
+
+    def import_csv(self, csv_path, replace=True):
+        """Load a catalogue CSV (brand, model, variant, aliases + SPEC_FIELDS columns)."""
+        rows = []
+        with open(csv_path, newline="", encoding="utf-8-sig") as handle:
+            for row in csv.DictReader(handle):
+                fields = {key: (row.get(key) or "").strip() for key, _ in SPEC_FIELDS}
+                rows.append((
+                    row["brand"].strip(), row["model"].strip(), (row.get("variant") or "").strip(),
+                    (row.get("aliases") or "").strip(), json.dumps(fields, ensure_ascii=False),
+                ))
+        with self._lock, self._conn:
+            if replace:
+                self._conn.execute("DELETE FROM specs")
+            self._conn.executemany(
+                "INSERT INTO specs (brand, model, variant, aliases, fields) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        self._build_index()
+        return len(rows)
+
+    def _build_index(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT brand, model, variant, aliases, fields FROM specs ORDER BY id"
+            ).fetchall()
+        models = {}         # (brand, model) -> model index, in catalogue order
+        variants = []       # model index -> [VehicleSpec], first is the default variant
+        names = []          # name index -> (model index, trigram count, trigrams)
+        postings = {}       # trigram -> [name index]
+        for brand, model, variant, aliases, fields in rows:
+            spec = VehicleSpec(brand, model, variant, json.loads(fields))
+            key = (brand.lower(), model.lower())
+            if key not in models:
+                models[key] = len(variants)
+                variants.append([])
+                # A bare model name is only used when no aliases are given, so
+                # everyday words ("City") can require the brand instead
+                match_names = [f"{brand} {model}"] + (
+                    [alias for alias in aliases.split(";") if alias.strip()] or [model]
+                )
+                for match_name in match_names:
+                    grams = trigrams(match_name)
+                    if not grams:
+                        continue
+                    for gram in grams:
+                        postings.setdefault(gram, []).append(len(names))
+                    names.append((models[key], len(grams), grams))
+            variants[models[key]].append(spec)
+        self._variants, self._names, self._postings = variants, names, postings
+
+    def match(self, query):
+        """Best matching spec for a free-text query, or None (also when the
+        query is about more than one vehicle)."""
+        query_grams = trigrams(query)
+        if not query_grams or not self._names or COMPARISON.search(normalize_query(query)):
+            return None
+        counts = Counter()
+        for gram in query_grams:
+            counts.update(self._postings.get(gram, ()))
+        best = {}           # model index -> (rank, name trigrams) of its best name
+        for name_index, common in counts.items():
+            model_index, total, grams = self._names[name_index]
+            score = common / total
+            # Prefer the longer name on ties ("Nexon EV" over "Nexon")
+            rank = (score, total)
+            if score >= self.min_score and (
+                    model_index not in best or rank > best[model_index][0]):
+                best[model_index] = (rank, grams)
+        # A name found only as part of a longer matched name ("Nexon" in
+        # "Nexon EV") is the same vehicle, not a second one
+        models = [
+            model_index for model_index, (_, grams) in best.items()
+            if not any(
+                other != model_index and grams < other_grams
+                for other, (_, other_grams) in best.items()
+            )
+        ]
+        if len(models) != 1:
+            return None
+        model_index = models[0]
+        (score, _), _ = best[model_index]
+        spec, variant_matched = self._pick_variant(self._variants[model_index], query)
+        return SpecMatch(spec, round(score, 3), variant_matched)
+
+    @staticmethod
+    def _pick_variant(variants, query):
+        # Single characters ("1", "5", "o") say nothing about the variant
+        words = {word for word in normalize_query(query).split() if len(word) > 1}
+        scored = []
+        for spec in variants:
+            variant_words = {
+                word for word in normalize_query(spec.variant).split() if len(word) > 1
+            }
+            overlap = len(variant_words & words) / len(variant_words) if variant_words else 0.0
+            scored.append((overlap, spec))
+        best_score = max(score for score, _ in scored)
+        leaders = [spec for score, spec in scored if score == best_score]
+        if best_score == 0 or len(leaders) > 1:
+            return variants[0], False
+        return leaders[0], True
+
+
+def open_spec_store(db_path, csv_path=None, min_score=0.8):
+    """Spec store at ``db_path``, seeded from ``csv_path`` when it is empty."""
+    store = SpecStore(db_path, min_score=min_score)
+    if csv_path and not len(store):
+        store.import_csv(csv_path)
+    return store
+
+
+def open_configured_store():
+    """The spec store described by autosage.config, or None when grounding is off."""
+    if not config.SPECS_CSV and config.SPECS_DB == ":memory:":
+        return None
+    return open_spec_store(config.SPECS_DB, config.SPECS_CSV, config.SPECS_MIN_SCORE)
+
+
+def _reported_model(report):
+    for section in report.sections:
+        if section.fields.get("model"):
+            return normalize_query(section.fields["model"])
+    return ""
+
+
+def apply_specs(report, match):
+    """Overwrite structured report fields with the store's values (in place).
+
+    Nothing is changed when the report names a different model (e.g. the
+    photo in Smart Fusion shows another vehicle than the query mentions).
+    """
+    reported = _reported_model(report)
+    if reported and normalize_query(match.spec.model) not in reported:
+        return report
+    known = {key: value for key, _, value in match.spec.known()}
+    known.update(brand=match.spec.brand, model=match.spec.model)
+    if match.variant_matched:
+        known["variant"] = match.spec.variant
+    types = {
+        key: field_type
+        for _, _, fields in REPORT_SPECS[report.kind] for key, _, field_type in fields
+    }
+    for section in report.sections:
+        for key in section.fields:
+            if key in known:
+                value = known[key]
+                if types[key] == LIST:
+                    value = [item.strip() for item in value.split(";") if item.strip()]
+                section.fields[key] = value
+    return report
+
+
+def spec_table(match):
+    """Rows for the locally rendered "verified specs" panel."""
+    rows = [{"Field": "Vehicle", "Value": match.spec.name}]
+    for key, label, value in match.spec.known():
+        rows.append({"Field": label, "Value": value.replace(";", ", ")})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m autosage.specs", description="Manage the local vehicle spec store."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="Replace the store's contents with a CSV")
+    importer.add_argument("csv")
+    importer.add_argument("--db", required=True, help="SQLite file to write")
+    lookup = commands.add_parser("match", help="Show the spec matched for a query")
+    lookup.add_argument("query")
+    lookup.add_argument("--db", required=True)
+    args = parser.parse_args(argv)
+
+    store = SpecStore(args.db)
+    if args.command == "import":
+        print(f"imported {store.import_csv(args.csv)} variants into {args.db}")
+        return 0
+    match = store.match(args.query)
+    if match is None:
+        print("no match")
+        return 1
+    print(f"{match.spec.name} (score {match.score})")
+    print(match.context())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
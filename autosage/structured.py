@@ -0,0 +1,381 @@
+"""Structured (JSON) report mode.
+
+Instead of asking Gemini to echo the long emoji templates, the model returns
+JSON that follows a response schema per report type. The JSON is validated
+into typed records here and rendered locally into the same sections the
+markdown templates use.
+"""
+import json
+from dataclasses import dataclass, field
+
+TEXT = "STRING"
+SCORE = "INTEGER"
+LIST = "ARRAY"
+
+# kind -> [(section key, section title, [(field key, label, type)])]
+REPORT_SPECS = {
+    "query": [
+        ("overview", "VEHICLE OVERVIEW", [
+            ("brand", "Brand", TEXT),
+            ("model", "Model", TEXT),
+            ("variant", "Variant", TEXT),
+            ("vehicle_type", "Vehicle Type", TEXT),
+            ("segment", "Segment", TEXT),
+            ("launch_year", "Launch Year (India)", TEXT),
+            ("current_status", "Current Status", TEXT),
+        ]),
+        ("engine", "ENGINE & PERFORMANCE", [
+            ("engine_options", "Engine Options", TEXT),
+            ("engine_capacity", "Engine Capacity", TEXT),
+            ("fuel_type", "Fuel Type", TEXT),
+            ("power_bhp", "Power (bhp)", TEXT),
+            ("torque_nm", "Torque (Nm)", TEXT),
+            ("transmission", "Transmission", TEXT),
+            ("drivetrain", "Drivetrain", TEXT),
+            ("performance_character", "Performance Character", TEXT),
+        ]),
+        ("efficiency", "EFFICIENCY ANALYSIS", [
+            ("powertrain", "Powertrain", TEXT),
+            ("arai_mileage", "ARAI Mileage", TEXT),
+            ("real_world_mileage", "Real-world Mileage", TEXT),
+            ("fuel_tank_capacity", "Fuel Tank Capacity", TEXT),
+            ("cost_per_1000_km", "Cost per 1,000 km", TEXT),
+            ("battery_capacity", "Battery Capacity", TEXT),
+            ("claimed_range", "Claimed Range", TEXT),
+            ("real_world_range", "Real-world Range", TEXT),
+            ("charging_time", "Charging Time", TEXT),
+            ("charging_cost", "Charging Cost per Full Charge", TEXT),
+        ]),
+        ("practicality", "DIMENSIONS & PRACTICALITY", [
+            ("boot_space", "Boot Space", TEXT),
+            ("seating_capacity", "Seating Capacity", TEXT),
+            ("ground_clearance", "Ground Clearance", TEXT),
+            ("practicality_score", "Practicality Score (1-10)", SCORE),
+        ]),
+        ("features", "KEY FEATURES (Top 7)", [
+            ("items", "Features", LIST),
+        ]),
+        ("safety", "SAFETY & TECHNOLOGY", [
+            ("airbags", "Airbags", TEXT),
+            ("adas_level", "ADAS Level", TEXT),
+            ("ncap_rating", "NCAP Rating", TEXT),
+            ("safety_score", "Safety Score (1-10)", SCORE),
+        ]),
+        ("price", "PRICE & POSITIONING (India)", [
+            ("ex_showroom_range", "Ex-Showroom Range", TEXT),
+            ("on_road_range", "On-Road Range", TEXT),
+            ("competitors", "Top 4 Competitors", LIST),
+            ("value_score", "Value Score (1-10)", SCORE),
+        ]),
+        ("ownership", "OWNERSHIP", [
+            ("service_interval", "Service Interval", TEXT),
+            ("annual_maintenance_cost", "Annual Maintenance Cost", TEXT),
+            ("warranty", "Warranty", TEXT),
+            ("reliability_score", "Reliability Score (1-10)", SCORE),
+        ]),
+        ("depreciation", "DEPRECIATION", [
+            ("three_year", "3-Year", TEXT),
+            ("five_year", "5-Year", TEXT),
+            ("resale_strength", "Resale Strength (1-10)", SCORE),
+        ]),
+        ("verdict", "FINAL VERDICT", [
+            ("ideal_buyer", "Ideal Buyer", TEXT),
+            ("pros", "Pros", LIST),
+            ("cons", "Cons", LIST),
+            ("summary", "3-Line Executive Summary", TEXT),
+        ]),
+    ],
+    "vision": [
+        ("identity", "VEHICLE IDENTITY", [
+            ("brand", "Brand", TEXT),
+            ("model", "Model", TEXT),
+            ("variant", "Variant", TEXT),
+            ("vehicle_type", "Vehicle Type", TEXT),
+            ("segment", "Segment", TEXT),
+            ("launch_year", "Launch Year (India)", TEXT),
+        ]),
+        ("engine", "ENGINE & PERFORMANCE", [
+            ("engine_capacity", "Engine Capacity", TEXT),
+            ("fuel_type", "Fuel Type", TEXT),
+            ("power_bhp", "Power Output (bhp)", TEXT),
+            ("torque_nm", "Torque (Nm)", TEXT),
+            ("transmission", "Transmission", TEXT),
+            ("drivetrain", "Drivetrain", TEXT),
+            ("zero_to_hundred", "0-100 km/h", TEXT),
+            ("top_speed", "Top Speed", TEXT),
+        ]),
+        ("efficiency", "MILEAGE & EFFICIENCY", [
+            ("powertrain", "Powertrain", TEXT),
+            ("arai_mileage", "ARAI Mileage", TEXT),
+            ("real_world_mileage", "Real-world Mileage", TEXT),
+            ("fuel_tank_capacity", "Fuel Tank Capacity", TEXT),
+            ("range", "Range", TEXT),
+            ("battery_capacity", "Battery Capacity", TEXT),
+            ("claimed_range", "Claimed Range", TEXT),
+            ("charging_time", "Charging Time", TEXT),
+            ("charging_cost", "Cost per Full Charge", TEXT),
+        ]),
+        ("features", "KEY FEATURES (Top 5)", [
+            ("items", "Features", LIST),
+        ]),
+        ("safety", "SAFETY PACKAGE", [
+            ("airbags", "Airbags", TEXT),
+            ("abs_ebd", "ABS / EBD", TEXT),
+            ("adas", "ADAS", TEXT),
+            ("ncap_rating", "NCAP Rating", TEXT),
+            ("highlight", "Key Safety Highlight", TEXT),
+        ]),
+        ("interior", "INTERIOR & COMFORT", [
+            ("infotainment", "Infotainment", TEXT),
+            ("connectivity", "Connectivity", TEXT),
+            ("seating_capacity", "Seating Capacity", TEXT),
+            ("boot_space", "Boot Space", TEXT),
+            ("premium_elements", "Premium Elements", TEXT),
+        ]),
+        ("price", "PRICE ANALYSIS (India)", [
+            ("ex_showroom_range", "Ex-Showroom Range", TEXT),
+            ("on_road_range", "On-Road Estimate", TEXT),
+            ("competitors", "Competitors", LIST),
+            ("value_score", "Value-for-Money (1-10)", SCORE),
+        ]),
+        ("ownership", "MAINTENANCE & OWNERSHIP", [
+            ("annual_maintenance_cost", "Avg Annual Maintenance", TEXT),
+            ("service_interval", "Service Interval", TEXT),
+            ("warranty", "Warranty", TEXT),
+            ("spare_parts_cost", "Spare Parts Cost Level", TEXT),
+        ]),
+        ("resale", "RESALE & LONG TERM VALUE", [
+            ("five_year_depreciation", "5-Year Depreciation", TEXT),
+            ("ten_year_resale", "10-Year Resale Estimate", TEXT),
+            ("reliability_score", "Reliability (1-10)", SCORE),
+        ]),
+        ("usp", "UNIQUE SELLING PROPOSITION", [
+            ("main_usp", "Main USP", TEXT),
+            ("ideal_buyer", "Ideal Buyer Profile", TEXT),
+        ]),
+        ("confidence", "IDENTIFICATION CONFIDENCE", [
+            ("confidence_level", "Confidence Level (1-10)", SCORE),
+            ("reasoning", "Reasoning Basis", TEXT),
+        ]),
+        ("verdict", "FINAL VERDICT", [
+            ("summary", "Summary", TEXT),
+        ]),
+    ],
+    # First stage of two-stage Smart Vision (see autosage/vision.py)
+    "identify": [
+        ("identity", "VEHICLE IDENTITY", [
+            ("brand", "Brand", TEXT),
+            ("model", "Model", TEXT),
+            ("variant", "Variant", TEXT),
+            ("vehicle_type", "Vehicle Type", TEXT),
+            ("fuel_type", "Fuel Type", TEXT),
+            ("confidence", "Confidence (1-10)", SCORE),
+            ("reasoning", "Reasoning Basis", TEXT),
+        ]),
+    ],
+    "fusion": [
+        ("input_analysis", "INPUT ANALYSIS", [
+            ("input_type", "Input Type", TEXT),
+            ("identification_confidence", "Identification Confidence", TEXT),
+            ("identification_notes", "Identification Notes", TEXT),
+            ("powertrain_basis", "Powertrain Determination Basis", TEXT),
+        ]),
+        ("identity", "VEHICLE IDENTITY", [
+            ("brand", "Brand", TEXT),
+            ("model", "Model", TEXT),
+            ("variant", "Variant", TEXT),
+            ("vehicle_type", "Vehicle Type", TEXT),
+            ("segment", "Segment", TEXT),
+            ("fuel_type", "Fuel Type", TEXT),
+            ("launch_year", "Launch Year (India)", TEXT),
+            ("current_status", "Current Status", TEXT),
+        ]),
+        ("engine", "ENGINE & PERFORMANCE", [
+            ("engine_options", "Engine Options", TEXT),
+            ("engine_capacity", "Engine Capacity", TEXT),
+            ("power_bhp", "Power Output (bhp)", TEXT),
+            ("torque_nm", "Torque (Nm)", TEXT),
+            ("transmission", "Transmission", TEXT),
+            ("drivetrain", "Drivetrain", TEXT),
+            ("performance_character", "Performance Character", TEXT),
+        ]),
+        ("efficiency", "EFFICIENCY & RUNNING COST", [
+            ("powertrain", "Powertrain", TEXT),
+            ("arai_mileage", "ARAI Mileage", TEXT),
+            ("real_world_mileage", "Real-world Mileage", TEXT),
+            ("fuel_tank_capacity", "Fuel Tank Capacity", TEXT),
+            ("cost_per_1000_km", "Estimated Cost per 1,000 km", TEXT),
+            ("battery_capacity", "Battery Capacity", TEXT),
+            ("claimed_range", "Claimed Range", TEXT),
+            ("real_world_range", "Real-world Range", TEXT),
+            ("charging_time", "Charging Time", TEXT),
+            ("charging_cost", "Estimated Charging Cost per Full Charge", TEXT),
+        ]),
+        ("features", "KEY FEATURES (Top 7)", [
+            ("items", "Features", LIST),
+        ]),
+        ("safety", "SAFETY & TECHNOLOGY", [
+            ("airbags", "Airbags", TEXT),
+            ("abs_ebd", "ABS / EBD", TEXT),
+            ("adas_level", "ADAS Level", TEXT),
+            ("ncap_rating", "NCAP Rating", TEXT),
+            ("highlights", "Advanced Safety Highlights", TEXT),
+        ]),
+        ("interior", "INTERIOR & PRACTICALITY", [
+            ("seating_capacity", "Seating Capacity", TEXT),
+            ("boot_space", "Boot Space", TEXT),
+            ("infotainment", "Infotainment System", TEXT),
+            ("connectivity", "Connectivity Features", TEXT),
+            ("premium_highlights", "Premium Highlights", TEXT),
+        ]),
+        ("price", "PRICE & MARKET POSITION (India)", [
+            ("ex_showroom_range", "Ex-Showroom Price Range", TEXT),
+            ("on_road_range", "On-Road Price Range", TEXT),
+            ("competitors", "Primary Competitors", LIST),
+            ("market_positioning", "Market Positioning", TEXT),
+            ("value_score", "Value Score (1-10)", SCORE),
+        ]),
+        ("ownership", "OWNERSHIP EXPERIENCE", [
+            ("service_interval", "Service Interval", TEXT),
+            ("annual_maintenance_cost", "Estimated Annual Maintenance Cost", TEXT),
+            ("warranty", "Warranty", TEXT),
+            ("spare_parts_cost", "Spare Parts Cost Level", TEXT),
+            ("reliability_score", "Reliability Score (1-10)", SCORE),
+        ]),
+        ("resale", "DEPRECIATION & RESALE", [
+            ("three_year", "3-Year Depreciation Estimate", TEXT),
+            ("five_year", "5-Year Depreciation Estimate", TEXT),
+            ("ten_year_resale", "10-Year Resale Value Estimate", TEXT),
+            ("resale_strength", "Resale Strength Score (1-10)", SCORE),
+        ]),
+        ("buyer_fit", "BUYER FIT ANALYSIS", [
+            ("ideal_buyer", "Ideal Buyer Profile", TEXT),
+            ("use_case", "Use Case Suitability", TEXT),
+            ("pros", "Pros", LIST),
+            ("cons", "Cons", LIST),
+        ]),
+        ("verdict", "FINAL EXPERT VERDICT", [
+            ("summary", "Summary", TEXT),
+        ]),
+    ],
+}
+
+
+class StructuredOutputError(ValueError):
+    """The model's JSON did not match the report schema."""
+
+
+@dataclass
+class ReportSection:
+    key: str
+    title: str
+    fields: dict
+
+
+@dataclass
+class StructuredReport:
+    kind: str
+    sections: list = field(default_factory=list)
+
+    def section(self, key):
+        for section in self.sections:
+            if section.key == key:
+                return section
+        return None
+
+    def value(self, section_key, field_key, default=None):
+        section = self.section(section_key)
+        if section is None:
+            return default
+        return section.fields.get(field_key, default)
+
+    def to_dict(self):
+        return {section.key: dict(section.fields) for section in self.sections}
+
+
+def _field_schema(field_type):
+    if field_type == LIST:
+        return {"type": LIST, "items": {"type": TEXT}}
+    return {"type": field_type}
+
+
+def response_schema(kind):
+    """Gemini response schema (OpenAPI subset) for a report type."""
+    properties = {}
+    for section_key, _, fields in REPORT_SPECS[kind]:
+        properties[section_key] = {
+            "type": "OBJECT",
+            "properties": {key: _field_schema(field_type) for key, _, field_type in fields},
+            "required": [key for key, _, _ in fields],
+        }
+    return {"type": "OBJECT", "properties": properties, "required": list(properties)}
+
+
+def json_generation_config(kind, base_config):
+    return {
+        **base_config,
+        "response_mime_type": "application/json",
+        "response_schema": response_schema(kind),
+    }
+
+
+def _coerce(value, field_type):
+    if value is None:
+        return [] if field_type == LIST else None
+    if field_type == LIST:
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list):
+            raise StructuredOutputError(f"expected a list, got {type(value).__name__}")
+        return [str(item).strip() for item in value if str(item).strip()]
+    if field_type == SCORE:
+        try:
+            score = int(round(float(value)))
+        except (TypeError, ValueError):
+            return None
+        return min(10, max(1, score))
+    return str(value).strip()
+
+
+def parse_report(kind, text):
+    """Validate the model's JSON into a StructuredReport."""
+    try:
+        data = json.loads(text)
+    except (TypeError, json.JSONDecodeError) as ex:
+        raise StructuredOutputError(f"response is not valid JSON ({ex})") from ex
+    if not isinstance(data, dict):
+        raise StructuredOutputError("response is not a JSON object")
+
+    report = StructuredReport(kind=kind)
+    for section_key, title, fields in REPORT_SPECS[kind]:
+        raw = data.get(section_key)
+        if not isinstance(raw, dict):
+            raise StructuredOutputError(f"missing section '{section_key}'")
+        values = {key: _coerce(raw.get(key), field_type) for key, _, field_type in fields}
+        report.sections.append(ReportSection(section_key, title, values))
+    return report
+
+
+def _is_empty(value):
+    return value is None or value == "" or value == []
+
+
+def render_markdown(report):
+    """Render a StructuredReport with the same sections as the markdown templates."""
+    lines = []
+    for (section_key, title, fields), section in zip(REPORT_SPECS[report.kind], report.sections):
+        lines.append(f"#### 🔷 {title}")
+        for key, label, field_type in fields:
+            value = section.fields.get(key)
+            if _is_empty(value):
+                continue
+            if section_key == "features":
+                lines.extend(f"{number}. {item}" for number, item in enumerate(value, 1))
+            elif field_type == LIST:
+                lines.append(f"- **{label}:** {', '.join(value)}")
+            elif field_type == SCORE:
+                lines.append(f"- **{label}:** {value}/10")
+            else:
+                lines.append(f"- **{label}:** {value}")
+        lines.append("")
+    return "\n".join(lines)
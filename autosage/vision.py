@@ -0,0 +1,124 @@
+"""Two-stage Smart Vision: identify the vehicle, then report on the identity.
+
+Most of a vision report (price, maintenance, resale) depends on which
+vehicle it is, not on the pixels. The photo therefore only goes into a
+short JSON identification call (brand, model, likely variant, fuel type,
+confidence), which is cached per photo. The report itself is a text-only
+request keyed on the identity, so different photos of the same vehicle share
+one cached report. Low-confidence, unparsable or failed identifications fall
+back to the original single call with the photo.
+"""
+import json
+import logging
+import re
+from dataclasses import dataclass
+
+from autosage import reports
+from autosage.metrics import Trace
+from autosage.structured import StructuredOutputError, parse_report
+
+logger = logging.getLogger(__name__)
+
+# Variant guesses like "Most Common Variant (Estimated)" don't name a variant
+VAGUE_VARIANT = re.compile(r"estimat|assum|unknown|unclear|common|not (visible|identified)", re.I)
+
+
+@dataclass
+class VehicleIdentity:
+    brand: str
+    model: str
+    variant: str
+    vehicle_type: str
+    fuel_type: str
+    confidence: int
+    reasoning: str
+
+    @property
+    def name(self):
+        return " ".join(part for part in (self.brand, self.model, self.variant) if part)
+
+    @property
+    def query(self):
+        """The identity as a query: spec store lookups and the report's cache key."""
+        return " ".join(part for part in (self.name, self.fuel_type) if part)
+
+    def recognised(self, min_confidence):
+        return bool(self.brand and self.model) and (self.confidence or 0) >= min_confidence
+
+
+def parse_identity(text):
+    """VehicleIdentity from the identification JSON, or None if it doesn't parse."""
+    try:
+        fields = parse_report("identify", text).sections[0].fields
+    except StructuredOutputError:
+        return None
+    variant = fields["variant"] or ""
+    if VAGUE_VARIANT.search(variant):
+        variant = ""
+    return VehicleIdentity(
+        brand=fields["brand"] or "", model=fields["model"] or "", variant=variant,
+        vehicle_type=fields["vehicle_type"] or "", fuel_type=fields["fuel_type"] or "",
+        confidence=fields["confidence"], reasoning=fields["reasoning"] or "",
+    )
+
+
+def with_confidence(text, identity, structured=False):
+    """Add the identification confidence section, which the text report leaves out."""
+    if structured:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            return text
+        if isinstance(data, dict):
+            data["confidence"] = {
+                "confidence_level": identity.confidence, "reasoning": identity.reasoning
+            }
+            return json.dumps(data, ensure_ascii=False)
+        return text
+    section = (
+        "🔷 IDENTIFICATION CONFIDENCE\n"
+        f"- Confidence Level (1-10): {identity.confidence}\n"
+        f"- Reasoning Basis: {identity.reasoning or 'Not stated'}"
+    )
+    head, marker, tail = text.partition("🔷 FINAL VERDICT")
+    if not marker:
+        return text.rstrip() + "\n\n" + section
+    return head + section + "\n\n" + marker + tail
+
+
+def two_stage_report(model, response_cache, image_cache, prepared, structured=False,
+                     spec_store=None, min_confidence=6, on_chunk=None, trace=None):
+    """Vision report for an uploaded photo via identification + text report.
+
+    Returns (text, request, identity); ``identity`` is None when the photo
+    wasn't recognised confidently and the full image report was generated.
+    """
+    identify_trace = Trace("identify")
+    try:
+        identity = parse_identity(reports.generate_report(
+            model, response_cache, image_cache, reports.identify_request(prepared),
+            trace=identify_trace
+        ))
+    except Exception as ex:
+        # A blocked or empty response, or one cut off by the token budget
+        logger.warning("vehicle identification failed: %s: %s", type(ex).__name__, ex)
+        identity = None
+    finally:
+        if trace is not None:
+            trace.add("identify", identify_trace.finish().duration)
+            trace.add_usage(identify_trace)
+
+    if identity is None or not identity.recognised(min_confidence):
+        request = reports.vision_request(prepared, structured=structured)
+        text = reports.generate_report(
+            model, response_cache, image_cache, request, on_chunk=on_chunk, trace=trace
+        )
+        return text, request, None
+
+    if trace is not None:
+        trace.add("image_encode", prepared.encode_seconds)
+    request = reports.vision_text_request(identity, structured=structured, spec_store=spec_store)
+    text = reports.generate_report(
+        model, response_cache, image_cache, request, on_chunk=on_chunk, trace=trace
+    )
+    return with_confidence(text, identity, structured), request, identity
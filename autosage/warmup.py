@@ -0,0 +1,284 @@
+"""Cache warm-up: pre-generate the most requested Smart Query reports.
+
+The first users asking about the top-selling models after a deploy, or after
+their reports expired overnight, would otherwise all pay full generation
+latency. The warmer takes a ranked list of (query, vehicle type, purpose)
+targets, from a CSV file (same columns as ``autosage.batch queries``) and/or
+mined from the Smart Query inputs in the metrics log, and generates each
+report through the same request builder, model and response cache as the
+app. Reports that are still fresh are skipped; those expiring within the
+refresh window are regenerated. Given the app's similarity cache, every
+warmed (or already fresh) target is also added to it, so differently worded
+questions about the same vehicle hit the warmed report too. Calls run on a few workers and stop once the
+run's token or call budget is spent.
+
+In the app the warmer runs on a daemon thread (AUTOSAGE_WARMUP_TARGETS /
+AUTOSAGE_WARMUP_FROM_LOG); it can also run from the command line:
+
+    python -m autosage.warmup --targets data/warmup_targets.csv --from-log .autosage_metrics.jsonl
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from autosage import config
+from autosage.batch import Job, _job_id, build_request, query_jobs
+from autosage.cache import ResponseCache, normalize_query
+from autosage.generation import generate_text
+from autosage.metrics import Trace, log_files
+from autosage.semantic import query_partition
+
+
+# ---------------------------------
+# Targets
+# ---------------------------------
+def logged_jobs(log_path, top=50, since_seconds=None):
+    """The ``top`` most asked Smart Query inputs in the metrics log (and its rotated
+    backups), most asked first. Inputs are only logged with AUTOSAGE_METRICS_LOG_INPUTS."""
+    counts = Counter()
+    examples = {}
+    cutoff = time.time() - since_seconds if since_seconds else None
+    if not log_path:
+        return []
+    for path in log_files(log_path):
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                inputs = record.get("inputs")
+                if record.get("kind") != "query" or record.get("status") != "ok" or not inputs:
+                    continue
+                if cutoff is not None and record.get("ts", 0) < cutoff:
+                    continue
+                key = tuple(
+                    normalize_query(inputs.get(name) or "")
+                    for name in ("query", "vehicle_type", "purpose")
+                )
+                counts[key] += 1
+                examples.setdefault(key, inputs)
+    return [
+        Job(_job_id(*key), "query", {
+            "query": examples[key]["query"],
+            "vehicle_type": examples[key].get("vehicle_type"),
+            "purpose": examples[key].get("purpose"),
+        })
+        for key, _ in counts.most_common(top)
+    ]
+
+
+def warmup_jobs(targets_path=None, log_path=None, top=50, since_seconds=None):
+    """Configured targets first (in file order), then the most asked logged queries."""
+    jobs = query_jobs(targets_path) if targets_path else []
+    if log_path:
+        jobs += logged_jobs(log_path, top, since_seconds)
+    return jobs
+
+
+# ---------------------------------
+# Warmer
+# ---------------------------------
+class CacheWarmer:
+    """Generates reports for warm-up targets into the shared response cache."""
+
+    def __init__(self, model, response_cache, spec_store=None, semantic_cache=None, workers=2,
+                 max_tokens=None, max_calls=None, refresh_seconds=0, structured=False,
+                 metrics=None, log=None):
+        self.model = model
+        self.response_cache = response_cache
+        self.spec_store = spec_store
+        self.semantic_cache = semantic_cache
+        self.workers = max(1, workers)
+        self.max_tokens = max_tokens
+        self.max_calls = max_calls
+        self.refresh_seconds = refresh_seconds
+        self.structured = structured
+        self.metrics = metrics
+        self.log = log or (lambda message: None)
+        self.last = None        # summary of the latest finished run
+        self.running = False
+
+    def warm_one(self, job):
+        """Returns (result, trace); result is "fresh", "warmed", "refreshed" or "failed"."""
+        trace = Trace("warmup")
+        try:
+            request = build_request(job, self.structured, self.spec_store)
+            remaining = self.response_cache.expires_in(request.cache_key)
+            if remaining is not None and remaining > self.refresh_seconds:
+                trace.cache = "hit"
+                self._index(job, request)
+                return "fresh", trace
+            trace.cache = "miss"
+            text = generate_text(
+                self.model, request.contents, generation_config=request.generation_config,
+                trace=trace, system_instruction=request.system_instruction
+            )
+            self.response_cache.set(request.cache_key, text)
+            self._index(job, request)
+            return ("refreshed" if remaining is not None and remaining > 0 else "warmed"), trace
+        except Exception as ex:
+            trace.fail(ex)
+            self.log(f"  {job.inputs['query']}: {type(ex).__name__}: {ex}")
+            return "failed", trace
+        finally:
+            trace.finish()
+            if self.metrics is not None and trace.cache == "miss":
+                self.metrics.record(trace)
+
+    def _index(self, job, request):
+        # Same partition as the Smart Query tab, so its lookups find the report
+        if self.semantic_cache is None:
+            return
+        inputs = job.inputs
+        partition = query_partition(
+            inputs["vehicle_type"], inputs["purpose"], self.structured, request
+        )
+        self.semantic_cache.add(inputs["query"], partition, request.cache_key)
+
+    def _budget_left(self, counts, tokens, in_flight):
+        # Targets still running may be calls; their tokens are only known when they finish
+        calls = counts["warmed"] + counts["refreshed"] + counts["failed"] + in_flight
+        if self.max_calls is not None and calls >= self.max_calls:
+            return False
+        return self.max_tokens is None or tokens < self.max_tokens
+
+    def run(self, jobs):
+        """Warm ``jobs`` in order; the budget is checked before each target is started,
+        so the token budget can be overshot by the calls already in flight."""
+        started = time.perf_counter()
+        counts = Counter({"fresh": 0, "warmed": 0, "refreshed": 0, "failed": 0})
+        tokens = 0
+        pending = set()
+        skipped = 0
+        self.running = True
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers,
+                                    thread_name_prefix="autosage-warmup") as pool:
+                for index, job in enumerate(jobs):
+                    while len(pending) >= self.workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        tokens += self._collect(done, counts)
+                    if not self._budget_left(counts, tokens, len(pending)):
+                        skipped = len(jobs) - index
+                        break
+                    pending.add(pool.submit(self.warm_one, job))
+                tokens += self._collect(pending, counts)
+        finally:
+            self.running = False
+        if skipped:
+            self.log(f"budget spent, {skipped} targets left for the next run")
+        self.last = dict(
+            counts, targets=len(jobs), over_budget=skipped, tokens=tokens,
+            seconds=round(time.perf_counter() - started, 3), finished_at=round(time.time(), 3)
+        )
+        return self.last
+
+    def _collect(self, futures, counts):
+        tokens = 0
+        for future in futures:
+            result, trace = future.result()
+            counts[result] += 1
+            tokens += (trace.prompt_tokens or 0) + (trace.output_tokens or 0)
+            if self.metrics is not None:
+                self.metrics.inc("autosage_warmup_total", [("result", result)])
+        return tokens
+
+    def start(self, load_jobs, interval=0):
+        """Run in a daemon thread: once, or every ``interval`` seconds.
+
+        ``load_jobs`` is called before every run, so targets mined from the
+        log follow what users are asking.
+        """
+        def loop():
+            while True:
+                try:
+                    summary = self.run(load_jobs())
+                    self.log(f"warm-up: {json.dumps(summary)}")
+                except Exception as ex:
+                    self.log(f"warm-up failed: {type(ex).__name__}: {ex}")
+                if not interval:
+                    return
+                time.sleep(interval)
+
+        thread = threading.Thread(target=loop, name="autosage-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def summary(self):
+        return {"running": self.running, "last_run": self.last}
+
+
+def main(argv=None):
+    from autosage.backends import FakeBackend, build_backend
+    from autosage.resilience import with_resilience
+    from autosage.specs import open_configured_store
+
+    parser = argparse.ArgumentParser(
+        prog="python -m autosage.warmup",
+        description="Pre-generate the most requested Smart Query reports into the response cache."
+    )
+    parser.add_argument("--targets", default=config.WARMUP_TARGETS or None,
+                        help="Ranked CSV of targets (columns: query, vehicle_type, purpose)")
+    parser.add_argument("--from-log", nargs="?", const=config.METRICS_LOG, default=None,
+                        help="Also warm the most asked queries in this metrics log "
+                             "(default: AUTOSAGE_METRICS_LOG)")
+    parser.add_argument("--top", type=int, default=config.WARMUP_TOP,
+                        help="How many logged queries to warm")
+    parser.add_argument("--since-hours", type=float, default=config.WARMUP_LOG_HOURS,
+                        help="Only count logged queries from this many hours back (0 = all)")
+    parser.add_argument("--workers", type=int, default=config.WARMUP_WORKERS)
+    parser.add_argument("--max-tokens", type=int, default=config.WARMUP_MAX_TOKENS,
+                        help="Token budget per run (0 = unlimited)")
+    parser.add_argument("--max-calls", type=int, default=0, help="Model call budget per run (0 = unlimited)")
+    parser.add_argument("--refresh-hours", type=float, default=config.WARMUP_REFRESH_SECONDS / 3600,
+                        help="Regenerate reports that expire within this many hours")
+    parser.add_argument("--structured", action="store_true", help="Warm structured JSON reports")
+    parser.add_argument("--every", type=float, default=0,
+                        help="Repeat every this many seconds instead of running once")
+    parser.add_argument("--stub", action="store_true",
+                        help="Use the offline fake backend with no latency (no API calls)")
+    parser.add_argument("--cache", help="Response cache file (default: the app's cache; "
+                                        "in-memory with --stub)")
+    args = parser.parse_args(argv)
+    if not args.targets and not args.from_log:
+        parser.error("nothing to warm: pass --targets and/or --from-log")
+
+    if args.stub:
+        model = FakeBackend(latency=0.05, tokens_per_second=0)
+    else:
+        if config.BACKEND == "gemini" and not config.GOOGLE_API_KEY:
+            parser.error("GOOGLE_API_KEY is not set (use --stub for an offline run)")
+        model = with_resilience(build_backend())
+    # Fake reports must never end up in the cache the app serves from
+    cache_path = args.cache or (":memory:" if args.stub else config.CACHE_PATH)
+    response_cache = ResponseCache(
+        cache_path, ttl_seconds=config.CACHE_TTL_SECONDS, max_bytes=config.CACHE_MAX_BYTES
+    )
+    warmer = CacheWarmer(
+        model, response_cache, spec_store=open_configured_store(), workers=args.workers,
+        max_tokens=args.max_tokens or None, max_calls=args.max_calls or None,
+        refresh_seconds=args.refresh_hours * 3600, structured=args.structured,
+        log=lambda message: print(message, file=sys.stderr),
+    )
+
+    def load_jobs():
+        return warmup_jobs(
+            args.targets, args.from_log, top=args.top,
+            since_seconds=args.since_hours * 3600 or None
+        )
+
+    while True:
+        summary = warmer.run(load_jobs())
+        print(json.dumps(summary))
+        if not args.every:
+            return 1 if summary["failed"] else 0
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
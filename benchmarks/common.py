@@ -0,0 +1,34 @@
+"""Helpers shared by the benchmark scripts."""
+import statistics
+import time
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(seconds):
+    """p50 / p95 / p99 / mean in milliseconds for a list of durations in seconds."""
+    ordered = sorted(seconds)
+    return {
+        "runs": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def repeat(fn, iterations, warmup=1):
+    """Run fn() ``iterations`` times after ``warmup`` untimed calls; returns durations."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return times
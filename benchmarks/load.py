@@ -0,0 +1,280 @@
+"""Load test: many concurrent AutoSage sessions in one process.
+
+Each simulated session is a headless AppTest of app.py, so they share the
+process-wide model, caches, job queue and metrics exactly as browser sessions
+on one ``streamlit run`` server do. AppTest can only run one script at a time
+per process, so reruns from different sessions take turns; as script reruns
+hold the GIL for most of their time on a server too, rerun latency under load
+still shows the queueing that users would see. Every session repeatedly picks a tab
+(--mix), fills its inputs, clicks and reruns until the report has been
+collected. The model is the offline fake backend with simulated latency
+(--latency / --tps), and the response cache stays on, so --distinct controls
+how often requests repeat.
+
+Each session count in --sessions runs in a fresh interpreter, so memory
+numbers don't carry over between levels:
+
+    python benchmarks/load.py --sessions 1,10,25,50 --duration 60 --out load.json
+
+Reported per level: completed analyses per second, click-to-report latency
+(p50 / p95 / p99, overall and per tab), script time of each rerun, process
+RSS (start, with idle sessions, peak) with the per-session share, and CPU
+time as cores busy and as a fraction of the machine.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from common import summarize
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = str(ROOT / "app.py")
+IMAGES = sorted((ROOT / "images").glob("car*.jpg"))
+
+QUERIES = [
+    "Best family SUV under 15 lakh",
+    "Compare Royal Enfield Classic 350 and Honda CB350",
+    "Is the Tata Nexon EV good for daily city use",
+    "Mileage and maintenance cost of Maruti Swift",
+]
+TABS = {"query": "prompt", "vision": "image_tab", "fusion": "prompt_image_tab"}
+
+# AppTest runs each script on a process-global Runtime, so sessions take turns
+# rerunning; reports are written by the shared job pool and overlap freely
+RERUN_LOCK = threading.Lock()
+
+
+def rss_bytes():
+    """Current resident set size (Linux), else the peak reported by getrusage."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system
+
+
+class Monitor:
+    """Samples RSS in the background to catch the peak."""
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak = rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in TABS:
+            raise SystemExit(f"unknown tab in --mix: {name!r} (use {', '.join(TABS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Session:
+    def __init__(self, index, args, deadline):
+        from streamlit.testing.v1 import AppTest
+
+        self.random = random.Random(args.seed + index)
+        self.args = args
+        self.deadline = deadline
+        self.at = AppTest.from_file(APP, default_timeout=args.timeout)
+        self.latencies = {name: [] for name in TABS}
+        self.reruns = []
+        self.errors = []
+
+    def rerun(self):
+        with RERUN_LOCK:
+            self.at.run()
+        self.reruns.append(self.at.session_state["last_rerun_seconds"])
+
+    def query(self):
+        return f"{self.random.choice(QUERIES)} #{self.random.randrange(self.args.distinct)}"
+
+    def upload(self):
+        image = self.random.choice(IMAGES)
+        return (image.name, image.read_bytes(), "image/jpeg")
+
+    def analyse(self, tab):
+        at = self.at
+        if tab == "query":
+            at.text_area(key="prompt_tab").input(self.query())
+        elif tab == "vision":
+            at.file_uploader[0].set_value(self.upload())
+        else:
+            at.file_uploader[1].set_value(self.upload())
+            at.text_area(key="Prompt_image_tab").input(self.query())
+        started = time.perf_counter()
+        at.button(key=TABS[tab]).click()
+        self.rerun()
+        while at.session_state["active_jobs"]:
+            if time.perf_counter() - started > self.args.timeout:
+                raise TimeoutError(f"{tab} report not collected after {self.args.timeout}s")
+            time.sleep(self.args.poll)
+            self.rerun()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        if tab in at.session_state["job_errors"]:
+            raise RuntimeError(at.session_state["job_errors"][tab][1])
+        return time.perf_counter() - started
+
+    def run(self, mix):
+        tabs, weights = list(mix), list(mix.values())
+        while time.time() < self.deadline:
+            tab = self.random.choices(tabs, weights)[0]
+            try:
+                self.latencies[tab].append(self.analyse(tab))
+            except Exception as ex:
+                self.errors.append(f"{tab}: {type(ex).__name__}: {ex}")
+            # Think time between clicks
+            time.sleep(self.random.uniform(0, self.args.think))
+
+
+def run_level(args):
+    """One session count, in this process; returns the level's results."""
+    os.environ["AUTOSAGE_BACKEND"] = "fake"
+    os.environ["AUTOSAGE_FAKE_LATENCY"] = str(args.latency)
+    os.environ["AUTOSAGE_FAKE_TPS"] = str(args.tps)
+    os.environ["AUTOSAGE_CACHE_PATH"] = ":memory:"
+    os.environ["AUTOSAGE_METRICS_LOG"] = ""
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+    sys.path.insert(0, str(ROOT))
+    mix = parse_mix(args.mix)
+
+    # Baseline with Streamlit and the app's modules loaded, so the per-session
+    # share only counts what each session adds
+    Session(-1, args, deadline=0).rerun()
+    rss_start = rss_bytes()
+    sessions = [Session(index, args, deadline=0) for index in range(args.level)]
+    for session in sessions:
+        session.rerun()
+    rss_idle = rss_bytes()
+
+    cpu_started, started = cpu_seconds(), time.perf_counter()
+    deadline = time.time() + args.duration
+    with Monitor() as monitor:
+        threads = []
+        for session in sessions:
+            session.deadline = deadline
+            threads.append(threading.Thread(target=session.run, args=(mix,), daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.perf_counter() - started
+    busy = (cpu_seconds() - cpu_started) / wall
+
+    latencies = {name: [s for session in sessions for s in session.latencies[name]] for name in TABS}
+    completed = [s for values in latencies.values() for s in values]
+    errors = [error for session in sessions for error in session.errors]
+    mb = 1024 * 1024
+    return {
+        "sessions": args.level,
+        "completed": len(completed),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "throughput_per_s": round(len(completed) / wall, 3),
+        "e2e": summarize(completed) if completed else None,
+        "e2e_by_tab": {name: summarize(values) for name, values in latencies.items() if values},
+        "rerun_script": summarize([s for session in sessions for s in session.reruns]),
+        "rss_mb": {
+            "start": round(rss_start / mb, 1),
+            "idle_sessions": round(rss_idle / mb, 1),
+            "peak": round(monitor.peak / mb, 1),
+        },
+        "rss_per_idle_session_kb": round((rss_idle - rss_start) / args.level / 1024, 1),
+        "cpu": {
+            "cores_busy": round(busy, 3),
+            "utilization": round(busy / (os.cpu_count() or 1), 3),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", default="1,5,10,25",
+                        help="Comma-separated concurrent session counts, one level each")
+    parser.add_argument("--duration", type=float, default=30.0,
+                        help="Seconds of load per level")
+    parser.add_argument("--mix", default="query=0.5,vision=0.3,fusion=0.2",
+                        help="Tab weights, e.g. query=0.5,vision=0.3,fusion=0.2")
+    parser.add_argument("--distinct", type=int, default=1000,
+                        help="Distinct query variants per base query (lower = more cache hits)")
+    parser.add_argument("--think", type=float, default=1.0,
+                        help="Maximum seconds a session waits between analyses")
+    parser.add_argument("--latency", type=float, default=0.3,
+                        help="Simulated seconds to first token")
+    parser.add_argument("--tps", type=float, default=2000.0,
+                        help="Simulated decode speed in tokens per second (0 = instant)")
+    parser.add_argument("--poll", type=float, default=0.1,
+                        help="Seconds between reruns while a report is being written")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Also write the JSON results to this file")
+    parser.add_argument("--level", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.level:
+        print(json.dumps(run_level(args)))
+        return
+
+    levels = []
+    for count in [int(value) for value in args.sessions.split(",") if value.strip()]:
+        out = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--level", str(count)] + sys.argv[1:],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        levels.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    output = {
+        "settings": {
+            "duration_s": args.duration,
+            "mix": parse_mix(args.mix),
+            "distinct": args.distinct,
+            "think_s": args.think,
+            "fake_latency_s": args.latency,
+            "fake_tokens_per_second": args.tps,
+            "cpu_count": os.cpu_count(),
+            "python": sys.version.split()[0],
+        },
+        "levels": levels,
+    }
+    text = json.dumps(output, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
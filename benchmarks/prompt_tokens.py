@@ -0,0 +1,125 @@
+"""Input tokens and latency: inline prompts vs system instructions + context cache.
+
+For each tab, the request is built twice: with the legacy prompt that repeats
+the role, rules and template in every call (AUTOSAGE_SYSTEM_INSTRUCTIONS=0),
+and with those sent as a system instruction. Token counts are estimated at
+four characters per token, or counted by the API with --live.
+
+Latency is measured against the fake backend with a simulated prompt
+processing speed (--prefill-tps), so only uncached input costs time; with
+--live the real model is called (needs GOOGLE_API_KEY and uses quota).
+
+    python benchmarks/prompt_tokens.py --iterations 10
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from common import summarize
+
+ROOT = Path(__file__).resolve().parent.parent
+IMAGE = ROOT / "images" / "car1.jpg"
+QUERY = "Is the Tata Nexon EV good for daily city use"
+
+
+def configure(args, system_instructions):
+    os.environ["AUTOSAGE_SYSTEM_INSTRUCTIONS"] = "1" if system_instructions else "0"
+    if not args.live:
+        os.environ["AUTOSAGE_BACKEND"] = "fake"
+        os.environ["AUTOSAGE_FAKE_LATENCY"] = str(args.latency)
+        os.environ["AUTOSAGE_FAKE_TPS"] = "0"
+        os.environ["AUTOSAGE_FAKE_PREFILL_TPS"] = str(args.prefill_tps)
+        os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+    os.environ["AUTOSAGE_CACHE_PATH"] = ":memory:"
+    os.environ["AUTOSAGE_CACHE_MAX_BYTES"] = "0"
+    os.environ["AUTOSAGE_METRICS_LOG"] = ""
+    from autosage import config, reports
+
+    importlib.reload(config)
+    importlib.reload(reports)
+    return config, reports
+
+
+def build_requests(config, reports):
+    from autosage.imaging import prepare_image
+
+    prepared = prepare_image(
+        IMAGE.read_bytes(), config.IMAGE_MAX_EDGE, config.IMAGE_MAX_BYTES,
+        config.IMAGE_FORMAT, config.IMAGE_QUALITY, config.THUMBNAIL_EDGE,
+    )
+    return {
+        "query": reports.query_request(QUERY, "Car", "Daily commute"),
+        "vision": reports.vision_request(prepared),
+        "fusion": reports.fusion_request(prepared, QUERY, "Car", "Daily commute"),
+    }
+
+
+def text_parts(request):
+    contents = [request.contents] if isinstance(request.contents, str) else request.contents
+    return [part for part in contents if isinstance(part, str)]
+
+
+def count_tokens(model, request, live):
+    """(system instruction tokens, per-request text tokens); images are left out."""
+    text = "\n".join(text_parts(request))
+    system = request.system_instruction or ""
+    if not live:
+        return len(system) // 4, len(text) // 4
+    count = model.model.count_tokens
+    return (count(system).total_tokens if system else 0), count(text).total_tokens
+
+
+def measure(args, system_instructions):
+    config, reports = configure(args, system_instructions)
+    from autosage.backends import build_backend
+    from autosage.generation import generate_text
+    from autosage.metrics import Trace
+
+    backend = build_backend()
+    results = {}
+    for kind, request in build_requests(config, reports).items():
+        system_tokens, content_tokens = count_tokens(backend, request, args.live)
+        seconds, cached = [], []
+        for _ in range(args.iterations):
+            trace = Trace(kind)
+            started = time.perf_counter()
+            generate_text(
+                backend, request.contents, generation_config=request.generation_config,
+                trace=trace, system_instruction=request.system_instruction,
+            )
+            seconds.append(time.perf_counter() - started)
+            cached.append(trace.cached_tokens or 0)
+        results[kind] = dict(
+            summarize(seconds),
+            system_tokens=system_tokens,
+            content_tokens=content_tokens,
+            # Tokens the model had to process on a warm call
+            uncached_tokens=system_tokens + content_tokens - (cached[-1] if cached else 0),
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2,
+                        help="Simulated seconds to first token, before prompt processing")
+    parser.add_argument("--prefill-tps", type=float, default=4000.0,
+                        help="Simulated prompt processing speed in tokens per second")
+    parser.add_argument("--live", action="store_true",
+                        help="Count tokens and time calls against the real model")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    print(json.dumps({
+        "inline_prompt": measure(args, system_instructions=False),
+        "system_instruction": measure(args, system_instructions=True),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""Benchmark suite: prompt build, image prep, rerun cost and end-to-end tab latency.
+
+Everything runs offline against the fake backend (AUTOSAGE_BACKEND=fake), so
+numbers are comparable between machines and runs; the model's latency and
+decode speed are simulated with --latency / --tps. The response cache is
+sized to zero so every end-to-end run pays for a model call, as a new query
+would.
+
+    python benchmarks/run.py --iterations 20 --out benchmark.json
+
+Results are printed (and optionally written) as JSON with p50 / p95 / p99 per
+measurement, in milliseconds:
+
+    prompt.*     building the request (prompt text + cache key) for each tab
+    image.*      decoding, resizing and encoding each sample photo, and hashing
+    cache.hit    a ResponseCache lookup that hits
+    specs.*      spec store lookups on the seed catalogue and a synthetic 30k-variant one
+    vision.*     Smart Vision as one call with the full prompt vs identification + a text
+                 report shared by every photo of the vehicle (first photo, then other photos)
+    fusion.*     Smart Fusion as one call vs identity + parallel section groups, with
+                 report length proportional to the sections asked for (--section-tokens)
+    burst.*      --burst sessions sending the same streamed Smart Query at once, with and
+                 without single-flight coalescing, with the number of upstream calls made
+    followup.*   --followups questions about one report: each as a new full report vs as
+                 follow-up turns (report as context, older turns summarized), with input
+                 tokens per turn (first / last / max, summary calls included) and answer length
+    app.rerun    script time of a rerun with no analysis (what every widget click costs)
+    e2e.*        button click to finished report for each tab, through AppTest
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import repeat, summarize
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = str(ROOT / "app.py")
+IMAGES = sorted((ROOT / "images").glob("car*.jpg"))
+
+QUERIES = [
+    "Best family SUV under 15 lakh",
+    "Compare Royal Enfield Classic 350 and Honda CB350",
+    "Is the Tata Nexon EV good for daily city use",
+    "Mileage and maintenance cost of Maruti Swift",
+]
+
+
+def configure(args):
+    # Must happen before autosage.config is imported
+    os.environ["AUTOSAGE_BACKEND"] = "fake"
+    os.environ["AUTOSAGE_FAKE_LATENCY"] = str(args.latency)
+    os.environ["AUTOSAGE_FAKE_TPS"] = str(args.tps)
+    os.environ["AUTOSAGE_CACHE_PATH"] = ":memory:"
+    os.environ["AUTOSAGE_CACHE_MAX_BYTES"] = "0"
+    os.environ["AUTOSAGE_METRICS_LOG"] = ""
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+    sys.path.insert(0, str(ROOT))
+
+
+def bench_prompts(iterations):
+    from autosage import config, reports
+    from autosage.imaging import prepare_image
+
+    prepared = prepare_image(
+        IMAGES[0].read_bytes(), config.IMAGE_MAX_EDGE, config.IMAGE_MAX_BYTES,
+        config.IMAGE_FORMAT, config.IMAGE_QUALITY, config.THUMBNAIL_EDGE,
+    )
+    cases = {
+        "prompt.query": lambda: reports.query_request(QUERIES[0], "SUV", "Family use"),
+        "prompt.vision": lambda: reports.vision_request(prepared),
+        "prompt.fusion": lambda: reports.fusion_request(
+            prepared, QUERIES[0], "SUV", "Family use"
+        ),
+    }
+    return {name: summarize(repeat(fn, iterations)) for name, fn in cases.items()}
+
+
+def bench_images(iterations):
+    from PIL import Image
+
+    from autosage import config, reports
+    from autosage.imaging import perceptual_hash, prepare_image
+
+    results = {}
+    for path in IMAGES:
+        data = path.read_bytes()
+
+        def prepare():
+            return prepare_image(
+                data, config.IMAGE_MAX_EDGE, config.IMAGE_MAX_BYTES,
+                config.IMAGE_FORMAT, config.IMAGE_QUALITY, config.THUMBNAIL_EDGE,
+            )
+
+        prepared = prepare()
+        results[f"image.prepare[{path.name}]"] = dict(
+            summarize(repeat(prepare, iterations)),
+            input_bytes=len(data), payload_bytes=prepared.payload_bytes,
+        )
+        decoded = Image.open(io.BytesIO(data))
+        decoded.load()
+        results[f"image.phash[{path.name}]"] = summarize(
+            repeat(lambda: perceptual_hash(decoded), iterations)
+        )
+        results[f"image.setup[{path.name}]"] = summarize(
+            repeat(lambda: reports.image_part(prepared), iterations)
+        )
+    return results
+
+
+def bench_cache(iterations):
+    from autosage.cache import ResponseCache
+
+    cache = ResponseCache(":memory:", ttl_seconds=3600, max_bytes=64 * 1024 * 1024)
+    cache.set("key", "x" * 8000)
+    return {"cache.hit": summarize(repeat(lambda: cache.get("key"), iterations))}
+
+
+def synthetic_catalogue(path, models=3000, variants=10, seed=0):
+    """A CSV shaped like data/vehicle_specs.csv with made-up model names."""
+    from autosage.specs import SPEC_FIELDS
+
+    rng = random.Random(seed)
+    syllables = ["ka", "ro", "zen", "tri", "vo", "lux", "mi", "ster", "na", "gal", "qu", "ex"]
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["brand", "model", "variant", "aliases"] + [key for key, _ in SPEC_FIELDS])
+        for index in range(models):
+            name = "".join(rng.choice(syllables) for _ in range(3)) + str(index)
+            for variant in range(variants):
+                writer.writerow([f"Brand{index % 40}", name, f"V{variant} Petrol MT", name.lower()]
+                                + ["1497 cc"] * len(SPEC_FIELDS))
+    return models * variants
+
+
+def bench_specs(iterations):
+    from autosage import config
+    from autosage.specs import SpecStore, open_spec_store
+
+    queries = QUERIES + ["Hyundai Creta SX(O) mileage", "best bike under 1 lakh"]
+    results = {}
+    seed_store = open_spec_store(":memory:", config.SPECS_CSV)
+    results["specs.lookup[seed]"] = summarize(
+        repeat(lambda: [seed_store.match(query) for query in queries], iterations)
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalogue.csv")
+        count = synthetic_catalogue(path)
+        large = SpecStore(":memory:")
+        started = time.perf_counter()
+        large.import_csv(path)
+        results["specs.import[30k]"] = summarize([time.perf_counter() - started])
+    results["specs.lookup[30k]"] = dict(
+        summarize(repeat(lambda: [large.match(query) for query in queries], iterations)),
+        variants=count, queries_per_run=len(queries),
+    )
+    return results
+
+
+def bench_sectioned(iterations, latency, tps, section_tokens):
+    from autosage import config, reports
+    from autosage.backends import FakeBackend
+    from autosage.cache import ImageReportCache, ResponseCache
+    from autosage.imaging import prepare_image
+    from autosage.sectioned import generate_sectioned
+
+    model = FakeBackend(latency=latency, tokens_per_second=tps, section_tokens=section_tokens)
+    prepared = prepare_image(
+        IMAGES[0].read_bytes(), config.IMAGE_MAX_EDGE, config.IMAGE_MAX_BYTES,
+        config.IMAGE_FORMAT, config.IMAGE_QUALITY, config.THUMBNAIL_EDGE,
+    )
+    # A zero-byte cache never hits, so every run pays for the model calls
+    responses = ResponseCache(":memory:", ttl_seconds=3600, max_bytes=0)
+    images = ImageReportCache(responses)
+
+    def single():
+        request = reports.fusion_request(prepared, QUERIES[2], "Car", "Daily commute")
+        return reports.generate_report(model, responses, images, request)
+
+    def sectioned():
+        request = reports.sectioned_fusion_request(prepared, QUERIES[2], "Car", "Daily commute")
+        return generate_sectioned(model, images, request, max_workers=config.FUSION_SECTION_WORKERS)
+
+    def verdict_chars(text):
+        # Shorter than the other sections' bodies when max_output_tokens cut it off
+        return len(text.partition("FINAL EXPERT VERDICT")[2])
+
+    return {
+        "fusion.single": dict(
+            summarize(repeat(single, iterations)), verdict_chars=verdict_chars(single())
+        ),
+        "fusion.sectioned": dict(
+            summarize(repeat(sectioned, iterations)), verdict_chars=verdict_chars(sectioned())
+        ),
+    }
+
+
+def bench_two_stage(iterations, latency, tps):
+    from autosage import config, reports
+    from autosage.backends import FakeBackend
+    from autosage.cache import ImageReportCache, ResponseCache
+    from autosage.imaging import prepare_image
+    from autosage.metrics import Trace
+    from autosage.vision import two_stage_report
+
+    model = FakeBackend(latency=latency, tokens_per_second=tps)
+    photos = [
+        prepare_image(
+            path.read_bytes(), config.IMAGE_MAX_EDGE, config.IMAGE_MAX_BYTES,
+            config.IMAGE_FORMAT, config.IMAGE_QUALITY, config.THUMBNAIL_EDGE,
+        )
+        for path in IMAGES
+    ]
+
+    def run(generate):
+        # Fresh caches per round: the first photo is cold, the rest are other
+        # photos of (what the fake backend always identifies as) the same vehicle
+        first, others, tokens = [], [], []
+        for _ in range(iterations):
+            responses = ResponseCache(":memory:", ttl_seconds=3600, max_bytes=64 * 1024 * 1024)
+            images = ImageReportCache(responses, max_distance=0)
+            for index, prepared in enumerate(photos):
+                trace = Trace("vision")
+                started = time.perf_counter()
+                generate(responses, images, prepared, trace)
+                if index:
+                    others.append(time.perf_counter() - started)
+                    tokens.append((trace.prompt_tokens or 0) + (trace.output_tokens or 0))
+                else:
+                    first.append(time.perf_counter() - started)
+        return first, others, sum(tokens) / len(tokens)
+
+    def single(responses, images, prepared, trace):
+        request = reports.vision_request(prepared)
+        reports.generate_report(model, responses, images, request, trace=trace)
+
+    def two_stage(responses, images, prepared, trace):
+        two_stage_report(model, responses, images, prepared, trace=trace)
+
+    results = {}
+    for name, generate in (("single", single), ("two_stage", two_stage)):
+        first, others, tokens = run(generate)
+        results[f"vision.{name}[first photo]"] = summarize(first)
+        results[f"vision.{name}[other photos]"] = dict(
+            summarize(others), mean_tokens_per_photo=round(tokens)
+        )
+    return results
+
+
+def bench_app(iterations):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+
+    reruns = []
+    for _ in range(iterations):
+        at.run()
+        reruns.append(at.session_state["last_rerun_seconds"])
+
+    def timed_click(button_key):
+        started = time.perf_counter()
+        at.button(key=button_key).click().run()
+        # Reports are written by background jobs; rerun until the page has picked it up
+        while at.session_state["active_jobs"]:
+            time.sleep(0.02)
+            at.run()
+        assert not at.exception, at.exception
+        return time.perf_counter() - started
+
+    tab1, tab2, tab3 = [], [], []
+    for i in range(iterations):
+        # A distinct query per run keeps the simulated model on the critical path
+        at.text_area(key="prompt_tab").input(f"{QUERIES[i % len(QUERIES)]} #{i}")
+        tab1.append(timed_click("prompt"))
+
+        image = IMAGES[i % len(IMAGES)]
+        upload = (image.name, image.read_bytes(), "image/jpeg")
+        at.file_uploader[0].set_value(upload)
+        tab2.append(timed_click("image_tab"))
+
+        at.file_uploader[1].set_value(upload)
+        at.text_area(key="Prompt_image_tab").input(f"{QUERIES[i % len(QUERIES)]} #{i}")
+        tab3.append(timed_click("prompt_image_tab"))
+
+    return {
+        "app.rerun": summarize(reruns),
+        "e2e.query": summarize(tab1),
+        "e2e.vision": summarize(tab2),
+        "e2e.fusion": summarize(tab3),
+    }
+
+
+def bench_burst(sessions, latency, tps):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from autosage import reports
+    from autosage.backends import FakeBackend
+    from autosage.cache import ResponseCache
+    from autosage.generation import cached_generate
+    from autosage.singleflight import SingleFlightModel
+
+    request = reports.query_request(QUERIES[0], "Car", "Buying Decision")
+    results = {}
+    for name, coalesce in (("separate", False), ("single_flight", True)):
+        upstream = FakeBackend(latency=latency, tokens_per_second=tps)
+        model = SingleFlightModel(upstream) if coalesce else upstream
+        responses = ResponseCache(":memory:", ttl_seconds=3600, max_bytes=64 * 1024 * 1024)
+
+        def session(_):
+            started = time.perf_counter()
+            cached_generate(
+                model, responses, request.contents, cache_key=request.cache_key,
+                on_chunk=lambda text: None, generation_config=request.generation_config,
+                system_instruction=request.system_instruction
+            )
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            seconds = list(pool.map(session, range(sessions)))
+        results[f"burst.{name}"] = dict(
+            summarize(seconds), sessions=sessions, upstream_calls=upstream.calls
+        )
+    return results
+
+
+def bench_followup(turns, latency, tps, section_tokens):
+    from autosage import reports
+    from autosage.backends import FakeBackend
+    from autosage.cache import ResponseCache
+    from autosage.followup import Conversation, ask
+    from autosage.generation import generate_text
+    from autosage.metrics import Trace
+
+    model = FakeBackend(latency=latency, tokens_per_second=tps, section_tokens=section_tokens)
+    responses = ResponseCache(":memory:", ttl_seconds=3600, max_bytes=64 * 1024 * 1024)
+    request = reports.query_request(QUERIES[0], "Car", "Buying Decision")
+    report = generate_text(
+        model, request.contents, generation_config=request.generation_config,
+        system_instruction=request.system_instruction
+    )
+    questions = [f"What about the diesel variant? ({turn + 1})" for turn in range(turns)]
+
+    def regenerate(question):
+        # Before follow-ups: each question was a new full report request
+        request = reports.query_request(f"{QUERIES[0]}. {question}", "Car", "Buying Decision")
+        trace = Trace("query")
+        generate_text(
+            model, request.contents, generation_config=request.generation_config, trace=trace,
+            system_instruction=request.system_instruction
+        )
+        return trace
+
+    conversation = Conversation.about(report)
+
+    def follow_up(question):
+        nonlocal conversation
+        trace = Trace("followup")
+        _, conversation = ask(model, responses, report, conversation, question, trace=trace)
+        return trace
+
+    results = {}
+    for name, turn in (("regenerate", regenerate), ("chat", follow_up)):
+        traces = [turn(question).finish() for question in questions]
+        prompt_tokens = [trace.prompt_tokens for trace in traces]
+        results[f"followup.{name}"] = dict(
+            summarize([trace.duration for trace in traces]), turns=turns,
+            prompt_tokens_first=prompt_tokens[0], prompt_tokens_last=prompt_tokens[-1],
+            prompt_tokens_max=max(prompt_tokens),
+            output_tokens_mean=round(sum(trace.output_tokens for trace in traces) / turns),
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--micro-iterations", type=int, default=200,
+                        help="Repetitions for the prompt, image and cache measurements")
+    parser.add_argument("--latency", type=float, default=0.3,
+                        help="Simulated seconds to first token")
+    parser.add_argument("--tps", type=float, default=2000.0,
+                        help="Simulated decode speed in tokens per second (0 = instant)")
+    parser.add_argument("--section-tokens", type=int, default=360,
+                        help="Simulated tokens per report section for the fusion.* runs")
+    parser.add_argument("--burst", type=int, default=16,
+                        help="Concurrent identical requests for the burst.* runs")
+    parser.add_argument("--followups", type=int, default=12,
+                        help="Follow-up questions per conversation for the followup.* runs")
+    parser.add_argument("--skip-app", action="store_true",
+                        help="Only run the measurements that don't need Streamlit")
+    parser.add_argument("--out", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    configure(args)
+    results = {}
+    results.update(bench_prompts(args.micro_iterations))
+    results.update(bench_images(max(1, args.micro_iterations // 10)))
+    results.update(bench_cache(args.micro_iterations))
+    results.update(bench_specs(max(1, args.micro_iterations // 10)))
+    results.update(bench_two_stage(max(1, args.iterations // 4), args.latency, args.tps))
+    results.update(bench_sectioned(
+        max(1, args.iterations // 4), args.latency, args.tps, args.section_tokens
+    ))
+    results.update(bench_burst(args.burst, args.latency, args.tps))
+    results.update(bench_followup(args.followups, args.latency, args.tps, args.section_tokens))
+    if not args.skip_app:
+        results.update(bench_app(args.iterations))
+
+    output = {
+        "settings": {
+            "iterations": args.iterations,
+            "micro_iterations": args.micro_iterations,
+            "fake_latency_s": args.latency,
+            "fake_tokens_per_second": args.tps,
+            "python": sys.version.split()[0],
+        },
+        "results": results,
+    }
+    text = json.dumps(output, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
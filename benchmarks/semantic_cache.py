@@ -0,0 +1,107 @@
+"""Semantic cache quality and lookup latency.
+
+Quality: hit rate on pairs that should share a report and false-hit rate on
+pairs that must not, for a few similarity thresholds. Latency: lookup p50 /
+p95 as the index grows (synthetic queries, one partition, the worst case).
+
+    python benchmarks/semantic_cache.py --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+from common import summarize
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (earlier query, new query) that should reuse the earlier report
+SAME = [
+    ("best bike under 1 lakh", "top motorcycle below ₹100000"),
+    ("best bike under 1 lakh", "Suggest a good motorbike within Rs 1,00,000"),
+    ("Best family SUV under 15 lakh", "top family suv below 15L"),
+    ("Best family SUV under 15 lakh", "Which is the best family SUV under 15 lakhs?"),
+    ("best electric scooter under 1.5 lakh", "top EV scooters below 150000"),
+    ("Royal Enfield Classic 350 review", "royal enfield classic 350 review please"),
+    ("Hyundai Creta mileage", "Hyundai Creta fuel efficiency"),
+    ("cheap car with good mileage", "budget car with best kmpl"),
+    ("best 7 seater car under 20 lakh", "top 7 seater cars below ₹20,00,000"),
+    ("Tata Nexon EV range", "tata nexon electric vehicle range"),
+]
+# Pairs that must not share a report
+DIFFERENT = [
+    ("best bike under 1 lakh", "best bike under 2 lakh"),
+    ("best bike under 1 lakh", "best scooter under 1 lakh"),
+    ("Hyundai Creta mileage", "Kia Seltos mileage"),
+    ("Tata Nexon EV range", "Tata Nexon EV price"),
+    ("best family SUV under 15 lakh", "best sedan under 15 lakh"),
+    ("Royal Enfield Classic 350 review", "Royal Enfield Hunter 350 review"),
+    ("best 7 seater car under 20 lakh", "best 5 seater car under 20 lakh"),
+    ("Maruti Swift maintenance cost", "Maruti Swift resale value"),
+    ("best electric scooter under 1.5 lakh", "best petrol scooter under 1.5 lakh"),
+    ("cheap car with good mileage", "cheap car with good safety"),
+]
+
+VOCAB = ["best", "bike", "car", "suv", "scooter", "sedan", "electric", "diesel", "petrol",
+         "mileage", "safety", "family", "city", "highway", "under", "lakh", "review",
+         "maintenance", "resale", "automatic", "manual", "seater", "cng", "hybrid"]
+
+
+def quality(thresholds):
+    from autosage.semantic import SemanticCache
+
+    results = {}
+    for threshold in thresholds:
+        counts = {"hits": 0, "false_hits": 0}
+        for label, pairs in (("hits", SAME), ("false_hits", DIFFERENT)):
+            for earlier, new in pairs:
+                cache = SemanticCache(threshold=threshold)
+                cache.add(earlier, ("p",), "key")
+                counts[label] += cache.lookup(new, ("p",)) is not None
+        results[str(threshold)] = {
+            "hit_rate": round(counts["hits"] / len(SAME), 3),
+            "false_hit_rate": round(counts["false_hits"] / len(DIFFERENT), 3),
+        }
+    return results
+
+
+def latency(sizes, lookups):
+    from autosage.semantic import SemanticCache
+
+    rng = random.Random(0)
+    results = {}
+    for size in sizes:
+        cache = SemanticCache()
+        started = time.perf_counter()
+        for index in range(size):
+            words = rng.sample(VOCAB, 5)
+            cache.add(f"{' '.join(words)} {index}", ("p",), f"key{index}")
+        build = time.perf_counter() - started
+        probes = [" ".join(rng.sample(VOCAB, 5)) for _ in range(lookups)]
+        times = []
+        for probe in probes:
+            started = time.perf_counter()
+            cache.lookup(probe, ("p",))
+            times.append(time.perf_counter() - started)
+        results[str(size)] = dict(summarize(times), build_seconds=round(build, 2))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.85, 0.9, 0.95])
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    print(json.dumps({
+        "quality": quality(args.thresholds),
+        "lookup_latency": latency(args.sizes, args.lookups),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
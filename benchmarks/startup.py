@@ -0,0 +1,78 @@
+"""Cold-start and warm-rerun timing for app.py.
+
+Cold start runs the script once in a fresh interpreter (what the first
+session after a deploy pays); warm reruns repeat the script in one process,
+which is what every widget interaction costs. Script time is what app.py
+records for itself in ``last_rerun_seconds``; total time also includes the
+AppTest harness, which polls the script thread.
+
+    python benchmarks/startup.py --cold 5 --reruns 30
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from common import summarize
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = str(ROOT / "app.py")
+
+COLD_RUN = """
+import time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.run()
+print(time.perf_counter() - start, at.session_state["last_rerun_seconds"])
+"""
+
+
+def cold_start(runs):
+    totals, scripts = [], []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", COLD_RUN.format(app=APP)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        total, script = out.stdout.strip().splitlines()[-1].split()
+        totals.append(float(total))
+        scripts.append(float(script))
+    return totals, scripts
+
+
+def warm_reruns(runs):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+    totals, scripts = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        totals.append(time.perf_counter() - start)
+        scripts.append(at.session_state["last_rerun_seconds"])
+    return totals, scripts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cold", type=int, default=5)
+    parser.add_argument("--reruns", type=int, default=30)
+    args = parser.parse_args()
+
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+    cold_total, cold_script = cold_start(args.cold)
+    warm_total, warm_script = warm_reruns(args.reruns)
+    result = {
+        "cold_start": {"total": summarize(cold_total), "script": summarize(cold_script)},
+        "warm_rerun": {"total": summarize(warm_total), "script": summarize(warm_script)},
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
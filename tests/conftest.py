@@ -0,0 +1,33 @@
+"""Shared setup: every test runs offline against the fake backend."""
+import os
+import sys
+from pathlib import Path
+
+# Must happen before autosage.config is imported
+os.environ["AUTOSAGE_BACKEND"] = "fake"
+os.environ["AUTOSAGE_CACHE_PATH"] = ":memory:"
+os.environ["AUTOSAGE_METRICS_LOG"] = ""
+os.environ.setdefault("GOOGLE_API_KEY", "test-placeholder")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest  # noqa: E402
+
+
+class Clock:
+    """Stand-in for time.time / time.monotonic that only moves when told to."""
+
+    def __init__(self, start=1_000_000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr("time.time", fake)
+    return fake
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from autosage.backends import FakeBackend
+from autosage.batch import (
+    completed_ids, drop_partial_line, query_jobs, read_records, run_pipeline, write_parquet
+)
+from autosage.cache import ImageReportCache, ResponseCache
+
+QUERIES = [
+    "Best family SUV under 15 lakh",
+    "Mileage and maintenance cost of Maruti Swift",
+    "Is the Tata Nexon EV good for daily city use",
+    "Best bike under 1 lakh",
+]
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    csv_path = tmp_path / "queries.csv"
+    csv_path.write_text(
+        "query,vehicle_type,purpose\n" + "".join(f"{query},Car,\n" for query in QUERIES),
+        encoding="utf-8",
+    )
+    return query_jobs(csv_path)
+
+
+def run(jobs, out_path, failure_rate=0.0):
+    model = FakeBackend(latency=0, tokens_per_second=0, failure_rate=failure_rate)
+    responses = ResponseCache(":memory:", ttl_seconds=3600, max_bytes=64 * 1024 * 1024)
+    counts = run_pipeline(
+        jobs, str(out_path), model, responses, ImageReportCache(responses),
+        workers=2, log=lambda message: None
+    )
+    return counts, model
+
+
+def lines(out_path):
+    return out_path.read_text(encoding="utf-8").splitlines()
+
+
+def test_every_job_gets_one_record(jobs, tmp_path):
+    out_path = tmp_path / "reports.jsonl"
+    counts, _ = run(jobs, out_path)
+    assert counts == {"ok": len(QUERIES), "error": 0}
+    records = [json.loads(line) for line in lines(out_path)]
+    assert {record["id"] for record in records} == {job.id for job in jobs}
+    assert all(record["report"] for record in records)
+
+
+def test_rerun_skips_finished_jobs(jobs, tmp_path):
+    out_path = tmp_path / "reports.jsonl"
+    run(jobs, out_path)
+    counts, model = run(jobs, out_path)
+    assert counts == {"ok": 0, "error": 0}
+    assert model.calls == 0
+
+
+def test_failed_jobs_are_retried_on_resume(jobs, tmp_path):
+    out_path = tmp_path / "reports.jsonl"
+    counts, _ = run(jobs, out_path, failure_rate=1.0)
+    assert counts["error"] == len(QUERIES)
+    assert completed_ids(str(out_path)) == set()
+    counts, _ = run(jobs, out_path)
+    assert counts["ok"] == len(QUERIES)
+
+
+def test_resume_after_a_crash_mid_line(jobs, tmp_path):
+    out_path = tmp_path / "reports.jsonl"
+    run(jobs, out_path)
+    # A crash while writing the third record
+    kept = lines(out_path)[:2]
+    out_path.write_text("\n".join(kept) + "\n" + lines(out_path)[2][:40], encoding="utf-8")
+
+    counts, _ = run(jobs, out_path)
+    assert counts["ok"] == len(QUERIES) - 2
+    records = [json.loads(line) for line in lines(out_path)]   # every line parses
+    assert len(records) == len(QUERIES)
+    assert completed_ids(str(out_path)) == {job.id for job in jobs}
+
+
+@pytest.mark.parametrize("content, expected", [
+    ("", ""),
+    ('{"id": 1}\n', '{"id": 1}\n'),
+    ('{"id": 1}\n{"id"', '{"id": 1}\n'),
+    ('{"id"', ""),
+])
+def test_drop_partial_line(tmp_path, content, expected):
+    path = tmp_path / "reports.jsonl"
+    path.write_text(content, encoding="utf-8")
+    drop_partial_line(str(path))
+    assert path.read_text(encoding="utf-8") == expected
+
+
+def test_read_records_skips_broken_lines(tmp_path):
+    path = tmp_path / "reports.jsonl"
+    path.write_text('{"id": "a"}\n{"id": "b", "rep\n{"id": "c"}\n', encoding="utf-8")
+    assert [record["id"] for record in read_records(str(path))] == ["a", "c"]
+
+
+def test_parquet_from_a_log_with_a_broken_line(jobs, tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    out_path = tmp_path / "reports.jsonl"
+    run(jobs, out_path)
+    with open(out_path, "a", encoding="utf-8") as handle:
+        handle.write('{"id": "cut off')
+    parquet_path = tmp_path / "reports.parquet"
+    write_parquet(str(out_path), str(parquet_path))
+    frame = pd.read_parquet(parquet_path)
+    assert sorted(frame["id"]) == sorted(job.id for job in jobs)
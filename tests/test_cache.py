@@ -0,0 +1,54 @@
+from autosage import prompts
+from autosage.cache import ResponseCache, make_cache_key
+
+
+def make_cache(ttl_seconds=60, max_bytes=1_000_000):
+    return ResponseCache(":memory:", ttl_seconds=ttl_seconds, max_bytes=max_bytes)
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = make_cache(ttl_seconds=60)
+    cache.set("key", "report")
+    clock.advance(59)
+    assert cache.get("key") == "report"
+    assert cache.expires_in("key") == 1
+    clock.advance(2)
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entries_are_dropped_on_write(clock):
+    cache = make_cache(ttl_seconds=60)
+    cache.set("old", "report")
+    clock.advance(61)
+    cache.set("new", "report")
+    assert cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_entries_are_evicted_past_the_budget(clock):
+    cache = make_cache(max_bytes=25)
+    cache.set("a", "x" * 10)
+    clock.advance(1)
+    cache.set("b", "x" * 10)
+    clock.advance(1)
+    assert cache.get("a") is not None      # "b" is now the least recently used
+    clock.advance(1)
+    cache.set("c", "x" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["bytes"] <= 25
+
+
+def test_cache_key_folds_query_formatting():
+    config = {"temperature": 0.3}
+    assert make_cache_key("query", "Best bike, under 1 lakh!", "Bike", "", "m", config) == \
+        make_cache_key("query", "best bike under 1 lakh", "bike", "", "m", config)
+    assert make_cache_key("query", "best bike", "", "", "m", config) != \
+        make_cache_key("query", "best car", "", "", "m", config)
+
+
+def test_cache_key_changes_with_the_prompts(monkeypatch):
+    before = make_cache_key("query", "best bike", "", "", "m", {})
+    monkeypatch.setattr(prompts, "PROMPTS_DIGEST", "changed")
+    assert make_cache_key("query", "best bike", "", "", "m", {}) != before
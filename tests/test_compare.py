@@ -0,0 +1,45 @@
+import pytest
+
+from autosage.backends import synthesize_json
+from autosage.compare import comparison_table, parse_vehicle_list, run_concurrently
+from autosage.structured import parse_report, response_schema
+
+
+@pytest.mark.parametrize("text, names", [
+    ("Creta vs Seltos, Brezza", ["Creta", "Seltos", "Brezza"]),
+    ("Creta versus Seltos", ["Creta", "Seltos"]),
+    ("Compare Creta and Seltos", ["Creta", "Seltos"]),
+    ("compare: Nexon vs. Venue?", ["Nexon", "Venue"]),
+    ("Difference between Swift and Baleno", ["Swift", "Baleno"]),
+    ("Pulsar N160 / N250 vs Apache RTR 160", ["Pulsar N160 / N250", "Apache RTR 160"]),
+    ("Ertiga CNG/Petrol; Carens", ["Ertiga CNG/Petrol", "Carens"]),
+    ("Creta\nSeltos\ncreta", ["Creta", "Seltos"]),
+    ("", []),
+])
+def test_parse_vehicle_list(text, names):
+    assert parse_vehicle_list(text, limit=4) == names
+
+
+def test_parse_vehicle_list_limit():
+    assert parse_vehicle_list("A, B, C, D, E", limit=3) == ["A", "B", "C"]
+
+
+def test_run_concurrently_keeps_order_and_isolates_failures():
+    def fn(item):
+        if item == 2:
+            raise ValueError("no report")
+        return item * 10
+
+    results = run_concurrently(fn, [1, 2, 3], max_workers=2)
+    assert [result for result, _ in results] == [10, None, 30]
+    assert isinstance(results[1][1], ValueError)
+    assert run_concurrently(fn, [], max_workers=2) == []
+
+
+def test_comparison_table():
+    pytest.importorskip("pandas")
+    report = parse_report("query", synthesize_json(response_schema("query")))
+    table = comparison_table(["Creta", "Seltos"], [report, report])
+    assert list(table.columns) == ["Creta", "Seltos"]
+    assert table.loc["Brand", "Creta"] == "Sample value"
+    assert table.loc["Overall Score (avg)", "Seltos"] == "7.0"
@@ -0,0 +1,133 @@
+import pytest
+
+from autosage import config, prompts
+from autosage.backends import CHARS_PER_TOKEN, FakeAPIError, FakeBackend
+from autosage.cache import ResponseCache
+from autosage.followup import Conversation, ask, compact, report_id, trim
+from autosage.metrics import Trace
+
+REPORT = "🔷 VEHICLE OVERVIEW\n- Hyundai Creta SX(O)\n\n🔷 FINAL VERDICT\n- Good family SUV"
+
+
+class SummaryFails:
+    """FakeBackend whose summary calls fail."""
+
+    def __init__(self):
+        self.backend = FakeBackend(latency=0, tokens_per_second=0, output_tokens=100)
+        self.summary_calls = 0
+
+    def generate_content(self, contents, stream=False, system_instruction=None, **kwargs):
+        if system_instruction == prompts.SUMMARY_SYSTEM:
+            self.summary_calls += 1
+            raise FakeAPIError(503, "summary failed")
+        return self.backend.generate_content(
+            contents, stream=stream, system_instruction=system_instruction, **kwargs
+        )
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    """A history budget of about three short exchanges, two kept verbatim."""
+    monkeypatch.setattr(config, "SYSTEM_INSTRUCTIONS", True)
+    monkeypatch.setattr(config, "FOLLOWUP_MAX_TOKENS", 25)
+    monkeypatch.setattr(config, "FOLLOWUP_HISTORY_TOKENS", 80)
+    monkeypatch.setattr(config, "FOLLOWUP_KEEP_TURNS", 2)
+    monkeypatch.setattr(config, "FOLLOWUP_MAX_TURNS", 4)
+
+
+@pytest.fixture
+def responses():
+    return ResponseCache(":memory:", ttl_seconds=3600, max_bytes=64 * 1024 * 1024)
+
+
+def model():
+    return FakeBackend(latency=0, tokens_per_second=0, output_tokens=100)
+
+
+def turns(count, size=40):
+    return [(f"question {index}?", "a" * size) for index in range(count)]
+
+
+def test_conversation_belongs_to_its_report():
+    conversation = Conversation.about(REPORT)
+    assert conversation.report_id == report_id(REPORT) != report_id(REPORT + " ")
+    assert conversation.turns == [] and conversation.history_tokens() == 0
+
+
+def test_ask_returns_a_new_conversation(budget, responses):
+    conversation = Conversation.about(REPORT)
+    answer, after = ask(model(), responses, REPORT, conversation, "What about the diesel?")
+    assert answer
+    assert conversation.turns == []
+    assert after.turns == [("What about the diesel?", answer)]
+
+
+def test_same_question_in_the_same_state_is_cached(budget, responses):
+    fake = model()
+    conversation = Conversation.about(REPORT)
+    first, _ = ask(fake, responses, REPORT, conversation, "What about the diesel?")
+    second, _ = ask(fake, responses, REPORT, conversation, "what about the diesel")
+    assert first == second and fake.calls == 1
+
+
+def test_answers_are_bounded(budget, responses):
+    answer, _ = ask(model(), responses, REPORT, Conversation.about(REPORT), "Tell me everything")
+    assert len(answer) <= config.FOLLOWUP_MAX_TOKENS * CHARS_PER_TOKEN
+
+
+def test_compact_waits_for_the_budget(budget):
+    fake = model()
+    conversation = Conversation("id", turns=turns(2, size=400))
+    # Over budget, but only the turns that are always kept
+    assert compact(fake, conversation) is conversation
+    conversation = Conversation("id", turns=turns(3, size=10))
+    assert compact(fake, conversation) is conversation
+    assert fake.calls == 0
+
+
+def test_compact_folds_older_turns_into_the_summary(budget):
+    fake = model()
+    trace = Trace("followup")
+    conversation = Conversation("id", turns=turns(4, size=200))
+    compacted = compact(fake, conversation, trace)
+    assert fake.calls == 1
+    assert compacted.summary
+    assert compacted.context_from == 2
+    assert compacted.context_turns == conversation.turns[2:]
+    assert compacted.turns == conversation.turns
+    assert "summary" in trace.spans and trace.output_tokens
+
+
+def test_failed_summary_keeps_turns_verbatim(budget):
+    fake = SummaryFails()
+    conversation = Conversation("id", turns=turns(4, size=200))
+    assert compact(fake, conversation) is conversation
+    assert fake.summary_calls == 1
+
+
+def test_history_stays_bounded_over_a_long_chat(budget, responses):
+    fake = model()
+    conversation = Conversation.about(REPORT)
+    sent = []
+    for index in range(12):
+        sent.append(conversation.history_tokens())
+        _, conversation = ask(fake, responses, REPORT, conversation, f"question {index}?")
+    keep = config.FOLLOWUP_KEEP_TURNS
+    assert len(conversation.context_turns) <= keep + 1
+    most = config.FOLLOWUP_HISTORY_TOKENS + config.FOLLOWUP_MAX_TOKENS
+    assert max(sent) <= most + config.FOLLOWUP_SUMMARY_MAX_TOKENS
+    assert len(conversation.turns) <= config.FOLLOWUP_MAX_TURNS
+
+
+def test_trim_only_drops_summarized_turns(budget):
+    conversation = Conversation("id", summary="s", turns=turns(7), context_from=2)
+    trimmed = trim(conversation)
+    # Over FOLLOWUP_MAX_TURNS by three, but only two are in the summary
+    assert trimmed.turns == conversation.turns[2:]
+    assert trimmed.context_from == 0
+    assert trimmed.context_turns == conversation.context_turns
+
+
+def test_trim_within_limit_is_a_no_op(budget):
+    conversation = Conversation("id", summary="s", turns=turns(4), context_from=2)
+    assert trim(conversation) is conversation
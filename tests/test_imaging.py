@@ -0,0 +1,110 @@
+import io
+
+import pytest
+from PIL import Image, JpegImagePlugin, UnidentifiedImageError
+
+from autosage.imaging import _encode, hamming_distance, prepare_image
+
+
+def gradient(width, height, mode="RGB"):
+    return Image.linear_gradient("L").resize((width, height)).convert(mode)
+
+
+def jpeg(image, quality=60, **kwargs):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, **kwargs)
+    return buffer.getvalue()
+
+
+def noise(width, height):
+    return Image.frombytes("RGB", (width, height), bytes(
+        (x * 7919 + y * 104729) % 251 for y in range(height) for x in range(width * 3)
+    ))
+
+
+def test_small_clean_jpeg_passes_through():
+    data = jpeg(noise(320, 240), quality=40)
+    prepared = prepare_image(data, max_edge=1536)
+    assert prepared.data == data
+    assert (prepared.width, prepared.height) == (320, 240)
+    assert prepared.original_bytes == len(data)
+
+
+def test_clean_jpeg_is_reencoded_when_that_is_smaller():
+    data = jpeg(gradient(320, 240), quality=95)
+    prepared = prepare_image(data, max_edge=1536)
+    assert len(prepared.data) < len(data)
+
+
+def test_metadata_forces_reencode():
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    data = jpeg(gradient(320, 240), exif=exif.tobytes())
+    prepared = prepare_image(data, max_edge=1536)
+    assert prepared.data != data
+    assert not Image.open(io.BytesIO(prepared.data)).getexif()
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[0x0112] = 6    # rotate 90° clockwise on display
+    prepared = prepare_image(jpeg(gradient(320, 240), exif=exif.tobytes()))
+    assert (prepared.width, prepared.height) == (240, 320)
+
+
+def test_large_jpeg_uses_draft_and_is_downscaled(monkeypatch):
+    requested = []
+    original = JpegImagePlugin.JpegImageFile.draft
+
+    def draft(self, mode, size):
+        requested.append(size)
+        return original(self, mode, size)
+
+    monkeypatch.setattr(JpegImagePlugin.JpegImageFile, "draft", draft)
+    prepared = prepare_image(jpeg(gradient(4000, 3000)), max_edge=800)
+    assert requested == [(800, 800)]
+    assert max(prepared.width, prepared.height) == 800
+    assert prepared.width / prepared.height == pytest.approx(4 / 3, rel=0.01)
+
+
+def test_transparent_png_is_flattened_on_white():
+    image = Image.new("RGBA", (64, 64), (0, 0, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    prepared = prepare_image(buffer.getvalue(), fmt="JPEG")
+    assert prepared.mime_type == "image/jpeg"
+    pixel = Image.open(io.BytesIO(prepared.data)).getpixel((32, 32))
+    assert min(pixel) > 240
+
+
+def test_quality_is_lowered_to_meet_the_byte_budget():
+    image = noise(400, 300)
+    full = _encode(image, "JPEG", 85, max_bytes=10**9)
+    budget = len(full) * 2 // 3
+    reduced = _encode(image, "JPEG", 85, max_bytes=budget)
+    assert len(reduced) <= budget
+
+
+def test_quality_loop_stops_at_the_floor():
+    image = noise(400, 300)
+    # 85, 75, ... down to the first step at or below min_quality=40
+    floor = _encode(image, "JPEG", 35, max_bytes=10**9)
+    assert _encode(image, "JPEG", 85, max_bytes=1) == floor
+
+
+def test_reencoded_copies_have_close_perceptual_hashes():
+    image = noise(200, 150).resize((800, 600))
+    first = prepare_image(jpeg(image, quality=90))
+    second = prepare_image(jpeg(image.resize((640, 480)), quality=50))
+    assert first.digest != second.digest
+    assert hamming_distance(first.phash, second.phash) <= 6
+
+
+def test_thumbnail_is_small():
+    prepared = prepare_image(jpeg(gradient(1200, 900)), thumbnail_edge=200)
+    assert max(Image.open(io.BytesIO(prepared.thumbnail)).size) == 200
+
+
+def test_unreadable_data_raises():
+    with pytest.raises(UnidentifiedImageError):
+        prepare_image(b"not an image")
@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from autosage.jobs import CANCELLED, DONE, FAILED, JobCancelled, JobQueue
+
+
+@pytest.fixture
+def jobs():
+    queue = JobQueue(max_workers=1, keep_seconds=60)
+    yield queue
+    queue._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def blocking(gate, result="report"):
+    def fn(job):
+        gate.wait(5)
+        return result
+    return fn
+
+
+def test_result_and_release(jobs):
+    job = jobs.submit("query", lambda job: "report")
+    assert job.wait(5)
+    assert job.status == DONE and job.result == "report"
+    jobs.release(job.id)
+    assert jobs.get(job.id) is None
+
+
+def test_release_keeps_running_job(jobs):
+    gate = threading.Event()
+    job = jobs.submit("query", blocking(gate))
+    jobs.release(job.id)
+    assert jobs.get(job.id) is job
+    gate.set()
+    job.wait(5)
+
+
+def test_failure(jobs):
+    def fn(job):
+        raise ValueError("boom")
+    job = jobs.submit("query", fn)
+    assert job.wait(5)
+    assert job.status == FAILED and isinstance(job.error, ValueError)
+
+
+def test_wait_times_out_on_running_job(jobs):
+    gate = threading.Event()
+    job = jobs.submit("query", blocking(gate))
+    assert not job.wait(0.05)
+    gate.set()
+    assert job.wait(5)
+
+
+def test_queued_job_cancelled_never_runs(jobs):
+    gate = threading.Event()
+    ran = []
+    first = jobs.submit("query", blocking(gate))
+    second = jobs.submit("query", lambda job: ran.append(job.id))
+    jobs.cancel(second.id)
+    gate.set()
+    assert first.wait(5) and second.wait(5)
+    assert second.status == CANCELLED and ran == []
+
+
+def test_discard_forgets_running_job_and_drops_late_result(jobs):
+    gate = threading.Event()
+    job = jobs.submit("query", blocking(gate))
+    assert jobs.discard(job.id) is job
+    assert jobs.get(job.id) is None
+    gate.set()
+    assert job.wait(5)
+    assert job.status == CANCELLED and job.result is None
+
+
+def test_progress_raises_after_cancel(jobs):
+    gate = threading.Event()
+    published = []
+
+    def fn(job):
+        job.progress("partial")
+        published.append(job.text)
+        gate.wait(5)
+        job.progress("more")
+        return "report"
+
+    job = jobs.submit("query", fn)
+    while not published:
+        job.wait(0.01)
+    jobs.discard(job.id)
+    gate.set()
+    assert job.wait(5)
+    assert job.status == CANCELLED and isinstance(job.error, JobCancelled)
+    assert job.text == "partial"
@@ -0,0 +1,85 @@
+import json
+import socket
+import urllib.request
+
+from autosage.metrics import MetricsRegistry, Trace
+
+
+def trace(kind="query"):
+    trace = Trace(kind)
+    trace.inputs = {"query": "best bike under 1 lakh"}
+    return trace
+
+
+def records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_log_rotates_past_max_bytes(tmp_path):
+    log = tmp_path / "metrics.jsonl"
+    registry = MetricsRegistry(str(log), max_bytes=600, backups=2)
+    for _ in range(20):
+        registry.record(trace())
+    assert log.stat().st_size <= 600
+    assert (tmp_path / "metrics.jsonl.1").stat().st_size <= 600
+    assert (tmp_path / "metrics.jsonl.2").exists()
+    # The oldest backup is dropped
+    assert not (tmp_path / "metrics.jsonl.3").exists()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "metrics.jsonl", "metrics.jsonl.1", "metrics.jsonl.2"
+    ]
+
+
+def test_log_never_rotates_without_max_bytes(tmp_path):
+    log = tmp_path / "metrics.jsonl"
+    registry = MetricsRegistry(str(log))
+    for _ in range(20):
+        registry.record(trace())
+    assert len(records(log)) == 20
+    assert [path.name for path in tmp_path.iterdir()] == ["metrics.jsonl"]
+
+
+def test_inputs_only_logged_when_enabled(tmp_path):
+    for log_inputs in (False, True):
+        log = tmp_path / f"metrics-{log_inputs}.jsonl"
+        MetricsRegistry(str(log), log_inputs=log_inputs).record(trace())
+        assert ("inputs" in records(log)[0]) is log_inputs
+
+
+def test_render_counts_requests():
+    registry = MetricsRegistry()
+    registry.record(trace())
+    failed = trace("vision")
+    failed.fail(RuntimeError("boom"))
+    registry.record(failed)
+    text = registry.render()
+    assert 'autosage_requests_total{kind="query",status="ok"} 1' in text
+    assert 'autosage_requests_total{kind="vision",status="error"} 1' in text
+    assert 'autosage_request_seconds_count{kind="query"} 1' in text
+
+
+def test_serve_and_port_conflict():
+    registry = MetricsRegistry()
+    registry.record(trace())
+    server = registry.serve(0)
+    try:
+        host, port = server.server_address
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            assert b"autosage_requests_total" in response.read()
+        # A second exporter on a port in use runs on without the endpoint
+        assert MetricsRegistry().serve(port) is None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_serve_on_configured_host():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = MetricsRegistry().serve(port, host="0.0.0.0")
+    try:
+        assert server.server_address[0] == "0.0.0.0"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from autosage.backends import FakeAPIError, FakeBackend
+from autosage.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceededError, RateLimiter, ResilientModel
+)
+
+
+def resilient(backend, failure_threshold=3, reset_timeout=30, **kwargs):
+    kwargs.setdefault("base_delay", 0.0)
+    breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+    model = ResilientModel(backend, RateLimiter(60_000, 10**9), breaker, **kwargs)
+    return model, breaker
+
+
+def test_retryable_errors_are_retried_then_raised():
+    backend = FakeBackend(latency=0, tokens_per_second=0, failure_rate=1.0)
+    model, breaker = resilient(backend, failure_threshold=10, max_retries=2)
+    with pytest.raises(FakeAPIError):
+        model.generate_content("prompt")
+    assert backend.calls == 3
+    assert breaker.failures == 3
+    assert breaker.state == "closed"
+
+
+def test_client_errors_are_not_retried_and_dont_trip_the_breaker():
+    backend = FakeBackend(latency=0, tokens_per_second=0, failure_rate=1.0, failure_code=400)
+    model, breaker = resilient(backend, failure_threshold=1)
+    with pytest.raises(FakeAPIError):
+        model.generate_content("prompt")
+    assert backend.calls == 1
+    assert breaker.state == "closed"
+
+
+def test_breaker_opens_fails_fast_and_recovers_through_half_open():
+    backend = FakeBackend(latency=0, tokens_per_second=0, failure_rate=1.0)
+    model, breaker = resilient(backend, failure_threshold=2, reset_timeout=0.2, max_retries=5)
+    # The breaker opens on the second failure, which also ends the retries
+    with pytest.raises(CircuitOpenError):
+        model.generate_content("prompt")
+    assert backend.calls == 2
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        model.generate_content("prompt")
+    assert backend.calls == 2           # rejected without reaching the upstream
+
+    time.sleep(0.25)
+    assert breaker.state == "half-open"
+    backend.failure_rate = 0.0
+    assert model.generate_content("prompt").text
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_failed_half_open_trial_reopens_the_breaker():
+    backend = FakeBackend(latency=0, tokens_per_second=0, failure_rate=1.0)
+    model, breaker = resilient(backend, failure_threshold=1, reset_timeout=0.2, max_retries=0)
+    with pytest.raises(FakeAPIError):
+        model.generate_content("prompt")
+    time.sleep(0.25)
+    with pytest.raises(FakeAPIError):
+        model.generate_content("prompt")
+    assert breaker.state == "open"
+
+
+def test_retries_stop_at_the_deadline():
+    backend = FakeBackend(latency=0.05, tokens_per_second=0, failure_rate=1.0)
+    model, _ = resilient(backend, failure_threshold=1000, max_retries=1000, deadline=0.3)
+    started = time.monotonic()
+    with pytest.raises((DeadlineExceededError, FakeAPIError)):
+        model.generate_content("prompt")
+    assert time.monotonic() - started < 1.0
+    assert 2 <= backend.calls < 20
+
+
+def test_deadline_is_passed_to_the_upstream_call():
+    seen = {}
+
+    class Recorder(FakeBackend):
+        def generate_content(self, contents, request_options=None, **kwargs):
+            seen.update(request_options)
+            return super().generate_content(contents, request_options=request_options, **kwargs)
+
+    model, _ = resilient(Recorder(latency=0, tokens_per_second=0), deadline=5)
+    model.generate_content("prompt")
+    assert 0 < seen["timeout"] <= 5
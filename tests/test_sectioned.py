@@ -0,0 +1,115 @@
+import json
+import re
+import time
+from pathlib import Path
+
+import pytest
+
+from autosage import prompts, reports
+from autosage.backends import FakeAPIError, FakeBackend, _prompt_text, contents_digest
+from autosage.cache import ImageReportCache, ResponseCache
+from autosage.generation import PartialResponseError
+from autosage.imaging import prepare_image
+from autosage.sectioned import INSUFFICIENT, assemble, generate_sectioned
+
+IMAGES = Path(__file__).resolve().parent.parent / "images"
+GROUP_NAMES = [name for name, _ in prompts.FUSION_GROUPS]
+SECTION_ORDER = [section for _, sections in prompts.FUSION_GROUPS for section in sections]
+
+
+def group_of(contents, system_instruction):
+    """Which FUSION_GROUPS entry a call is writing, from the headings it asks for."""
+    prompt = (system_instruction or "") + _prompt_text(contents)
+    for name, sections in prompts.FUSION_GROUPS:
+        if f"🔷 {sections[0]}" in prompt:
+            return name
+    raise AssertionError("not a fusion group call")
+
+
+class Groups:
+    """FakeBackend with per-group delays or failures."""
+
+    def __init__(self, delays=None, fail=(), recordings=None):
+        self.backend = FakeBackend(
+            latency=0, tokens_per_second=0, section_tokens=20, recordings=recordings
+        )
+        self.delays = delays or {}
+        self.fail = set(fail)
+        self.order = []
+
+    def generate_content(self, contents, stream=False, system_instruction=None, **kwargs):
+        group = group_of(contents, system_instruction)
+        time.sleep(self.delays.get(group, 0))
+        self.order.append(group)
+        if group in self.fail:
+            raise FakeAPIError(503, f"{group} failed")
+        return self.backend.generate_content(
+            contents, stream=stream, system_instruction=system_instruction, **kwargs
+        )
+
+
+@pytest.fixture
+def image_cache():
+    responses = ResponseCache(":memory:", ttl_seconds=3600, max_bytes=64 * 1024 * 1024)
+    return ImageReportCache(responses)
+
+
+@pytest.fixture(scope="module")
+def request_():
+    prepared = prepare_image((IMAGES / "car1.jpg").read_bytes(), max_edge=512)
+    return reports.sectioned_fusion_request(prepared, "Is this good for a family of five?")
+
+
+def headings(text):
+    return re.findall(r"^🔷 (.+)$", text, flags=re.MULTILINE)
+
+
+def test_assemble_keeps_order_and_skips_missing_groups():
+    text = assemble(["identity", None, "safety", "", "verdict"])
+    assert text.startswith(prompts.render_header(prompts.FUSION_TITLE))
+    assert text.endswith("identity\n\nsafety\n\nverdict")
+
+
+def test_groups_are_joined_in_template_order(image_cache, request_):
+    # The first groups finish last
+    model = Groups(delays={"performance": 0.2, "safety": 0.1})
+    sections = []
+    text = generate_sectioned(
+        model, image_cache, request_, on_section=lambda index, part: sections.append(index)
+    )
+    assert model.order[0] == "identity"
+    assert model.order[-1] == "performance"
+    assert sections[0] == 0 and sorted(sections) == list(range(len(GROUP_NAMES)))
+    assert headings(text) == SECTION_ORDER
+
+
+def test_result_is_cached(image_cache, request_):
+    model = Groups()
+    first = generate_sectioned(model, image_cache, request_)
+    calls = len(model.order)
+    assert generate_sectioned(model, image_cache, request_) == first
+    assert len(model.order) == calls == len(GROUP_NAMES)
+
+
+def test_unrecognised_vehicle_stops_after_identity(tmp_path, image_cache, request_):
+    recordings = tmp_path / "identity.jsonl"
+    recordings.write_text(json.dumps({
+        "digest": contents_digest(request_.contents, request_.system_instruction),
+        "text": f"🔷 INPUT ANALYSIS\n- {INSUFFICIENT.capitalize()}.",
+    }), encoding="utf-8")
+    model = Groups(recordings=str(recordings))
+    text = generate_sectioned(model, image_cache, request_)
+    assert model.order == ["identity"]
+    assert INSUFFICIENT in text.lower()
+
+
+def test_failed_group_keeps_the_others_and_is_not_cached(image_cache, request_):
+    model = Groups(fail={"safety"})
+    with pytest.raises(PartialResponseError) as raised:
+        generate_sectioned(model, image_cache, request_)
+    partial = headings(raised.value.partial_text)
+    assert "SAFETY & TECHNOLOGY" not in partial
+    assert "FINAL EXPERT VERDICT" in partial
+    assert isinstance(raised.value.error, FakeAPIError)
+    prepared = request_.image
+    assert image_cache.get(request_.cache_key, prepared.digest, prepared.phash) is None
@@ -0,0 +1,64 @@
+import pytest
+
+from autosage.semantic import SemanticCache, canonicalize
+
+PARTITION = SemanticCache.partition_key("Bike", "Buying Decision", "text", "")
+
+
+@pytest.fixture
+def cache():
+    cache = SemanticCache(threshold=0.9)
+    cache.add("best bike under 1 lakh", PARTITION, "bike-key")
+    return cache
+
+
+def test_paraphrase_hits_the_earlier_report(cache):
+    hit = cache.lookup("top motorcycle below ₹100000", PARTITION)
+    assert hit is not None
+    assert hit.key == "bike-key"
+    assert hit.similarity >= 0.9
+
+
+@pytest.mark.parametrize("query", [
+    "best bike under 2 lakh",
+    "best scooter under 1 lakh",
+    "best sedan under 15 lakh",
+])
+def test_different_questions_miss(cache, query):
+    assert cache.lookup(query, PARTITION) is None
+
+
+def test_threshold_decides_what_counts_as_similar():
+    strict = SemanticCache(threshold=0.999)
+    strict.add("best bike under 1 lakh", PARTITION, "bike-key")
+    assert strict.lookup("which is the best bike within rs 1,00,000 for city", PARTITION) is None
+    loose = SemanticCache(threshold=0.5)
+    loose.add("best bike under 1 lakh", PARTITION, "bike-key")
+    assert loose.lookup("which is the best bike within rs 1,00,000 for city", PARTITION) is not None
+
+
+def test_partitions_are_kept_apart(cache):
+    other = SemanticCache.partition_key("Car", "Buying Decision", "text", "")
+    assert cache.lookup("best bike under 1 lakh", other) is None
+    assert cache.lookup("best bike under 1 lakh", PARTITION).key == "bike-key"
+
+
+def test_the_query_own_report_is_not_a_similarity_hit(cache):
+    assert cache.lookup("best bike under 1 lakh", PARTITION, own_key="bike-key") is None
+
+
+@pytest.mark.parametrize("query, canonical", [
+    ("best bike under ₹1,00,000", "best bike under 1lakh"),
+    ("best bike under 100k", "best bike under 1lakh"),
+    ("best scooter under 1.5 lakh", "best scooter under 1_5lakh"),
+    ("top family suv below 15L", "best family suv under 15lakh"),
+    ("car with 1.5L engine", "car 1 5l engine"),
+    ("Royal Enfield Classic 350", "royal enfield classic 350"),
+])
+def test_canonical_prices(query, canonical):
+    assert canonicalize(query) == canonical
+
+
+def test_prices_with_decimals_stay_distinct():
+    assert canonicalize("bike under 1.5 lakh") != canonicalize("bike under 1 lakh")
+    assert canonicalize("bike under 1.5 lakh") != canonicalize("bike under 15 lakh")
@@ -0,0 +1,77 @@
+import os
+
+from autosage.session_store import ENTRY_OVERHEAD, SessionStore, StoreRegistry
+
+REPORT = "🔷 PRICE\n- Ex-showroom: ₹11-20 lakh\n" * 200
+
+
+def test_values_round_trip_compressed():
+    store = SessionStore(budget_bytes=1024 * 1024)
+    store.put("result:query", {"text": REPORT, "inputs": ("creta", None)})
+    assert store.get("result:query") == {"text": REPORT, "inputs": ("creta", None)}
+    summary = store.summary()
+    assert summary["raw_bytes"] > len(REPORT)
+    assert summary["bytes"] < summary["raw_bytes"] / 10
+    assert store.get("missing", "default") == "default"
+
+
+def test_replacing_and_popping_keep_the_count():
+    store = SessionStore(budget_bytes=1024 * 1024)
+    store.put("result:query", REPORT)
+    once = store.nbytes
+    store.put("result:query", REPORT)
+    assert store.nbytes == once
+    store.pop("result:query")
+    assert store.nbytes == 0 and store.raw_bytes == 0 and store.keys() == []
+
+
+def test_lru_eviction_within_budget():
+    store = SessionStore(budget_bytes=3 * (1000 + ENTRY_OVERHEAD) + 500)
+    for key in "abc":
+        store.put(key, os.urandom(990))
+    store.get("a")
+    store.put("d", os.urandom(990))
+    assert store.keys() == ["c", "a", "d"]
+    assert store.evictions == 1
+    assert store.nbytes <= store.budget_bytes
+
+
+def test_entry_over_budget_is_kept_alone():
+    store = SessionStore(budget_bytes=2000)
+    store.put("result:query", "small")
+    store.put("upload:vision", os.urandom(5000))
+    assert store.keys() == ["upload:vision"]
+
+
+def test_bytes_by_kind():
+    store = SessionStore(budget_bytes=1024 * 1024)
+    store.put("result:query", REPORT)
+    store.put("result:vision", REPORT)
+    store.put("upload:vision", os.urandom(4000))
+    by_kind = store.bytes_by_kind()
+    assert set(by_kind) == {"result", "upload"}
+    assert by_kind["upload"] > 4000
+    assert sum(by_kind.values()) == store.nbytes
+
+
+def test_registry_cap_evicts_oldest_across_sessions():
+    registry = StoreRegistry(max_bytes=3 * (2000 + ENTRY_OVERHEAD) + 500)
+    first, second = registry.create(1024 * 1024), registry.create(1024 * 1024)
+    first.put("old", os.urandom(2000))
+    second.put("a", os.urandom(2000))
+    first.put("new", os.urandom(2000))
+    second.put("b", os.urandom(2000))
+    assert first.keys() == ["new"] and second.keys() == ["a", "b"]
+    assert registry.total_bytes() <= registry.max_bytes
+    summary = registry.summary()
+    assert summary["sessions"] == 2 and summary["evictions"] == 1
+    assert set(summary["bytes_by_kind"]) == {"new", "a", "b"}
+
+
+def test_closed_sessions_drop_out_of_the_registry():
+    registry = StoreRegistry(max_bytes=1024 * 1024)
+    store = registry.create(1024)
+    store.put("result:query", "report")
+    assert registry.summary()["sessions"] == 1
+    del store
+    assert registry.summary()["sessions"] == 0
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from autosage.backends import FakeAPIError, FakeBackend
+from autosage.generation import generate_text
+from autosage.singleflight import SingleFlightModel
+
+
+def run_together(count, fn):
+    """Call fn() from ``count`` threads at once; returns (results, errors)."""
+    barrier = threading.Barrier(count)
+    results, errors = [None] * count, [None] * count
+
+    def worker(index):
+        barrier.wait()
+        try:
+            results[index] = fn()
+        except Exception as ex:
+            errors[index] = ex
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_identical_calls_share_one_upstream_request():
+    upstream = FakeBackend(latency=0.3, tokens_per_second=0)
+    model = SingleFlightModel(upstream)
+    responses, errors = run_together(8, lambda: model.generate_content("same prompt"))
+    assert errors == [None] * 8
+    assert upstream.calls == 1
+    assert len({response.text for response in responses}) == 1
+    # Only the leader's response carries the call's token usage
+    assert sum(response.usage_metadata is not None for response in responses) == 1
+    assert model.summary()["coalesced"] == 7
+    assert model.summary()["in_flight"] == 0
+
+
+def test_different_requests_are_not_coalesced():
+    upstream = FakeBackend(latency=0.2, tokens_per_second=0)
+    model = SingleFlightModel(upstream)
+    counter = iter(range(4))
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            index = next(counter)
+        return model.generate_content(f"prompt {index}")
+
+    run_together(4, call)
+    assert upstream.calls == 4
+
+
+def test_streams_are_shared_chunk_by_chunk():
+    upstream = FakeBackend(latency=0.2, tokens_per_second=2000, chunk_tokens=8)
+    model = SingleFlightModel(upstream)
+    texts, errors = run_together(
+        5, lambda: generate_text(model, "same prompt", on_chunk=lambda text: None)
+    )
+    assert errors == [None] * 5
+    assert upstream.calls == 1
+    assert len(set(texts)) == 1 and texts[0]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_a_failing_leader_fails_every_caller(stream):
+    upstream = FakeBackend(latency=0.3, tokens_per_second=0, failure_rate=1.0)
+    model = SingleFlightModel(upstream)
+
+    def call():
+        if stream:
+            return generate_text(model, "same prompt", on_chunk=lambda text: None)
+        return model.generate_content("same prompt")
+
+    _, errors = run_together(5, call)
+    assert all(isinstance(error, FakeAPIError) for error in errors)
+    assert upstream.calls == 1
+    assert model.summary()["shared_errors"] == 4
+
+    # The failed flight is gone: the next caller tries again
+    upstream.failure_rate = 0.0
+    assert model.generate_content("same prompt").text
+    assert upstream.calls == 2
@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import pytest
+
+from autosage.backends import synthesize_json
+from autosage.specs import apply_specs, open_spec_store, spec_table
+from autosage.structured import parse_report, response_schema
+
+CATALOGUE = Path(__file__).resolve().parent.parent / "data" / "vehicle_specs.csv"
+
+
+@pytest.fixture(scope="module")
+def store():
+    return open_spec_store(":memory:", str(CATALOGUE))
+
+
+@pytest.mark.parametrize("query, name, variant_matched", [
+    ("creta diesel", "Hyundai Creta SX 1.5 Diesel MT", True),
+    ("Hyundai Creta on-road price", "Hyundai Creta SX(O) 1.5 Petrol IVT", False),
+    ("tata nexon ev range", "Tata Nexon EV Empowered 45", False),
+    ("nexon mileage", "Tata Nexon Creative 1.2 Turbo Petrol", False),
+    ("vitara brezza maintenance cost", "Maruti Suzuki Brezza VXi", False),
+    ("honda city review", "Honda City V CVT", False),
+])
+def test_match(store, query, name, variant_matched):
+    match = store.match(query)
+    assert match is not None
+    assert match.spec.name == name
+    assert match.variant_matched is variant_matched
+
+
+@pytest.mark.parametrize("query", [
+    "best family car for city driving",     # "City" needs the brand
+    "best bike under 1 lakh",
+    "",
+])
+def test_no_match(store, query):
+    assert store.match(query) is None
+
+
+@pytest.mark.parametrize("query", [
+    "Creta vs Seltos",
+    "Creta and Seltos",
+    "Is the Swift or Baleno better",
+    "compare the creta with its rivals",
+    "Nexon versus the competition",
+])
+def test_questions_about_several_vehicles_are_not_grounded(store, query):
+    assert store.match(query) is None
+
+
+def test_context_marks_assumed_variant(store):
+    context = store.match("Hyundai Creta").context()
+    assert "- Variant: SX(O) 1.5 Petrol IVT (assumed)" in context
+    assert "- Competitors: Kia Seltos, Maruti Grand Vitara" in context
+
+
+def test_apply_specs_overwrites_report_fields(store):
+    match = store.match("creta diesel")
+    report = parse_report("query", synthesize_json(response_schema("query")))
+    report.section("overview").fields["model"] = "Creta"
+    apply_specs(report, match)
+    assert report.value("engine", "engine_capacity") == "1493 cc"
+    assert report.value("overview", "variant") == "SX 1.5 Diesel MT"
+    assert report.value("price", "competitors")[0] == "Kia Seltos"
+
+
+def test_apply_specs_leaves_other_vehicles_alone(store):
+    report = parse_report("query", synthesize_json(response_schema("query")))
+    report.section("overview").fields["model"] = "Seltos"
+    apply_specs(report, store.match("creta diesel"))
+    assert report.value("engine", "engine_capacity") == "Sample value"
+
+
+def test_spec_table(store):
+    rows = spec_table(store.match("creta diesel"))
+    assert rows[0] == {"Field": "Vehicle", "Value": "Hyundai Creta SX 1.5 Diesel MT"}
+    assert {"Field": "Fuel Type", "Value": "Diesel"} in rows
+
+
+def test_seed_only_fills_an_empty_store(tmp_path):
+    db = str(tmp_path / "specs.sqlite3")
+    seeded = len(open_spec_store(db, str(CATALOGUE)))
+    assert seeded > 0
+    extra = tmp_path / "extra.csv"
+    extra.write_text("brand,model,variant,aliases\nSkoda,Kushaq,Style,kushaq\n", encoding="utf-8")
+    reopened = open_spec_store(db, str(extra))
+    assert len(reopened) == seeded
+    assert reopened.match("kushaq") is None
+    reopened.import_csv(str(extra))
+    assert len(reopened) == 1 and reopened.match("skoda kushaq").spec.model == "Kushaq"
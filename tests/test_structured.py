@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from autosage import config
+from autosage.backends import FakeBackend, synthesize_json
+from autosage.structured import (
+    REPORT_SPECS, StructuredOutputError, json_generation_config, parse_report, render_markdown,
+    response_schema
+)
+
+
+def query_json(**overrides):
+    data = json.loads(synthesize_json(response_schema("query")))
+    for section, fields in overrides.items():
+        data[section].update(fields)
+    return json.dumps(data)
+
+
+@pytest.mark.parametrize("kind", sorted(REPORT_SPECS))
+def test_schema_requires_every_section_and_field(kind):
+    schema = response_schema(kind)
+    assert schema["required"] == [section for section, _, _ in REPORT_SPECS[kind]]
+    for section, _, fields in REPORT_SPECS[kind]:
+        assert schema["properties"][section]["required"] == [key for key, _, _ in fields]
+
+
+def test_generation_config_asks_for_json():
+    generation_config = json_generation_config("query", config.GENERATION_CONFIG)
+    assert generation_config["response_mime_type"] == "application/json"
+    assert generation_config["temperature"] == config.GENERATION_CONFIG["temperature"]
+
+
+def test_parse_fake_backend_output():
+    model = FakeBackend(latency=0, tokens_per_second=0)
+    response = model.generate_content(
+        ["Hyundai Creta"], generation_config=json_generation_config("query", {})
+    )
+    report = parse_report("query", response.text)
+    assert [section.key for section in report.sections] == [
+        section for section, _, _ in REPORT_SPECS["query"]
+    ]
+    assert report.value("overview", "brand") == "Sample value"
+    assert report.value("missing", "brand", "default") == "default"
+
+
+def test_values_are_coerced():
+    report = parse_report("query", query_json(
+        safety={"safety_score": "8.6", "airbags": "  6  "},
+        price={"value_score": 14, "competitors": "Seltos"},
+        ownership={"reliability_score": "high"},
+        verdict={"pros": ["Comfort", " ", 5], "cons": None},
+    ))
+    assert report.value("safety", "safety_score") == 9
+    assert report.value("safety", "airbags") == "6"
+    assert report.value("price", "value_score") == 10
+    assert report.value("price", "competitors") == ["Seltos"]
+    assert report.value("ownership", "reliability_score") is None
+    assert report.value("verdict", "pros") == ["Comfort", "5"]
+    assert report.value("verdict", "cons") == []
+
+
+@pytest.mark.parametrize("text, message", [
+    ("Sorry, I can't help with that", "not valid JSON"),
+    (None, "not valid JSON"),
+    ("[1, 2]", "not a JSON object"),
+    ('{"overview": {}}', "missing section 'engine'"),
+    (query_json(price={"competitors": {"a": 1}}), "expected a list"),
+])
+def test_invalid_output(text, message):
+    with pytest.raises(StructuredOutputError, match=message):
+        parse_report("query", text)
+
+
+def test_render_markdown():
+    report = parse_report("query", query_json(
+        overview={"variant": ""},
+        features={"items": ["Sunroof", "ADAS"]},
+        price={"competitors": ["Seltos", "Grand Vitara"]},
+    ))
+    markdown = render_markdown(report)
+    headings = [line for line in markdown.splitlines() if line.startswith("####")]
+    assert headings == [f"#### 🔷 {title}" for _, title, _ in REPORT_SPECS["query"]]
+    assert "- **Brand:** Sample value" in markdown
+    assert "Variant" not in markdown
+    assert "1. Sunroof\n2. ADAS" in markdown
+    assert "- **Top 4 Competitors:** Seltos, Grand Vitara" in markdown
+    assert "- **Safety Score (1-10):** 7/10" in markdown
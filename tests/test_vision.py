@@ -0,0 +1,86 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from autosage import config
+from autosage.backends import FakeAPIError, FakeBackend
+from autosage.batch import image_jobs, run_pipeline
+from autosage.cache import ImageReportCache, ResponseCache
+from autosage.imaging import prepare_image
+from autosage.structured import response_schema
+from autosage.vision import two_stage_report
+
+IMAGES = Path(__file__).resolve().parent.parent / "images"
+
+
+class IdentifyFails:
+    """FakeBackend whose identification calls raise ``error``."""
+
+    def __init__(self, error):
+        self.backend = FakeBackend(latency=0, tokens_per_second=0)
+        self.error = error
+        self.identify_calls = 0
+
+    def generate_content(self, contents, stream=False, generation_config=None, **kwargs):
+        if (generation_config or {}).get("response_schema") == response_schema("identify"):
+            self.identify_calls += 1
+            raise self.error
+        return self.backend.generate_content(
+            contents, stream=stream, generation_config=generation_config, **kwargs
+        )
+
+
+@pytest.fixture
+def caches():
+    responses = ResponseCache(":memory:", ttl_seconds=3600, max_bytes=64 * 1024 * 1024)
+    return responses, ImageReportCache(responses)
+
+
+@pytest.fixture(scope="module")
+def prepared():
+    return prepare_image((IMAGES / "car1.jpg").read_bytes(), max_edge=512, max_bytes=200_000)
+
+
+def test_identified_photo_gets_text_report(caches, prepared):
+    model = FakeBackend(latency=0, tokens_per_second=0)
+    text, request, identity = two_stage_report(model, *caches, prepared, min_confidence=6)
+    assert identity is not None and identity.confidence == 7
+    assert request.image is None
+    assert "IDENTIFICATION CONFIDENCE" in text
+
+
+def test_low_confidence_falls_back_to_image_report(caches, prepared):
+    model = FakeBackend(latency=0, tokens_per_second=0)
+    text, request, identity = two_stage_report(model, *caches, prepared, min_confidence=8)
+    assert identity is None
+    assert request.image is prepared and text
+
+
+@pytest.mark.parametrize("error", [
+    ValueError("response.text requires a valid Part (finish_reason MAX_TOKENS)"),
+    FakeAPIError(400, "blocked"),
+])
+def test_failed_identification_falls_back_to_image_report(caches, prepared, error):
+    model = IdentifyFails(error)
+    text, request, identity = two_stage_report(model, *caches, prepared, min_confidence=6)
+    assert model.identify_calls == 1
+    assert identity is None
+    assert request.image is prepared and text
+
+
+def test_batch_vision_uses_two_stages(tmp_path, caches, monkeypatch):
+    monkeypatch.setattr(config, "VISION_TWO_STAGE", True)
+    for name in ("car1.jpg", "car2.jpg"):
+        shutil.copy(IMAGES / name, tmp_path / name)
+    out_path = tmp_path / "vision.jsonl"
+    model = FakeBackend(latency=0, tokens_per_second=0)
+    counts = run_pipeline(
+        image_jobs(tmp_path), str(out_path), model, *caches, workers=1, log=lambda message: None
+    )
+    assert counts == {"ok": 2, "error": 0}
+    records = [json.loads(line) for line in out_path.read_text(encoding="utf-8").splitlines()]
+    assert all(record["identity"] for record in records)
+    # Both photos are identified as the same vehicle and share one text report
+    assert model.calls == 3
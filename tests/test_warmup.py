@@ -0,0 +1,90 @@
+from autosage.backends import FakeBackend
+from autosage.batch import Job, build_request
+from autosage.cache import ResponseCache
+from autosage.semantic import SemanticCache, query_partition
+from autosage.warmup import CacheWarmer
+
+TTL = 3600
+
+
+def jobs(*queries, vehicle_type=None):
+    return [
+        Job(f"job{index}", "query", {"query": query, "vehicle_type": vehicle_type, "purpose": None})
+        for index, query in enumerate(queries)
+    ]
+
+
+def warmer(model=None, **kwargs):
+    model = model or FakeBackend(latency=0, tokens_per_second=0, output_tokens=200)
+    responses = ResponseCache(":memory:", ttl_seconds=TTL, max_bytes=64 * 1024 * 1024)
+    return CacheWarmer(model, responses, workers=1, **kwargs)
+
+
+def test_warms_then_skips_fresh_reports():
+    warm = warmer()
+    targets = jobs("Hyundai Creta", "Maruti Swift")
+    assert warm.run(targets)["warmed"] == 2
+    summary = warm.run(targets)
+    assert summary["fresh"] == 2 and summary["warmed"] == 0
+    assert warm.model.calls == 2
+
+
+def test_refreshes_reports_close_to_expiry(clock):
+    warm = warmer(refresh_seconds=600)
+    targets = jobs("Hyundai Creta")
+    warm.run(targets)
+    clock.advance(TTL - 300)
+    assert warm.run(targets)["refreshed"] == 1
+    assert warm.run(targets)["fresh"] == 1
+
+
+def test_call_budget_stops_the_run():
+    warm = warmer(max_calls=2)
+    summary = warm.run(jobs("Creta", "Swift", "Nexon", "Scorpio N"))
+    assert summary["warmed"] == 2 and summary["over_budget"] == 2
+    assert warm.model.calls == 2
+
+
+def test_fresh_targets_are_free_within_the_call_budget():
+    warm = warmer(max_calls=2)
+    warm.run(jobs("Creta", "Swift"))
+    summary = warm.run(jobs("Creta", "Swift", "Nexon", "Scorpio N", "Brezza"))
+    assert summary["fresh"] == 2 and summary["warmed"] == 2 and summary["over_budget"] == 1
+
+
+def test_token_budget_stops_the_run():
+    warm = warmer(max_tokens=1)
+    summary = warm.run(jobs("Creta", "Swift", "Nexon"))
+    # One call is started before any tokens are known; it spends the budget
+    assert summary["warmed"] == 1 and summary["over_budget"] == 2
+    assert summary["tokens"] > 1
+
+
+def test_failures_count_against_the_call_budget():
+    warm = warmer(FakeBackend(latency=0, tokens_per_second=0, failure_rate=1.0), max_calls=2)
+    summary = warm.run(jobs("Creta", "Swift", "Nexon"))
+    assert summary["failed"] == 2 and summary["over_budget"] == 1
+
+
+def test_warmed_queries_join_the_similarity_cache():
+    semantic = SemanticCache(threshold=0.9)
+    warm = warmer(semantic_cache=semantic)
+    targets = jobs("best bike under 1 lakh", vehicle_type="Bike")
+    warm.run(targets)
+    request = build_request(targets[0], structured=False)
+    # The partition the Smart Query tab looks the question up in
+    partition = query_partition("Bike", None, False, request)
+    hit = semantic.lookup("top motorcycle below ₹100000", partition)
+    assert hit is not None and hit.key == request.cache_key
+    other = query_partition("Car", None, False, request)
+    assert semantic.lookup("top motorcycle below ₹100000", other) is None
+
+
+def test_fresh_targets_are_indexed_after_a_restart():
+    warm = warmer()
+    targets = jobs("best bike under 1 lakh", vehicle_type="Bike")
+    warm.run(targets)
+    semantic = SemanticCache(threshold=0.9)
+    restarted = CacheWarmer(warm.model, warm.response_cache, semantic_cache=semantic)
+    assert restarted.run(targets)["fresh"] == 1
+    assert semantic.summary()["entries"] == 1